@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+录制管线基准测试
+
+使用合成画面源代替屏幕截图，驱动 ScreenCapture → ScreenRecorder → VideoEncoder
+完整管线，统计持续帧率、各阶段延迟分位数、丢帧、CPU和内存占用，
+结果写入JSON以便比较不同后端、设置和提交。
+
+示例：
+    python benchmarks/pipeline_benchmark.py -s 1280x720 -s 1920x1080 -b ffmpeg -b opencv \\
+        -d 10 --json results.json
+    python benchmarks/pipeline_benchmark.py --compare old.json --json new.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import numpy as np
+from PyQt6.QtCore import QCoreApplication
+
+from config.settings import AppConfig
+from core.frame_queue import FrameQueue
+from core.screen_capture import ScreenCapture
+from core.synthetic_source import SyntheticScreenSource, make_source_factory
+from core.video_encoder import VideoEncoder, ScreenRecorder
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def read_rss_mb() -> float:
+    """当前进程常驻内存（MB）"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is not None:
+        # macOS单位为字节，Linux为KB；此处只能得到峰值
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (1024 * 1024) if platform.system() == "Darwin" else maxrss / 1024
+    return 0.0
+
+def cpu_times() -> dict:
+    """本进程和已结束子进程（ffmpeg）的CPU时间（秒）"""
+    if resource is None:
+        return {"self": time.process_time(), "children": 0.0}
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {"self": own.ru_utime + own.ru_stime, "children": children.ru_utime + children.ru_stime}
+
+def percentiles_ms(samples) -> dict:
+    """延迟分位数（毫秒）"""
+    if not samples:
+        return {}
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3)
+    }
+
+def git_revision() -> str:
+    """当前提交（不在git仓库中时为空）"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5, cwd=Path(__file__).resolve().parent)
+        return result.stdout.strip()
+    except Exception:
+        return ""
+
+def run_scenario(app, width: int, height: int, fps: int, duration: float, backend: str,
+                 pattern: str, queue_policy: str, damage: str, pipeline: str, quality: str,
+                 format_type: str, output_dir: str) -> dict:
+    """运行一个场景并返回统计结果
+
+    process管线中截图和编码在子进程内完成，只有汇总统计，没有各阶段延迟；
+    CPU时间中的children包含已结束的子进程。
+    """
+    name = f"{width}x{height}@{fps}/{backend}/{pattern}/{queue_policy}/damage-{damage}"
+    if pipeline != "thread":
+        name += f"/{pipeline}"
+    output_path = str(Path(output_dir) / f"bench_{width}x{height}_{backend}_{pattern}_{damage}_{pipeline}."
+                      f"{format_type.lower()}")
+
+    screen_capture = ScreenCapture(make_source_factory(width, height, pattern))
+    video_encoder = VideoEncoder()
+    recorder = ScreenRecorder()
+    recorder.setup(screen_capture, video_encoder)
+    recorder.set_queue_policy(queue_policy)
+    recorder.set_damage_detection(damage == "on")
+    recorder.set_pipeline_mode(pipeline)
+
+    errors = []
+    recorder.error_occurred.connect(errors.append)
+
+    # 阶段耗时：截图和颜色转换在捕获线程中计时，其余阶段由编码线程上报
+    stages = {"grab": [], "convert": [], "queue_wait": [], "encode": [], "capture_to_encoded": []}
+
+    def timed(stage, func):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            stages[stage].append(time.perf_counter() - started)
+            return result
+        return wrapper
+
+    screen_capture._grab_raw = timed("grab", screen_capture._grab_raw)
+    screen_capture._convert_raw = timed("convert", screen_capture._convert_raw)
+    recorder.stage_observer = lambda stage, seconds: stages[stage].append(seconds)
+
+    cpu_before = cpu_times()
+    rss_samples = [read_rss_mb()]
+
+    start_requested = time.monotonic()
+    if not recorder.start_recording(output_path, fps, quality, format_type, backend):
+        return {"name": name, "error": "; ".join(errors) or "开始录制失败"}
+    started = time.monotonic()
+
+    while time.monotonic() - started < duration:
+        app.processEvents()
+        rss_samples.append(read_rss_mb())
+        time.sleep(0.1)
+
+    record_seconds = time.monotonic() - started
+    stop_started = time.monotonic()
+    recorder.stop_recording()
+    # 剩余帧的编码和封装在收尾线程中完成，停止耗时包含收尾
+    recorder.wait_finalized()
+    stop_seconds = time.monotonic() - stop_started
+    app.processEvents()
+
+    cpu_after = cpu_times()
+    capture_stats = screen_capture.get_capture_stats()
+    queue_stats = dict(recorder.last_queue_stats)
+    pipeline_stats = recorder.get_pipeline_stats()
+    if pipeline_stats:
+        capture_stats = {key: pipeline_stats[key] for key in ("late", "dropped", "held")}
+    frames_encoded = recorder.last_frame_count
+    file_size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+
+    return {
+        "name": name,
+        "width": width,
+        "height": height,
+        "target_fps": fps,
+        "backend": video_encoder.active_backend or backend,
+        "pattern": pattern,
+        "queue_policy": queue_policy,
+        "damage_detection": damage == "on",
+        "pipeline": pipeline if pipeline_stats or pipeline == "thread" else "thread（回退）",
+        "quality": quality,
+        "format": format_type,
+        "duration": round(record_seconds, 3),
+        "frames_encoded": frames_encoded,
+        "sustained_fps": round(frames_encoded / record_seconds, 2) if record_seconds else 0.0,
+        "capture": capture_stats,
+        "queue": queue_stats,
+        "process_pipeline": pipeline_stats,
+        "dropped_frames": capture_stats.get("dropped", 0) + queue_stats.get("dropped", 0),
+        "latency_ms": {stage: percentiles_ms(samples) for stage, samples in stages.items()},
+        "cpu_seconds": {
+            "self": round(cpu_after["self"] - cpu_before["self"], 3),
+            "ffmpeg": round(cpu_after["children"] - cpu_before["children"], 3)
+        },
+        "cpu_percent": round((cpu_after["self"] - cpu_before["self"] + cpu_after["children"]
+                              - cpu_before["children"]) / record_seconds * 100, 1) if record_seconds else 0.0,
+        "rss_mb": {"mean": round(float(np.mean(rss_samples)), 1), "peak": round(max(rss_samples), 1)},
+        "start_seconds": round(started - start_requested, 3),
+        "stop_seconds": round(stop_seconds, 3),
+        "file_size": file_size,
+        "errors": errors
+    }
+
+def print_result(result: dict):
+    """输出单个场景的摘要"""
+    if "error" in result:
+        print(f"{result['name']}: 失败 - {result['error']}")
+        return
+    encode = result["latency_ms"].get("capture_to_encoded", {})
+    print(f"{result['name']}: {result['sustained_fps']} fps, 丢帧 {result['dropped_frames']}, "
+          f"CPU {result['cpu_percent']}%, RSS峰值 {result['rss_mb']['peak']}MB, "
+          f"端到端 p50/p99 {encode.get('p50', 0)}/{encode.get('p99', 0)}ms, "
+          f"文件 {result['file_size'] / 1024:.0f}KB")
+
+def compare_results(baseline_path: str, results: list):
+    """与之前的结果比较帧率和CPU占用"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f).get("results", []) if "error" not in r}
+
+    print(f"\n与 {baseline_path} 比较:")
+    for result in results:
+        old = baseline.get(result["name"])
+        if old is None or "error" in result:
+            continue
+        print(f"{result['name']}: fps {old['sustained_fps']} → {result['sustained_fps']}, "
+              f"CPU {old['cpu_percent']}% → {result['cpu_percent']}%, "
+              f"RSS峰值 {old['rss_mb']['peak']} → {result['rss_mb']['peak']}MB")
+
+def parse_size(value: str):
+    """解析 宽x高"""
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+        return width, height
+    except ValueError:
+        raise argparse.ArgumentTypeError("分辨率格式应为 宽x高")
+
+def main():
+    parser = argparse.ArgumentParser(description="录制管线基准测试")
+    parser.add_argument("-s", "--size", type=parse_size, action="append", help="分辨率，可重复（默认1920x1080）")
+    parser.add_argument("-b", "--backend", choices=AppConfig.ENCODER_BACKENDS, action="append",
+                        help="编码后端，可重复（默认ffmpeg）")
+    parser.add_argument("-p", "--pattern", choices=SyntheticScreenSource.PATTERNS, action="append",
+                        help="合成图案，可重复（默认scroll）")
+    parser.add_argument("--queue-policy", choices=FrameQueue.POLICIES, action="append",
+                        help="帧队列策略，可重复（默认block）")
+    parser.add_argument("--damage", choices=["on", "off"], action="append",
+                        help="画面变化检测，可重复（默认on）")
+    parser.add_argument("--pipeline", choices=AppConfig.PIPELINE_MODES, action="append",
+                        help="录制管线，可重复（默认thread）")
+    parser.add_argument("-r", "--fps", type=int, default=30, help="目标帧率")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="每个场景的录制时长（秒）")
+    parser.add_argument("-q", "--quality", choices=list(AppConfig.QUALITY_SETTINGS), default=AppConfig.DEFAULT_QUALITY)
+    parser.add_argument("-f", "--format", choices=AppConfig.SUPPORTED_FORMATS, default="MP4")
+    parser.add_argument("--json", help="结果输出文件（默认输出到标准输出）")
+    parser.add_argument("--compare", help="与之前保存的结果文件比较")
+    parser.add_argument("--keep-output", action="store_true", help="保留录制的视频文件")
+    args = parser.parse_args()
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    output_dir = tempfile.mkdtemp(prefix="screenrecorder_bench_")
+
+    scenarios = itertools.product(
+        args.size or [(1920, 1080)], args.backend or ["ffmpeg"],
+        args.pattern or ["scroll"], args.queue_policy or [FrameQueue.POLICY_BLOCK],
+        args.damage or ["on"], args.pipeline or ["thread"]
+    )
+    results = []
+    for (width, height), backend, pattern, queue_policy, damage, pipeline in scenarios:
+        result = run_scenario(app, width, height, args.fps, args.duration, backend, pattern,
+                              queue_policy, damage, pipeline, args.quality, args.format, output_dir)
+        print_result(result)
+        results.append(result)
+
+    if not args.keep_output:
+        for path in Path(output_dir).iterdir():
+            path.unlink()
+        Path(output_dir).rmdir()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "app_version": AppConfig.APP_VERSION
+        },
+        "results": results
+    }
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.json}")
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.compare:
+        compare_results(args.compare, results)
+
+if __name__ == "__main__":
+    main()
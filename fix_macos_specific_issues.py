@@ -307,6 +307,16 @@ from pathlib import Path
 
 def find_ffmpeg():
     """查找FFmpeg二进制文件"""
+    # 优先使用应用的共享查找结果（带磁盘缓存）
+    try:
+        sys.path.insert(0, str(Path(__file__).parent / "src"))
+        from utils.ffmpeg_locator import find_ffmpeg as locate_ffmpeg
+        ffmpeg_path = locate_ffmpeg()
+        if ffmpeg_path:
+            return ffmpeg_path
+    except ImportError:
+        pass
+    
     # 检查PATH
     ffmpeg_path = shutil.which('ffmpeg')
     if ffmpeg_path:
@@ -5,26 +5,21 @@
 
 import sys
 import os
+import argparse
 import platform
+from datetime import datetime
 from pathlib import Path
 
 # 添加src目录到Python路径
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
-try:
-    from PyQt6.QtWidgets import QApplication, QMessageBox
-    from PyQt6.QtCore import Qt
-    from PyQt6.QtGui import QIcon
-except ImportError as e:
-    print(f"错误：缺少必要的依赖库 {e}")
-    print("请运行：pip install -r requirements.txt")
-    sys.exit(1)
-
 from config.settings import AppConfig
-from ui.main_window import MainWindow
 
-def check_system_requirements():
-    """检查系统要求"""
+def check_system_requirements(headless: bool = False):
+    """检查系统要求
+
+    无界面录制（record子命令）同时支持Linux。
+    """
     errors = []
     
     # 检查Python版本
@@ -32,13 +27,108 @@ def check_system_requirements():
         errors.append("需要Python 3.8或更高版本")
     
     # 检查操作系统
-    if platform.system() not in ["Windows", "Darwin"]:
-        errors.append("仅支持Windows和macOS")
+    supported = ["Windows", "Darwin", "Linux"] if headless else ["Windows", "Darwin"]
+    if platform.system() not in supported:
+        errors.append("仅支持Windows和macOS（无界面录制另支持Linux）")
     
     return errors
 
+def parse_region(value: str):
+    """解析 x,y,宽,高 格式的录制区域"""
+    try:
+        x, y, width, height = (int(part) for part in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("区域格式应为 x,y,宽,高")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("区域宽高必须大于0")
+    return x, y, width, height
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description=AppConfig.APP_NAME)
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="输出启动耗时分析（各模块导入和初始化耗时，直到主窗口首次绘制）")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    record = subparsers.add_parser("record", help="无界面录制（不创建窗口，可在Xvfb等环境中运行）")
+    record.add_argument("-o", "--output", help="输出文件路径（默认保存到输出目录）")
+    record.add_argument("-f", "--format", choices=AppConfig.SUPPORTED_FORMATS,
+                        help="视频格式（默认根据输出文件扩展名判断）")
+    record.add_argument("-r", "--fps", type=int, default=AppConfig.DEFAULT_FPS, help="帧率")
+    record.add_argument("-d", "--duration", type=float, default=0.0,
+                        help="录制时长（秒），0表示直到按Ctrl+C")
+    record.add_argument("--region", type=parse_region, help="录制区域 x,y,宽,高（默认全屏）")
+    record.add_argument("--monitor", type=int, default=0, help="显示器索引（0为所有显示器）")
+    record.add_argument("-q", "--quality", choices=list(AppConfig.QUALITY_SETTINGS),
+                        default=AppConfig.DEFAULT_QUALITY, help="录制质量")
+    record.add_argument("--backend", choices=AppConfig.ENCODER_BACKENDS, help="视频编码后端")
+    record.add_argument("--pipeline", choices=AppConfig.PIPELINE_MODES,
+                        help="录制管线：thread 或 process（多进程，默认读取配置）")
+    record.add_argument("--replay", type=float, default=0.0, metavar="MINUTES",
+                        help="即时回放：只保留最近N分钟，SIGUSR1或快捷键保存，停止时写入输出文件")
+    record.add_argument("--audio", action="store_true", help="同时录制麦克风音频")
+    record.add_argument("--quiet", action="store_true", help="不输出录制状态")
+    
+    recover = subparsers.add_parser("recover", help="恢复异常中断的分段录制")
+    recover.add_argument("manifest", nargs="*", help="分段清单 manifest.json（默认恢复所有未完成的录制）")
+    recover.add_argument("-o", "--output", help="输出文件路径（只恢复一个录制时有效）")
+    recover.add_argument("--list", action="store_true", help="只列出未完成的录制")
+    return parser
+
+def run_record(args) -> int:
+    """执行 record 子命令"""
+    format_type = args.format
+    output_path = args.output
+    if not format_type:
+        suffix = Path(output_path).suffix.lstrip(".").lower() if output_path else ""
+        format_type = next((f for f in AppConfig.SUPPORTED_FORMATS if f.lower() == suffix),
+                           AppConfig.DEFAULT_FORMAT)
+    if not output_path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = str(Path(AppConfig.get_default_output_dir()) /
+                          f"录屏_{timestamp}.{format_type.lower()}")
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    
+    # 只加载QtCore，不导入任何窗口部件
+    from core.headless_recorder import HeadlessRecorder
+    recorder = HeadlessRecorder(
+        output_path, args.fps, args.quality, format_type,
+        region=args.region, monitor=args.monitor, duration=args.duration,
+        audio=args.audio, encoder_backend=args.backend, pipeline_mode=args.pipeline,
+        replay_minutes=args.replay, quiet=args.quiet
+    )
+    return recorder.run()
+
+def run_recover(args) -> int:
+    """执行 recover 子命令"""
+    from core.segment_output import SegmentedRecording
+    
+    if args.manifest:
+        recordings = [SegmentedRecording.load(path) for path in args.manifest]
+    else:
+        recordings = SegmentedRecording.find_unfinished()
+    if not recordings:
+        print("没有需要恢复的录制")
+        return 0
+    
+    exit_code = 0
+    for recording in recordings:
+        segments = recording.get_segments()
+        print(f"{recording.directory}: {len(segments)}个分段 → {recording.output_path}（{recording.status}）")
+        if args.list:
+            continue
+        output_path = args.output if args.output and len(recordings) == 1 else None
+        success, error = recording.recover(output_path)
+        if not success:
+            print(f"恢复失败: {error}", file=sys.stderr)
+            exit_code = 1
+    return exit_code
+
 def setup_application():
     """设置应用程序"""
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import Qt
+    
     # 设置应用程序属性
     QApplication.setApplicationName(AppConfig.APP_NAME)
     QApplication.setApplicationVersion(AppConfig.APP_VERSION)
@@ -58,29 +148,38 @@ def setup_application():
     # 确保必要的目录存在
     AppConfig.ensure_directories()
 
-def main():
-    """主函数"""
-    # 检查系统要求
-    errors = check_system_requirements()
-    if errors:
-        print("系统要求检查失败：")
-        for error in errors:
-            print(f"- {error}")
-        sys.exit(1)
+def run_gui() -> int:
+    """启动图形界面"""
+    from utils.startup_profiler import get_startup_profiler
+    profiler = get_startup_profiler()
+    
+    try:
+        with profiler.measure("导入PyQt6"):
+            from PyQt6.QtWidgets import QApplication, QMessageBox
+    except ImportError as e:
+        print(f"错误：缺少必要的依赖库 {e}")
+        print("请运行：pip install -r requirements.txt")
+        return 1
     
     # 创建应用程序
-    app = QApplication(sys.argv)
+    with profiler.measure("创建QApplication"):
+        app = QApplication(sys.argv)
     
     # 设置应用程序
     setup_application()
     
     try:
-        # 创建主窗口
-        main_window = MainWindow()
-        main_window.show()
+        # 创建主窗口（录制、音频和FFmpeg组件在首次使用时才导入和创建）
+        with profiler.measure("导入主窗口模块"):
+            from ui.main_window import MainWindow
+        with profiler.measure("创建主窗口"):
+            main_window = MainWindow()
+        profiler.report_on_first_paint(main_window)
+        with profiler.measure("显示主窗口"):
+            main_window.show()
         
         # 运行应用程序
-        sys.exit(app.exec())
+        return app.exec()
         
     except Exception as e:
         # 显示错误对话框
@@ -89,7 +188,37 @@ def main():
         error_dialog.setWindowTitle("应用程序错误")
         error_dialog.setText(f"应用程序启动失败：\n{str(e)}")
         error_dialog.exec()
+        return 1
+
+def main():
+    """主函数"""
+    # 未知参数留给Qt处理（如 -platform）
+    parser = build_parser()
+    args, unknown = parser.parse_known_args()
+    if args.profile_startup:
+        # 在导入PyQt6之前开始记录
+        from utils.startup_profiler import get_startup_profiler
+        get_startup_profiler().enable()
+    headless = args.command in ("record", "recover")
+    if headless and unknown:
+        parser.error(f"无法识别的参数: {' '.join(unknown)}")
+    
+    # 检查系统要求
+    errors = check_system_requirements(headless)
+    if errors:
+        print("系统要求检查失败：")
+        for error in errors:
+            print(f"- {error}")
         sys.exit(1)
+    
+    if headless:
+        AppConfig.ensure_directories()
+        sys.exit(run_record(args) if args.command == "record" else run_recover(args))
+    
+    sys.exit(run_gui())
 
 if __name__ == "__main__":
+    # 多进程录制管线在打包后的程序中也能启动子进程
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
@@ -23,14 +23,39 @@ class AppConfig:
     # 支持的视频格式
     SUPPORTED_FORMATS = ["MP4", "AVI", "MOV", "WebM"]
     
-    # 质量设置
+    # 质量设置（FFmpeg管道编码器使用其中的编码器、预设、CRF和码率）
     QUALITY_SETTINGS = {
-        "低质量": {"bitrate": "1M", "crf": 28},
-        "中等质量": {"bitrate": "2M", "crf": 23},
-        "高质量": {"bitrate": "4M", "crf": 18},
-        "超高质量": {"bitrate": "8M", "crf": 15}
+        "低质量": {"bitrate": "1M", "crf": 28, "preset": "veryfast", "codec": "libx264"},
+        "中等质量": {"bitrate": "2M", "crf": 23, "preset": "veryfast", "codec": "libx264"},
+        "高质量": {"bitrate": "4M", "crf": 18, "preset": "veryfast", "codec": "libx264"},
+        "超高质量": {"bitrate": "8M", "crf": 15, "preset": "faster", "codec": "libx264"}
     }
     
+    # 容器不支持H.264时使用的视频编码器
+    FORMAT_VIDEO_CODECS = {
+        "WebM": "libvpx-vp9"
+    }
+    
+    # 实时封装时各容器使用的音频编码器
+    FORMAT_AUDIO_CODECS = {
+        "MP4": "aac",
+        "MOV": "aac",
+        "AVI": "libmp3lame",
+        "WebM": "libopus"
+    }
+    AUDIO_BITRATE = "128k"
+    
+    # 视频编码后端: ffmpeg（管道编码，不可用时自动回退OpenCV）、opencv
+    ENCODER_BACKENDS = ["ffmpeg", "opencv"]
+    DEFAULT_ENCODER_BACKEND = "ffmpeg"
+    
+    # 录制管线：thread 在本进程的线程中捕获和编码，process 使用独立进程和共享内存
+    PIPELINE_MODES = ["thread", "process"]
+    DEFAULT_PIPELINE_MODE = "thread"
+    
+    # 后台处理任务：每个ffmpeg任务的线程数，默认并发数为 CPU核心数 / 该值
+    FFMPEG_THREADS_PER_JOB = 2
+    
     # FPS选项
     FPS_OPTIONS = [15, 24, 30, 60]
     
@@ -54,12 +79,18 @@ class AppConfig:
         """获取临时文件目录"""
         return str(Path.home() / ".screenrecorder" / "temp")
     
+    @staticmethod
+    def get_cache_dir():
+        """获取缓存文件目录"""
+        return str(Path.home() / ".screenrecorder" / "cache")
+    
     @staticmethod
     def ensure_directories():
         """确保必要的目录存在"""
         dirs = [
             AppConfig.get_default_output_dir(),
-            AppConfig.get_temp_dir()
+            AppConfig.get_temp_dir(),
+            AppConfig.get_cache_dir()
         ]
         for dir_path in dirs:
             Path(dir_path).mkdir(parents=True, exist_ok=True)
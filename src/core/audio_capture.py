@@ -3,8 +3,14 @@
 音频捕获模块
 """
 
+import os
+import queue
+import shutil
+import tempfile
 import threading
+import time
 import wave
+from collections import deque
 import pyaudio
 import numpy as np
 from typing import Optional, List
@@ -13,6 +19,9 @@ from PyQt6.QtCore import QObject, pyqtSignal
 class AudioCapture(QObject):
     """音频捕获类"""
     
+    # 用于音量监控的最近音频块数量
+    METER_CHUNKS = 32
+    
     # 信号
     audio_data_ready = pyqtSignal(bytes)     # 音频数据就绪
     capture_started = pyqtSignal()           # 开始录制
@@ -24,6 +33,10 @@ class AudioCapture(QObject):
         self.audio = pyaudio.PyAudio()
         self.stream = None
         self.is_recording = False
+        self.is_paused = False
+        # 暂停/恢复时刻（time.monotonic），音频流保持打开，回调按这两个时刻裁剪音频块
+        self._pause_at = None
+        self._resume_at = None
         self.record_thread = None
         
         # macOS音频修复 - 优化音频参数
@@ -41,12 +54,22 @@ class AudioCapture(QObject):
             self.chunk_size = 1024
             self.format = pyaudio.paInt16
         
-        # 音频数据缓冲
-        self.audio_buffer = []
+        # 最近音频块的有界缓冲，仅用于音量监控
+        self.audio_buffer = deque(maxlen=self.METER_CHUNKS)
         self.buffer_lock = threading.Lock()
 
+        # 录制期间在后台线程中把音频流式写入WAV文件，内存占用不随时长增长
+        self.spill_path = None
+        self._spill_queue = None
+        self._spill_thread = None
+        self._spill_owned = False  # 溢写文件是否为自动创建的临时文件
+        self.spilled_bytes = 0
+
         # 音量监控
         self.volume_level = 0.0
+
+        # 正在发出的音频块首个采样的捕获时间（time.monotonic），供直连的槽函数读取
+        self.chunk_time = 0.0
         
         print(f"音频参数: {self.sample_rate}Hz, {self.channels}声道, 缓冲区{self.chunk_size}")
 
@@ -83,20 +106,99 @@ class AudioCapture(QObject):
         self.channels = channels
         self.chunk_size = chunk_size
     
+    def _chunk_capture_time(self, frame_count: int, time_info) -> float:
+        """音频块首个采样的捕获时间
+
+        优先使用PortAudio提供的ADC时间（与回调时刻之差不受回调调度延迟影响），
+        不可用时按块时长从当前时间倒推。
+        """
+        now = time.monotonic()
+        try:
+            current = time_info.get('current_time', 0.0)
+            adc = time_info.get('input_buffer_adc_time', 0.0)
+            if current > 0 and adc > 0 and 0 <= current - adc < 1.0:
+                return now - (current - adc)
+        except (AttributeError, TypeError):
+            pass
+        return now - frame_count / self.sample_rate
+
+    def _gate_chunk(self, in_data: bytes, frame_count: int, chunk_time: float):
+        """按暂停/恢复时刻裁剪音频块，返回 (数据, 首个采样的捕获时间)
+
+        暂停后只保留块中暂停时刻之前的采样，恢复后丢弃块中恢复时刻之前的采样，
+        暂停区间被精确地从音频中去除。
+        """
+        if frame_count <= 0:
+            return in_data, chunk_time
+        frame_bytes = len(in_data) // frame_count
+        pause_at = self._pause_at
+        if pause_at is not None:
+            keep = min(frame_count, max(0, round((pause_at - chunk_time) * self.sample_rate)))
+            return in_data[:keep * frame_bytes], chunk_time
+        resume_at = self._resume_at
+        if resume_at is not None and chunk_time < resume_at:
+            skip = min(frame_count, max(0, round((resume_at - chunk_time) * self.sample_rate)))
+            return in_data[skip * frame_bytes:], chunk_time + skip / self.sample_rate
+        return in_data, chunk_time
+
     def _audio_callback(self, in_data, frame_count, time_info, status):
         """音频回调函数"""
         try:
             if self.is_recording and in_data:
+                # 暂停期间音量监控照常更新
                 with self.buffer_lock:
                     self.audio_buffer.append(in_data)
+                in_data, self.chunk_time = self._gate_chunk(
+                    in_data, frame_count, self._chunk_capture_time(frame_count, time_info)
+                )
+                if not in_data:
+                    return (None, pyaudio.paContinue)
+                spill_queue = self._spill_queue
+                if spill_queue is not None:
+                    spill_queue.put(in_data)
                 self.audio_data_ready.emit(in_data)
             return (None, pyaudio.paContinue)
         except Exception as e:
             print(f"音频回调错误: {e}")
             return (None, pyaudio.paAbort)
     
+    def open_stream(self, device_index: Optional[int] = None) -> bool:
+        """打开音频流但暂不采集，返回设备是否可用
+
+        调用方可以先确认音频可用、接好音频数据的去向，再用 start_recording() 开始采集，
+        开始后的第一个音频块就能送达。
+        """
+        if self.stream is not None:
+            return True
+        try:
+            self.stream = self.audio.open(
+                format=self.format,
+                channels=self.channels,
+                rate=self.sample_rate,
+                input=True,
+                input_device_index=device_index,
+                frames_per_buffer=self.chunk_size,
+                stream_callback=self._audio_callback,
+                start=False
+            )
+            return True
+        except Exception as e:
+            self.stream = None
+            self.error_occurred.emit(f"开始音频录制失败: {str(e)}")
+            return False
+    
+    def close_stream(self):
+        """关闭已打开但未开始采集的音频流"""
+        if self.is_recording or self.stream is None:
+            return
+        try:
+            self.stream.close()
+        except Exception:
+            pass  # 忽略关闭流时的错误
+        self.stream = None
+    
     def start_recording(self, device_index: Optional[int] = None):
-        """开始录制音频"""
+        """开始录制音频（音频流尚未打开时先打开）"""
         if self.is_recording:
             return
         
@@ -106,16 +208,12 @@ class AudioCapture(QObject):
                 self.audio_buffer.clear()
             
             # 创建音频流
-            self.stream = self.audio.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.sample_rate,
-                input=True,
-                input_device_index=device_index,
-                frames_per_buffer=self.chunk_size,
-                stream_callback=self._audio_callback
-            )
+            if not self.open_stream(device_index):
+                return
             
+            self.is_paused = False
+            self._pause_at = None
+            self._resume_at = None
             self.is_recording = True
             self.stream.start_stream()
             self.capture_started.emit()
@@ -130,6 +228,8 @@ class AudioCapture(QObject):
 
         try:
             self.is_recording = False
+            self.is_paused = False
+            self._pause_at = None
 
             if self.stream:
                 try:
@@ -150,8 +250,94 @@ class AudioCapture(QObject):
         except Exception as e:
             self.error_occurred.emit(f"停止音频录制失败: {str(e)}")
     
+    def pause(self, at: Optional[float] = None):
+        """暂停录制音频
+
+        音频流保持打开，之后的采样不再写入文件也不再发出audio_data_ready，
+        resume() 后立即继续，不会丢失恢复后的第一批采样。
+        at 为暂停时刻（time.monotonic），默认为当前时间。
+        """
+        if not self.is_recording or self.is_paused:
+            return
+        self._pause_at = at if at is not None else time.monotonic()
+        self.is_paused = True
+
+    def resume(self, at: Optional[float] = None):
+        """恢复录制音频，at 为恢复时刻（time.monotonic），默认为当前时间"""
+        if not self.is_paused:
+            return
+        self._resume_at = at if at is not None else time.monotonic()
+        self._pause_at = None
+        self.is_paused = False
+
+    def begin_spill(self, filename: Optional[str] = None):
+        """开始把录制的音频流式写入WAV文件
+
+        未指定文件名时写入临时目录。暂停/恢复（stop_recording/start_recording）
+        期间文件保持打开，直到 finish_spill() 或 save_audio() 结束写入。
+        """
+        if self._spill_thread is not None:
+            return
+
+        self._spill_owned = filename is None
+        if filename is None:
+            fd, filename = tempfile.mkstemp(prefix="audio_spill_", suffix=".wav")
+            os.close(fd)
+
+        wav_file = wave.open(filename, 'wb')
+        wav_file.setnchannels(self.channels)
+        wav_file.setsampwidth(self.audio.get_sample_size(self.format))
+        wav_file.setframerate(self.sample_rate)
+
+        self.spill_path = filename
+        self.spilled_bytes = 0
+        self._spill_queue = queue.SimpleQueue()
+        self._spill_thread = threading.Thread(
+            target=self._spill_loop, args=(self._spill_queue, wav_file), daemon=True
+        )
+        self._spill_thread.start()
+
+    def _spill_loop(self, spill_queue: queue.SimpleQueue, wav_file):
+        """溢写线程：把音频块写入WAV文件"""
+        try:
+            while True:
+                data = spill_queue.get()
+                if data is None:
+                    break
+                wav_file.writeframesraw(data)
+                self.spilled_bytes += len(data)
+        except Exception as e:
+            self.error_occurred.emit(f"写入音频文件失败: {str(e)}")
+        finally:
+            try:
+                # 关闭时回填WAV头中的数据长度
+                wav_file.close()
+            except Exception:
+                pass
+
+    def finish_spill(self) -> Optional[str]:
+        """结束溢写并返回WAV文件路径（未开始溢写时返回None）"""
+        if self._spill_thread is None:
+            return None
+
+        self._spill_queue.put(None)
+        self._spill_thread.join()
+        self._spill_queue = None
+        self._spill_thread = None
+        return self.spill_path
+
+    def discard_spill(self):
+        """结束溢写并删除自动创建的临时文件"""
+        path = self.finish_spill()
+        if path and self._spill_owned and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.spill_path = None
+
     def get_audio_data(self) -> bytes:
-        """获取录制的音频数据"""
+        """获取最近的音频数据（仅保留用于音量监控的少量音频块）"""
         with self.buffer_lock:
             if self.audio_buffer:
                 data = b''.join(self.audio_buffer)
@@ -162,7 +348,21 @@ class AudioCapture(QObject):
     def save_audio(self, filename: str):
         """保存音频到文件"""
         try:
-            # 获取所有音频数据
+            # 录制期间已流式写入文件，只需结束写入并移动到目标位置
+            spill_path = self.finish_spill()
+            if spill_path:
+                if self.spilled_bytes == 0:
+                    print("没有音频数据可保存")
+                    if self._spill_owned:
+                        os.remove(spill_path)
+                    return
+                if os.path.abspath(spill_path) != os.path.abspath(filename):
+                    shutil.move(spill_path, filename)
+                self.spill_path = None
+                print(f"音频文件已保存: {filename} ({self.spilled_bytes} 字节)")
+                return
+
+            # 未启用溢写时只能保存缓冲中的最近音频
             with self.buffer_lock:
                 if not self.audio_buffer:
                     print("没有音频数据可保存")
@@ -0,0 +1,184 @@
+"""
+音画同步模块
+
+每帧带有捕获时间戳（time.monotonic，已扣除暂停时长）。录制音频时以音频采样时钟为主时钟：
+第N个采样的呈现时间为 N / 采样率，每个音频块到达时用其首个采样的捕获时间校准
+"录制时钟 → 音频时间"的偏移，视频帧按换算后的呈现时间放入输出帧槽。
+没有音频时以第一帧的捕获时间为零点。
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+class AVSync:
+    """音画同步时钟与帧槽分配
+
+    place() 在编码线程中为每帧计算呈现位置：落后一帧以上时先重复上一帧补齐，
+    超前一帧以上时丢弃该帧，其余情况直接写入，偏差始终小于一帧且抖动不会引起反复修正。
+    """
+
+    # 等待第一个音频块的最长时间（秒），超时后暂以录制时钟为准
+    AUDIO_WAIT = 2.0
+    # 偏移突变超过该值（秒）时直接采用新偏移（如暂停后音频流重新启动）
+    SNAP_THRESHOLD = 0.1
+    # 偏移的平滑系数，滤除音频回调的调度抖动
+    SMOOTHING = 0.02
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._anchored = threading.Event()
+        self.reset(30)
+
+    def reset(self, fps: float, sample_rate: int = 0):
+        """开始新的录制，sample_rate为0表示没有音频"""
+        with self._lock:
+            self.fps = max(1.0, float(fps))
+            self.sample_rate = sample_rate
+            self.audio_samples = 0
+            self.audio_ended = False
+            self.offset = None  # 音频时间 - 录制时钟
+            self.origin = None  # 没有音频时第一帧的时间戳
+            self.next_slot = 0  # 下一个输出帧槽
+            self.last_hold_timestamp = None  # 最后一次确认画面未变化的时间戳
+            self.paused = 0.0  # 累计暂停时长（秒），捕获时间戳扣除后即为录制时钟
+            self.frames_captured = 0
+            self.frames_written = 0
+            self.frames_repeated = 0
+            self.frames_dropped = 0
+            self.clock_resets = 0
+            self.max_drift = 0.0  # 写入帧的最大偏差（秒）
+            self._first_anchor = None  # (录制时钟, 音频时间)，用于估计时钟速率差
+            self._last_anchor = None
+            self._anchored.clear()
+
+    @property
+    def audio_master(self) -> bool:
+        """是否以音频时钟为主时钟"""
+        return self.sample_rate > 0
+
+    @property
+    def audio_duration(self) -> float:
+        """已写入的音频时长（秒）"""
+        return self.audio_samples / self.sample_rate if self.sample_rate else 0.0
+
+    def add_audio(self, samples: int, first_sample_time: float):
+        """记录写入输出的音频块（在音频回调线程中调用）
+
+        first_sample_time 为该块首个采样的捕获时间，与视频帧时间戳使用同一时钟。
+        """
+        if samples <= 0 or not self.sample_rate:
+            return
+        with self._lock:
+            media = self.audio_samples / self.sample_rate
+            observed = media - first_sample_time
+            if self.offset is None:
+                self.offset = observed
+                self._first_anchor = (first_sample_time, media)
+            elif abs(observed - self.offset) > self.SNAP_THRESHOLD:
+                self.offset = observed
+                self.clock_resets += 1
+                self._first_anchor = (first_sample_time, media)
+            else:
+                self.offset += (observed - self.offset) * self.SMOOTHING
+            self._last_anchor = (first_sample_time, media)
+            self.audio_samples += samples
+        self._anchored.set()
+
+    def finish_audio(self):
+        """音频已停止，之后捕获的超出音频结尾的帧不再写入"""
+        self.audio_ended = True
+        self._anchored.set()
+
+    def media_time(self, timestamp: float) -> float:
+        """把捕获时间戳换算为输出中的呈现时间（秒）"""
+        if self.audio_master and not self._anchored.is_set():
+            if not self._anchored.wait(self.AUDIO_WAIT):
+                print("等待音频超时，暂以录制时钟放置视频帧")
+        with self._lock:
+            if self.offset is not None:
+                return timestamp + self.offset
+            if self.origin is None:
+                self.origin = timestamp
+            return timestamp - self.origin
+
+    def place(self, timestamp: float) -> Tuple[int, bool]:
+        """为一帧分配帧槽，返回 (写入前需要重复上一帧的次数, 是否写入该帧)"""
+        self.frames_captured += 1
+        position = self.media_time(timestamp) * self.fps
+        if self.audio_ended and self.offset is not None and position >= round(self.audio_duration * self.fps):
+            self.frames_dropped += 1
+            return 0, False
+
+        error = position - self.next_slot
+        if error <= -1:
+            self.frames_dropped += 1
+            return 0, False
+        repeats = int(error) if error >= 1 else 0
+        self.max_drift = max(self.max_drift, abs(error - repeats) / self.fps)
+        self.frames_repeated += repeats
+        self.frames_written += 1
+        self.next_slot += repeats + 1
+        return repeats, True
+
+    def hold(self, timestamp: float):
+        """记录画面未变化的时间戳（在捕获线程中调用）"""
+        self.last_hold_timestamp = timestamp
+
+    def tail_frames(self) -> int:
+        """结束时还需补齐的帧数：视频补齐到音频结尾，以及最后一帧之后画面静止的时长"""
+        end = self.audio_duration
+        last_hold_timestamp = self.last_hold_timestamp
+        if last_hold_timestamp is not None:
+            end = max(end, self.media_time(last_hold_timestamp) + 1.0 / self.fps)
+        return max(0, round(end * self.fps) - self.next_slot)
+
+    def add_tail(self, count: int):
+        """记录补齐的结尾帧"""
+        self.frames_repeated += count
+        self.next_slot += count
+
+    def report(self) -> dict:
+        """同步报告"""
+        with self._lock:
+            first, last = self._first_anchor, self._last_anchor
+        clock_ppm = 0.0
+        if first and last and last[0] - first[0] > 10:
+            # 音频时钟相对录制时钟（time.monotonic）的速率差
+            clock_ppm = ((last[1] - first[1]) / (last[0] - first[0]) - 1.0) * 1e6
+        video_duration = self.next_slot / self.fps
+        return {
+            "clock": "audio" if self.audio_master and self.offset is not None else "monotonic",
+            "fps": self.fps,
+            "frames_captured": self.frames_captured,
+            "frames_written": self.frames_written,
+            "frames_repeated": self.frames_repeated,
+            "frames_dropped": self.frames_dropped,
+            "clock_resets": self.clock_resets,
+            "video_duration": round(video_duration, 6),
+            "audio_duration": round(self.audio_duration, 6),
+            "max_drift_ms": round(self.max_drift * 1000, 3),
+            "end_drift_ms": round((video_duration - self.audio_duration) * 1000, 3) if self.audio_master else 0.0,
+            "audio_clock_ppm": round(clock_ppm, 1)
+        }
+
+    @staticmethod
+    def report_path(output_path: str) -> Path:
+        """同步报告的路径（与输出文件同名，扩展名为 .sync.json）"""
+        return Path(output_path).with_suffix(".sync.json")
+
+    def write_report(self, output_path: str) -> Optional[str]:
+        """把同步报告写到输出文件旁边，返回报告路径"""
+        path = self.report_path(output_path)
+        try:
+            report = self.report()
+            report["file"] = Path(output_path).name
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"音画同步: 最大偏差{report['max_drift_ms']:.1f}ms, 结尾偏差{report['end_drift_ms']:.1f}ms, "
+                  f"重复{report['frames_repeated']}帧, 丢弃{report['frames_dropped']}帧")
+            return str(path)
+        except Exception as e:
+            print(f"写入同步报告失败: {e}")
+            return None
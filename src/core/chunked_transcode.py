@@ -0,0 +1,154 @@
+"""
+分块并行转码模块
+
+在关键帧处把输入切成N块，每块视频由独立的ffmpeg进程转码；音频由一个进程完整转码
+（分块编码音频会在拼接处留下编码器延迟造成的间隙）。全部完成后用concat分离器
+无损拼接视频块并混入音频，进度按各块已输出的媒体时间汇总。
+"""
+
+import bisect
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config.settings import AppConfig
+from core.ffmpeg_progress import run_processes
+from core.media_probe import find_keyframes
+from core.segment_output import concat_segments
+
+# 每块的最短时长（秒），块太短时进程启动和拼接的开销超过并行收益
+MIN_CHUNK_SECONDS = 10.0
+
+def plan_chunks(keyframes: List[float], duration: float, chunks: int,
+                min_chunk_seconds: float = MIN_CHUNK_SECONDS) -> List[Tuple[float, Optional[float]]]:
+    """在最接近等分点的关键帧处分块，返回 (开始, 结束)，最后一块结束为None（到文件末尾）
+
+    无法分成至少两块时返回空列表。
+    """
+    chunks = min(chunks, int(duration // min_chunk_seconds)) if min_chunk_seconds > 0 else chunks
+    if chunks < 2 or not keyframes:
+        return []
+
+    bounds = [0.0]
+    for i in range(1, chunks):
+        target = duration * i / chunks
+        index = bisect.bisect_left(keyframes, target)
+        candidates = keyframes[max(0, index - 1):index + 1]
+        nearest = min(candidates, key=lambda t: abs(t - target))
+        if nearest - bounds[-1] >= min_chunk_seconds and duration - nearest >= min_chunk_seconds:
+            bounds.append(nearest)
+    if len(bounds) < 2:
+        return []
+    return list(zip(bounds, bounds[1:] + [None]))
+
+class ChunkedTranscode:
+    """一次分块并行转码
+
+    plan() 在工作线程中查找关键帧并分块，run() 同时启动所有块的进程并等待完成。
+    每个进程占用调度器的一个并发槽，plan() 之前用 limit_processes() 按分配到的槽数限制块数。
+    启动的进程登记在 job.processes 中，取消任务时由调度器结束。
+    """
+
+    def __init__(self, ffmpeg_path: str, input_path: str, output_path: str,
+                 encode_args: List[str], chunks: int, threads_per_chunk: int = AppConfig.FFMPEG_THREADS_PER_JOB,
+                 has_audio: bool = True, fps: float = 0.0, work_dir: Optional[str] = None):
+        self.ffmpeg_path = ffmpeg_path
+        self.input_path = input_path
+        self.output_path = output_path
+        self.encode_args = list(encode_args)
+        self.max_chunks = chunks
+        self.threads_per_chunk = threads_per_chunk
+        self.has_audio = has_audio
+        self.fps = fps
+        self.work_dir = Path(work_dir) if work_dir else None
+        self.suffix = Path(output_path).suffix or ".mp4"
+        self.chunks = []
+        self.duration = 0.0
+
+    def processes_wanted(self) -> int:
+        """按最大块数同时运行的进程数（音频单独一个进程）"""
+        return self.max_chunks + (1 if self.has_audio else 0)
+
+    def limit_processes(self, processes: int):
+        """限制同时运行的进程数，块数相应减少（少于两块时不分块）"""
+        self.max_chunks = min(self.max_chunks, processes - (1 if self.has_audio else 0))
+
+    def process_count(self) -> int:
+        """分块后实际运行的进程数"""
+        return len(self.chunks) + (1 if self.has_audio else 0)
+
+    def plan(self, duration: float) -> bool:
+        """查找关键帧并分块，返回是否值得分块转码"""
+        self.duration = duration
+        if self.max_chunks < 2 or duration < 2 * MIN_CHUNK_SECONDS:
+            return False
+        keyframes = find_keyframes(self.ffmpeg_path, self.input_path)
+        self.chunks = plan_chunks(keyframes, duration, self.max_chunks)
+        if self.chunks:
+            print(f"分块并行转码: {len(self.chunks)}块（{len(keyframes)}个关键帧）")
+        return bool(self.chunks)
+
+    def _chunk_path(self, index: int) -> Path:
+        return self.work_dir / f"chunk_{index:03d}{self.suffix}"
+
+    def _audio_path(self) -> Path:
+        return self.work_dir / f"audio{self.suffix}"
+
+    def build_chunk_cmd(self, index: int) -> List[str]:
+        """构建一块视频的转码命令
+
+        从块起点（关键帧）处输入定位，结束时间减去半帧，保证下一块的首帧不会被重复编码。
+        """
+        start, end = self.chunks[index]
+        cmd = [self.ffmpeg_path, '-ss', f'{start:.6f}', '-i', self.input_path]
+        if end is not None:
+            margin = 0.5 / self.fps if self.fps > 0 else 0.001
+            cmd.extend(['-t', f'{end - start - margin:.6f}'])
+        cmd.extend(['-map', '0:v:0', '-an', '-sn'])
+        cmd.extend(self.encode_args)
+        cmd.extend(['-threads', str(self.threads_per_chunk), '-y', str(self._chunk_path(index))])
+        return cmd
+
+    def build_audio_cmd(self) -> List[str]:
+        """构建完整音轨的转码命令（视频参数对音频流无效，只会被ffmpeg忽略）"""
+        cmd = [self.ffmpeg_path, '-i', self.input_path, '-vn', '-sn']
+        cmd.extend(self.encode_args)
+        cmd.extend(['-y', str(self._audio_path())])
+        return cmd
+
+    def chunk_duration(self, index: int) -> float:
+        """块的时长（秒）"""
+        start, end = self.chunks[index]
+        return (end if end is not None else self.duration) - start
+
+    def run(self, job, on_progress: Optional[Callable[[Dict], None]] = None) -> Tuple[bool, str]:
+        """转码所有块并拼接，返回 (是否成功, 错误信息)"""
+        if self.work_dir is None:
+            self.work_dir = Path(AppConfig.get_temp_dir()) / "chunks" / job.job_id
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            return self._run(job, on_progress)
+        finally:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _run(self, job, on_progress) -> Tuple[bool, str]:
+        started = time.monotonic()
+        # 同时启动所有进程（块数已按分配到的并发槽数确定），音频不计入进度
+        commands = [(self.build_chunk_cmd(i), self.chunk_duration(i)) for i in range(len(self.chunks))]
+        if self.has_audio:
+            commands.append((self.build_audio_cmd(), 0.0))
+        success, error = run_processes(job, commands, self.duration, on_progress)
+        if not success:
+            return False, error
+
+        # 拼接只复制数据，不重新编码
+        success, error = concat_segments(
+            [str(self._chunk_path(i)) for i in range(len(self.chunks))], self.output_path,
+            self.ffmpeg_path, format_type=self.suffix.lstrip(".").upper(),
+            timeout=max(600, self.duration),
+            audio_path=str(self._audio_path()) if self.has_audio else None
+        )
+        if success:
+            print(f"分块转码完成: {len(self.chunks)}块, 用时{time.monotonic() - started:.1f}秒")
+        return success, error
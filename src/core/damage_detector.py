@@ -0,0 +1,115 @@
+"""
+画面变化（damage）检测模块
+
+把帧划分为网格瓦片并计算每块的哈希，与上一帧比较以判断画面是否变化。
+"""
+
+import zlib
+from typing import Optional, Tuple
+
+import numpy as np
+
+class DamageDetector:
+    """瓦片哈希变化检测器
+
+    先对每个水平条带（tile_size行，内存连续）计算CRC32，
+    只有条带变化时才逐列计算该条带内各瓦片的哈希，
+    静止画面的检测开销约等于一次顺序读取整帧。
+    """
+
+    TILE_SIZE = 64
+
+    def __init__(self, tile_size: int = TILE_SIZE):
+        self.tile_size = max(8, tile_size)
+        self._shape = None
+        self._band_hashes = None
+        self._tile_hashes = None
+
+        # 最近一次检测的结果
+        self.dirty_tiles = 0
+        self.total_tiles = 0
+        self.dirty_rect = None  # (x, y, 宽, 高)
+
+        # 统计信息
+        self.frames_checked = 0
+        self.frames_changed = 0
+
+    def reset(self):
+        """清除参考帧，下一帧总是视为已变化"""
+        self._shape = None
+        self._band_hashes = None
+        self._tile_hashes = None
+
+    def _tile_grid(self, height: int, width: int) -> Tuple[int, int]:
+        """瓦片行列数"""
+        size = self.tile_size
+        return (height + size - 1) // size, (width + size - 1) // size
+
+    def update(self, frame: np.ndarray) -> bool:
+        """检测帧相对上一帧是否变化，并把它作为新的参考帧"""
+        self.frames_checked += 1
+        frame = np.ascontiguousarray(frame)
+        height, width = frame.shape[:2]
+        rows, cols = self._tile_grid(height, width)
+        size = self.tile_size
+
+        if self._shape != frame.shape:
+            # 首帧或尺寸变化：整帧视为已变化
+            self._shape = frame.shape
+            self._band_hashes = np.zeros(rows, dtype=np.uint32)
+            self._tile_hashes = np.zeros((rows, cols), dtype=np.uint32)
+            for row in range(rows):
+                band = frame[row * size:(row + 1) * size]
+                self._band_hashes[row] = zlib.crc32(band)
+                self._hash_band_tiles(band, row, cols)
+            self._set_result(rows * cols, rows * cols, (0, 0, width, height))
+            return True
+
+        dirty = 0
+        x0, y0, x1, y1 = width, height, 0, 0
+        for row in range(rows):
+            band = frame[row * size:(row + 1) * size]
+            band_hash = zlib.crc32(band)
+            if band_hash == self._band_hashes[row]:
+                continue
+            self._band_hashes[row] = band_hash
+
+            changed = self._hash_band_tiles(band, row, cols)
+            if len(changed):
+                dirty += len(changed)
+                x0 = min(x0, int(changed[0]) * size)
+                x1 = max(x1, min(width, (int(changed[-1]) + 1) * size))
+                y0 = min(y0, row * size)
+                y1 = max(y1, min(height, (row + 1) * size))
+
+        rect = (x0, y0, x1 - x0, y1 - y0) if dirty else None
+        self._set_result(dirty, rows * cols, rect)
+        return dirty > 0
+
+    def _hash_band_tiles(self, band: np.ndarray, row: int, cols: int) -> np.ndarray:
+        """计算条带内各瓦片的哈希，返回变化的列号"""
+        size = self.tile_size
+        hashes = np.fromiter(
+            (zlib.crc32(np.ascontiguousarray(band[:, col * size:(col + 1) * size])) for col in range(cols)),
+            dtype=np.uint32, count=cols
+        )
+        changed = np.flatnonzero(hashes != self._tile_hashes[row])
+        self._tile_hashes[row] = hashes
+        return changed
+
+    def _set_result(self, dirty: int, total: int, rect: Optional[Tuple[int, int, int, int]]):
+        """保存检测结果"""
+        self.dirty_tiles = dirty
+        self.total_tiles = total
+        self.dirty_rect = rect
+        if dirty:
+            self.frames_changed += 1
+
+    def get_stats(self) -> dict:
+        """获取检测统计"""
+        return {
+            "checked": self.frames_checked,
+            "changed": self.frames_changed,
+            "unchanged": self.frames_checked - self.frames_changed,
+            "tile_size": self.tile_size
+        }
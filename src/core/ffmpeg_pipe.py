@@ -0,0 +1,427 @@
+"""
+FFmpeg管道编码模块
+
+通过标准输入把原始帧持续写入一个常驻的ffmpeg进程进行编码。
+"""
+
+import os
+import queue
+import subprocess
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+import numpy as np
+
+from config.settings import AppConfig
+from utils.ffmpeg_locator import find_ffmpeg, get_ffmpeg_locator
+
+def get_video_codec(format_type: str, quality: str) -> str:
+    """输出格式和质量对应的视频编码器"""
+    settings = AppConfig.QUALITY_SETTINGS.get(quality, AppConfig.QUALITY_SETTINGS[AppConfig.DEFAULT_QUALITY])
+    return AppConfig.FORMAT_VIDEO_CODECS.get(format_type, settings["codec"])
+
+def get_audio_codec(format_type: str) -> str:
+    """输出格式对应的音频编码器"""
+    return AppConfig.FORMAT_AUDIO_CODECS.get(format_type, "aac")
+
+def find_missing_encoders(encoders: List[str], ffmpeg_path: Optional[str] = None) -> List[str]:
+    """FFmpeg不支持的编码器（能力信息未知时视为都支持，由ffmpeg自己报错）"""
+    locator = get_ffmpeg_locator()
+    if not locator.get_info(ffmpeg_path).get("encoders"):
+        return []
+    return [name for name in encoders if not locator.has_encoder(name, ffmpeg_path)]
+
+def build_video_codec_args(format_type: str, quality: str) -> List[str]:
+    """根据 AppConfig.QUALITY_SETTINGS 构建视频编码参数"""
+    settings = AppConfig.QUALITY_SETTINGS.get(quality, AppConfig.QUALITY_SETTINGS[AppConfig.DEFAULT_QUALITY])
+    codec = get_video_codec(format_type, quality)
+    bitrate = settings["bitrate"]
+    crf = str(settings["crf"])
+
+    if codec.startswith("libvpx"):
+        # VP8/VP9: 受限质量模式，使用实时编码速度
+        return ["-c:v", codec, "-crf", crf, "-b:v", bitrate,
+                "-deadline", "realtime", "-cpu-used", "8", "-row-mt", "1"]
+
+    # x264/x265: CRF + 码率上限
+    bufsize = f"{int(bitrate.rstrip('MmKk')) * 2}{bitrate[-1]}"
+    return ["-c:v", codec, "-preset", settings["preset"], "-crf", crf,
+            "-maxrate", bitrate, "-bufsize", bufsize]
+
+def build_audio_codec_args(format_type: str) -> List[str]:
+    """构建音频编码参数"""
+    codec = get_audio_codec(format_type)
+    return ["-c:a", codec, "-b:a", AppConfig.AUDIO_BITRATE]
+
+def _ebml_element(element_id: bytes, payload: bytes) -> bytes:
+    """EBML元素：ID + 8字节长度 + 内容"""
+    return element_id + b'\x01' + len(payload).to_bytes(7, 'big') + payload
+
+def _ebml_uint(element_id: bytes, value: int) -> bytes:
+    """无符号整数EBML元素"""
+    return _ebml_element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big'))
+
+class TimestampedFrameStream:
+    """带时间戳的原始帧流（最简Matroska：一条未压缩视频轨，每帧一个Cluster）
+
+    原始帧管道没有时间戳，ffmpeg只能按固定帧率逐帧解释，画面未变化的帧槽也必须写入重复帧。
+    可变帧率时改用该格式，每帧带上所在帧槽的时间，未变化的帧槽不再写入。
+    """
+
+    TIMESTAMP_SCALE = 1000  # 时间戳单位（纳秒），即微秒
+    # 像素格式对应的FourCC（ffmpeg据此识别未压缩视频的像素格式）
+    FOURCC = {"bgra": b'BGRA', "bgr24": b'BGR\x18'}
+
+    def __init__(self, fps: float, frame_size: Tuple[int, int], pixel_format: str):
+        if pixel_format not in self.FOURCC:
+            raise ValueError(f"不支持的像素格式: {pixel_format}")
+        self.fps = fps
+        self.frame_size = frame_size
+        self.pixel_format = pixel_format
+
+    def header(self) -> bytes:
+        """流头：EBML头、未知长度的Segment、Info和Tracks"""
+        width, height = self.frame_size
+        ebml = _ebml_element(b'\x1a\x45\xdf\xa3',
+                             _ebml_uint(b'\x42\x86', 1) + _ebml_uint(b'\x42\xf7', 1) +
+                             _ebml_uint(b'\x42\xf2', 4) + _ebml_uint(b'\x42\xf3', 8) +
+                             _ebml_element(b'\x42\x82', b'matroska') +
+                             _ebml_uint(b'\x42\x87', 4) + _ebml_uint(b'\x42\x85', 2))
+        info = _ebml_element(b'\x15\x49\xa9\x66',
+                             _ebml_uint(b'\x2a\xd7\xb1', self.TIMESTAMP_SCALE) +
+                             _ebml_element(b'\x4d\x80', b'ScreenRecorder') +
+                             _ebml_element(b'\x57\x41', b'ScreenRecorder'))
+        video = _ebml_element(b'\xe0',
+                              _ebml_uint(b'\xb0', width) + _ebml_uint(b'\xba', height) +
+                              _ebml_element(b'\x2e\xb5\x24', self.FOURCC[self.pixel_format]))
+        track = _ebml_element(b'\xae',
+                              _ebml_uint(b'\xd7', 1) + _ebml_uint(b'\x73\xc5', 1) +
+                              _ebml_uint(b'\x83', 1) + _ebml_uint(b'\x9c', 0) +
+                              _ebml_element(b'\x86', b'V_UNCOMPRESSED') +
+                              _ebml_uint(b'\x23\xe3\x83', round(1e9 / self.fps)) + video)
+        tracks = _ebml_element(b'\x16\x54\xae\x6b', track)
+        # Segment长度未知（流式写入），内容随后逐个Cluster写出
+        return ebml + b'\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff' + info + tracks
+
+    def frame_header(self, slot: int, frame_bytes: int) -> bytes:
+        """一帧之前的Cluster头和SimpleBlock头，帧数据紧随其后"""
+        timestamp = round(slot * 1e9 / self.fps / self.TIMESTAMP_SCALE)
+        block_size = frame_bytes + 4  # 轨道号(1) + 相对时间(2) + 标志(1)
+        block = b'\xa3\x01' + block_size.to_bytes(7, 'big') + b'\x81\x00\x00\x80'
+        cluster_timestamp = _ebml_uint(b'\xe7', timestamp)
+        cluster_size = len(cluster_timestamp) + len(block) + frame_bytes
+        return b'\x1f\x43\xb6\x75\x01' + cluster_size.to_bytes(7, 'big') + cluster_timestamp + block
+
+class FFmpegPipeWriter:
+    """FFmpeg管道写入器
+
+    接口与 cv2.VideoWriter 保持一致（isOpened/write/release），
+    帧以原始像素格式通过stdin写入，不经过任何中间文件。
+    """
+
+    # 保留的ffmpeg错误输出行数
+    STDERR_TAIL_LINES = 50
+    # 启动后等待的时间（秒）：参数错误等ffmpeg立即退出的情况在这段时间内即可发现
+    STARTUP_GRACE_SECONDS = 0.05
+
+    def __init__(self, output_path: str, fps: int, frame_size: Tuple[int, int],
+                 format_type: str = "MP4", quality: str = "高质量",
+                 pixel_format: str = "bgra", ffmpeg_path: Optional[str] = None,
+                 extra_output_args: Optional[List[str]] = None, vfr: bool = False,
+                 segment_args: Optional[List[str]] = None):
+        self.output_path = output_path
+        self.fps = fps
+        self.frame_size = frame_size
+        self.format_type = format_type
+        self.quality = quality
+        self.pixel_format = pixel_format  # bgr24 或 bgra
+        self.ffmpeg_path = ffmpeg_path or find_ffmpeg()
+        self.extra_output_args = extra_output_args or []
+        self.vfr = vfr  # 帧带时间戳写入，画面未变化的帧槽不写入，输出可变帧率
+        self.segment_args = segment_args  # 分段输出参数（见 segment_output），此时output_path为分段文件名模板
+        self.process = None
+        self.stderr_tail = deque(maxlen=self.STDERR_TAIL_LINES)
+        self._stderr_thread = None
+        self.frames_written = 0
+        self.last_slot = -1  # 可变帧率时最近写入帧所在的帧槽
+        self._frame_stream = TimestampedFrameStream(fps, frame_size, pixel_format) if vfr else None
+
+    def build_command(self) -> List[str]:
+        """构建ffmpeg命令"""
+        width, height = self.frame_size
+        cmd = [self.ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y']
+        if self._frame_stream is not None:
+            # 输入：stdin上带时间戳的原始帧（见 TimestampedFrameStream），流头已给出全部参数，无需探测
+            cmd.extend(['-f', 'matroska', '-probesize', '32', '-analyzeduration', '0'])
+        else:
+            # 输入：stdin上的原始帧，按固定帧率逐帧解释
+            cmd.extend(['-f', 'rawvideo', '-pix_fmt', self.pixel_format,
+                        '-s', f'{width}x{height}', '-r', str(self.fps)])
+        cmd.extend(['-thread_queue_size', '64', '-i', 'pipe:0'])
+        cmd.extend(self.build_input_args())
+
+        # yuv420p要求宽高为偶数，必要时补齐一个像素
+        cmd.extend(['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p'])
+        cmd.extend(build_video_codec_args(self.format_type, self.quality))
+        if self.vfr:
+            # 保留输入时间戳，不为未写入的帧槽补帧；
+            # 相邻帧可能相隔数秒，B帧的解码延迟随之变大，会使时间戳整体偏移、容器时长错误，因此不用B帧
+            cmd.extend(['-fps_mode', 'vfr', '-bf', '0'])
+        cmd.extend(self.build_output_args())
+        cmd.extend(self.extra_output_args)
+        cmd.append(self.output_path)
+        return cmd
+
+    def build_input_args(self) -> List[str]:
+        """额外的输入参数（子类扩展）"""
+        return []
+
+    def build_output_args(self) -> List[str]:
+        """额外的输出参数（子类扩展）"""
+        if self.segment_args:
+            return list(self.segment_args)
+        if self.format_type in ("MP4", "MOV"):
+            return ['-movflags', '+faststart']
+        return []
+
+    def popen_kwargs(self) -> dict:
+        """创建进程的额外参数（子类扩展）"""
+        return {}
+
+    def required_encoders(self) -> List[str]:
+        """命令中使用的编码器（子类扩展）"""
+        return [get_video_codec(self.format_type, self.quality)]
+
+    def open(self) -> bool:
+        """启动ffmpeg进程
+
+        启动前检查编码器和输出目录，启动后等待片刻确认ffmpeg没有立即退出；
+        失败时返回False，调用方可以改用其他写入器。
+        """
+        if not self.ffmpeg_path:
+            self.stderr_tail.append("FFmpeg不可用")
+            return False
+
+        missing = find_missing_encoders(self.required_encoders(), self.ffmpeg_path)
+        if missing:
+            self.stderr_tail.append(f"FFmpeg不支持编码器: {', '.join(missing)}")
+            return False
+
+        directory = os.path.dirname(os.path.abspath(self.output_path))
+        if not os.access(directory, os.W_OK):
+            self.stderr_tail.append(f"输出目录不可写: {directory}")
+            return False
+
+        try:
+            self.process = subprocess.Popen(
+                self.build_command(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                **self.popen_kwargs()
+            )
+        except (OSError, ValueError) as e:
+            self.stderr_tail.append(str(e))
+            self.process = None
+            return False
+
+        # 持续读取stderr，避免管道写满导致ffmpeg阻塞
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+
+        if self._frame_stream is not None:
+            try:
+                self.process.stdin.write(self._frame_stream.header())
+            except (BrokenPipeError, OSError) as e:
+                self.stderr_tail.append(str(e))
+                self.release()
+                return False
+
+        try:
+            returncode = self.process.wait(timeout=self.STARTUP_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            return True
+        self.release()
+        if not self.stderr_tail:
+            self.stderr_tail.append(f"FFmpeg启动后立即退出（退出码 {returncode}）")
+        return False
+
+    def _drain_stderr(self):
+        """读取ffmpeg错误输出并保留最近若干行"""
+        try:
+            for line in iter(self.process.stderr.readline, b''):
+                self.stderr_tail.append(line.decode('utf-8', errors='replace').rstrip())
+        except Exception:
+            pass
+
+    def isOpened(self) -> bool:
+        """进程是否在运行"""
+        return self.process is not None and self.process.poll() is None
+
+    def write(self, frame: np.ndarray, slot: Optional[int] = None):
+        """写入一帧（像素格式须与pixel_format一致）
+
+        可变帧率时slot为该帧所在的帧槽（呈现时间为 slot / fps），省略时紧接上一帧；
+        固定帧率时每次写入占一个帧槽，忽略slot。
+        """
+        if self.process is None:
+            raise RuntimeError("FFmpeg进程未启动")
+        try:
+            data = np.ascontiguousarray(frame).data
+            if self._frame_stream is not None:
+                slot = self.last_slot + 1 if slot is None else max(slot, self.last_slot + 1)
+                self.process.stdin.write(self._frame_stream.frame_header(slot, data.nbytes))
+                self.last_slot = slot
+            self.process.stdin.write(data)
+            self.frames_written += 1
+        except (BrokenPipeError, OSError) as e:
+            raise RuntimeError(f"FFmpeg进程已退出: {self.get_error_output() or e}")
+
+    def release(self, timeout: float = 60) -> bool:
+        """关闭stdin并等待ffmpeg完成封装，返回是否成功"""
+        if self.process is None:
+            return False
+
+        try:
+            if self.process.stdin:
+                self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+        try:
+            returncode = self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            returncode = self.process.wait()
+            self.stderr_tail.append("等待FFmpeg结束超时")
+
+        if self._stderr_thread:
+            self._stderr_thread.join(timeout=1.0)
+        self.process = None
+        return returncode == 0
+
+    def get_error_output(self) -> str:
+        """获取最近的ffmpeg错误输出"""
+        return "\n".join(self.stderr_tail)
+
+class FFmpegLiveMuxer(FFmpegPipeWriter):
+    """FFmpeg实时音视频封装器
+
+    视频帧通过stdin写入，PCM音频通过第二个管道（子进程中的pipe:N）写入，
+    由同一个ffmpeg进程编码并封装，停止录制时最终文件即已生成。
+    """
+
+    # 音频写入队列的最大块数，超出时丢弃最旧的数据以免阻塞音频回调
+    AUDIO_QUEUE_CHUNKS = 512
+
+    def __init__(self, output_path: str, fps: int, frame_size: Tuple[int, int],
+                 format_type: str = "MP4", quality: str = "高质量",
+                 pixel_format: str = "bgra", ffmpeg_path: Optional[str] = None,
+                 extra_output_args: Optional[List[str]] = None, vfr: bool = False,
+                 segment_args: Optional[List[str]] = None,
+                 sample_rate: int = 44100, channels: int = 2, sample_format: str = "s16le"):
+        super().__init__(output_path, fps, frame_size, format_type, quality,
+                         pixel_format, ffmpeg_path, extra_output_args, vfr, segment_args)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self._audio_read_fd = None
+        self._audio_write_fd = None
+        self._audio_queue = queue.Queue(maxsize=self.AUDIO_QUEUE_CHUNKS)
+        self._audio_thread = None
+        self._audio_ended = False
+        self.audio_bytes_written = 0
+        self.audio_chunks_dropped = 0
+
+    @staticmethod
+    def is_supported() -> bool:
+        """当前平台是否支持向子进程传递额外管道"""
+        return os.name == 'posix'
+
+    def build_input_args(self) -> List[str]:
+        """音频输入：子进程继承的管道"""
+        return [
+            '-f', self.sample_format, '-ar', str(self.sample_rate), '-ac', str(self.channels),
+            '-thread_queue_size', '1024', '-i', f'pipe:{self._audio_read_fd}'
+        ]
+
+    def build_output_args(self) -> List[str]:
+        """显式映射音视频流并设置音频编码"""
+        args = ['-map', '0:v:0', '-map', '1:a:0']
+        args.extend(build_audio_codec_args(self.format_type))
+        args.extend(super().build_output_args())
+        return args
+
+    def required_encoders(self) -> List[str]:
+        """视频和音频编码器"""
+        return super().required_encoders() + [get_audio_codec(self.format_type)]
+
+    def popen_kwargs(self) -> dict:
+        """把音频管道的读端传给ffmpeg"""
+        return {'pass_fds': (self._audio_read_fd,)}
+
+    def open(self) -> bool:
+        """创建音频管道并启动ffmpeg进程"""
+        if not self.is_supported():
+            self.stderr_tail.append("当前平台不支持实时音视频封装")
+            return False
+
+        self._audio_read_fd, self._audio_write_fd = os.pipe()
+        opened = super().open()
+
+        # 读端已由子进程继承，父进程关闭自己的副本
+        os.close(self._audio_read_fd)
+        if not opened:
+            os.close(self._audio_write_fd)
+            self._audio_write_fd = None
+            return False
+
+        self._audio_thread = threading.Thread(target=self._audio_write_loop, daemon=True)
+        self._audio_thread.start()
+        return True
+
+    def write_audio(self, data: bytes):
+        """写入一块PCM音频（不阻塞调用方，可在音频回调中调用）"""
+        if self._audio_thread is None or self._audio_ended:
+            return
+        try:
+            self._audio_queue.put_nowait(data)
+        except queue.Full:
+            try:
+                self._audio_queue.get_nowait()
+                self.audio_chunks_dropped += 1
+            except queue.Empty:
+                pass
+            self._audio_queue.put_nowait(data)
+
+    def end_audio(self):
+        """音频已结束：写完剩余音频后关闭音频管道
+
+        ffmpeg按时间交错读取音视频，音频停止后不关闭管道会一直等待音频输入，
+        剩余视频帧写满管道后写入方将被阻塞。
+        """
+        if self._audio_thread is not None and not self._audio_ended:
+            self._audio_ended = True
+            self._audio_queue.put(None)
+
+    def _audio_write_loop(self):
+        """音频写入线程"""
+        with open(self._audio_write_fd, 'wb', buffering=0) as audio_pipe:
+            while True:
+                data = self._audio_queue.get()
+                if data is None:
+                    break
+                try:
+                    audio_pipe.write(data)
+                    self.audio_bytes_written += len(data)
+                except (BrokenPipeError, OSError) as e:
+                    self.stderr_tail.append(f"音频管道写入失败: {e}")
+                    break
+
+    def release(self, timeout: float = 60) -> bool:
+        """写完剩余音频后关闭两个管道并等待ffmpeg结束"""
+        if self._audio_thread is not None:
+            self.end_audio()
+            self._audio_thread.join(timeout=5.0)
+            self._audio_thread = None
+        return super().release(timeout)
@@ -0,0 +1,228 @@
+"""
+FFmpeg进度读取模块
+
+解析 ffmpeg -progress pipe:1 输出的 key=value 进度块，
+同时读取stderr并保留最近若干行用于错误报告。
+run_processes 同时运行一个任务的多个ffmpeg进程并汇总进度。
+"""
+
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 插入到ffmpeg命令中的进度参数（全局选项）
+PROGRESS_ARGS = ["-hide_banner", "-progress", "pipe:1", "-nostats"]
+
+def with_progress_args(cmd: List[str]) -> List[str]:
+    """在ffmpeg可执行文件后插入进度参数"""
+    if "-progress" in cmd:
+        return list(cmd)
+    return cmd[:1] + PROGRESS_ARGS + cmd[1:]
+
+class FFmpegProgressReader:
+    """FFmpeg进度读取器
+
+    两个守护线程分别读取stdout（进度）和stderr（错误输出），
+    两个管道都被持续读取，长任务不会因管道写满而阻塞。
+    回调参数为进度字典：percent、out_time、speed、eta、fps、frame。
+    """
+
+    # 保留的stderr行数
+    STDERR_TAIL_LINES = 50
+
+    def __init__(self, process, duration: float = 0.0,
+                 callback: Optional[Callable[[Dict], None]] = None,
+                 interval: float = 0.5):
+        self.process = process
+        self.duration = max(0.0, duration or 0.0)
+        self.callback = callback
+        self.interval = interval  # 回调最小间隔（秒）
+        self.stderr_tail = deque(maxlen=self.STDERR_TAIL_LINES)
+        self.values = {}
+        self.last_progress = {}
+        self.finished = False
+        self._last_emit = 0.0
+        self._threads = []
+
+    def start(self):
+        """开始读取"""
+        for target, stream in ((self._read_progress, self.process.stdout),
+                               (self._drain_stderr, self.process.stderr)):
+            if stream is None:
+                continue
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self, timeout: float = 5.0):
+        """等待读取线程结束（进程退出后调用）"""
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+    def _read_progress(self):
+        """读取进度输出，每个块以 progress=continue/end 结尾"""
+        try:
+            for line in iter(self.process.stdout.readline, ''):
+                key, sep, value = line.strip().partition("=")
+                if not sep:
+                    continue
+                self.values[key] = value
+                if key == "progress":
+                    self._on_block(value == "end")
+        except Exception:
+            pass
+
+    def _drain_stderr(self):
+        """读取stderr并保留最近若干行"""
+        try:
+            for line in iter(self.process.stderr.readline, ''):
+                line = line.rstrip()
+                if line:
+                    self.stderr_tail.append(line)
+        except Exception:
+            pass
+
+    def _out_time(self) -> float:
+        """当前已输出的媒体时间（秒）"""
+        # out_time_ms 实际单位也是微秒
+        for key in ("out_time_us", "out_time_ms"):
+            value = self.values.get(key, "")
+            if value.lstrip("-").isdigit():
+                return max(0.0, int(value) / 1_000_000)
+        value = self.values.get("out_time", "")
+        try:
+            hours, minutes, seconds = value.split(":")
+            return max(0.0, float(hours) * 3600 + float(minutes) * 60 + float(seconds))
+        except ValueError:
+            return 0.0
+
+    def _speed(self) -> float:
+        """编码速度（相对实时的倍数）"""
+        try:
+            return float(self.values.get("speed", "").rstrip("x"))
+        except ValueError:
+            return 0.0
+
+    def _on_block(self, is_end: bool):
+        """处理一个完整的进度块"""
+        out_time = self._out_time()
+        speed = self._speed()
+
+        if is_end:
+            percent = 100.0
+            eta = 0.0
+        elif self.duration > 0:
+            percent = min(99.9, out_time / self.duration * 100)
+            eta = (self.duration - out_time) / speed if speed > 0 else -1.0
+        else:
+            percent = -1.0  # 时长未知
+            eta = -1.0
+
+        try:
+            fps = float(self.values.get("fps") or 0)
+            frame = int(self.values.get("frame") or 0)
+        except ValueError:
+            fps, frame = 0.0, 0
+
+        self.last_progress = {
+            "percent": percent,
+            "out_time": out_time,
+            "speed": speed,
+            "eta": max(-1.0, eta),
+            "fps": fps,
+            "frame": frame,
+        }
+        self.finished = is_end
+
+        # 节流：结束块总是回调
+        now = time.monotonic()
+        if self.callback and (is_end or now - self._last_emit >= self.interval):
+            self._last_emit = now
+            try:
+                self.callback(dict(self.last_progress))
+            except Exception as e:
+                print(f"进度回调失败: {e}")
+
+    def get_error_output(self) -> str:
+        """获取最近的ffmpeg错误输出"""
+        return "\n".join(self.stderr_tail)
+
+def run_processes(job, commands: List[Tuple[List[str], float]], total_duration: float,
+                  on_progress: Optional[Callable[[Dict], None]] = None,
+                  interval: float = 0.5) -> Tuple[bool, str]:
+    """同时运行多个ffmpeg进程并汇总进度，返回 (是否全部成功, 错误信息)
+
+    commands 为 (命令, 该进程输出计入总进度的时长)，时长为0的进程不计入进度。
+    进程在 job.lock 下启动并加入 job.processes，取消任务时由调度器结束；
+    任一进程失败时结束其余进程。汇总进度的字段与 FFmpegProgressReader 相同，
+    speed 为总输出时长相对墙钟时间的倍数。
+    """
+    started = time.monotonic()
+    out_times = [0.0] * len(commands)
+    frames = [0] * len(commands)
+    lock = threading.Lock()
+    last_emit = [0.0]
+
+    def make_callback(index: int, duration: float):
+        def callback(progress: Dict):
+            with lock:
+                out_times[index] = min(progress["out_time"], duration)
+                frames[index] = progress["frame"]
+                now = time.monotonic()
+                if on_progress is None or now - last_emit[0] < interval:
+                    return
+                last_emit[0] = now
+                done = sum(out_times)
+                elapsed = max(1e-6, now - started)
+                speed = done / elapsed
+                on_progress({
+                    "percent": min(99.9, done / total_duration * 100) if total_duration > 0 else -1.0,
+                    "out_time": done,
+                    "speed": round(speed, 2),
+                    "eta": (total_duration - done) / speed if speed > 0 else -1.0,
+                    "fps": sum(frames) / elapsed,
+                    "frame": sum(frames)
+                })
+        return callback
+
+    running = []
+    with job.lock:
+        if job.cancel_requested:
+            return False, "任务已取消"
+        for index, (cmd, duration) in enumerate(commands):
+            process = subprocess.Popen(
+                with_progress_args(cmd),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                errors="replace"
+            )
+            job.processes.append(process)
+            reader = FFmpegProgressReader(process, duration,
+                                          make_callback(index, duration) if duration > 0 else None)
+            reader.start()
+            running.append((process, reader))
+
+    # 轮询退出状态，任一进程失败时结束其余进程
+    error = ""
+    while any(process.poll() is None for process, _ in running):
+        failed = [(p, r) for p, r in running if p.poll() not in (None, 0)]
+        if failed and not error:
+            process, reader = failed[0]
+            reader.join()
+            error = reader.get_error_output() or f"FFmpeg退出码 {process.returncode}"
+            for other, _ in running:
+                if other.poll() is None:
+                    other.kill()
+        time.sleep(0.25)
+
+    for process, reader in running:
+        reader.join()
+        if process.returncode != 0 and not error:
+            error = reader.get_error_output() or f"FFmpeg退出码 {process.returncode}"
+    if job.cancel_requested:
+        return False, "任务已取消"
+    return not error, error
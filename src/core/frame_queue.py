@@ -0,0 +1,141 @@
+"""
+捕获→编码帧队列模块
+"""
+
+import threading
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+class FrameQueue:
+    """有界帧队列
+
+    位于屏幕捕获线程与编码线程之间，每个条目保存帧及其捕获时间戳。
+    队列满时按策略处理：
+      block       - 阻塞捕获线程直到编码线程腾出空间
+      drop_oldest - 丢弃队首最旧的帧，保证编码的是最新画面
+      drop_newest - 丢弃新到达的帧，已入队帧的时间戳保持不变
+    """
+
+    POLICY_BLOCK = "block"
+    POLICY_DROP_OLDEST = "drop_oldest"
+    POLICY_DROP_NEWEST = "drop_newest"
+    POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_DROP_NEWEST)
+
+    def __init__(self, capacity: int = 4, policy: str = POLICY_BLOCK,
+                 on_discard: Optional[Callable] = None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的队列策略: {policy}")
+        self.capacity = max(1, capacity)
+        self.policy = policy
+        self.on_discard = on_discard  # 帧被丢弃时的回调（用于归还帧缓冲）
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+
+        # 统计信息
+        self.enqueued = 0
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.max_depth = 0
+        self.last_dropped_timestamp = None
+
+    @staticmethod
+    def capacity_for(buffer_size_mb: float, frame_bytes: int, minimum: int = 2, maximum: int = 240) -> int:
+        """根据缓冲区大小（MB）和单帧字节数计算队列容量"""
+        if frame_bytes <= 0:
+            return minimum
+        capacity = int(buffer_size_mb * 1024 * 1024 // frame_bytes)
+        return max(minimum, min(capacity, maximum))
+
+    def _discard(self, frame, timestamp):
+        """处理被丢弃的帧"""
+        self.last_dropped_timestamp = timestamp
+        if self.on_discard is not None:
+            try:
+                self.on_discard(frame)
+            except Exception as e:
+                print(f"释放丢弃帧失败: {e}")
+
+    def put(self, frame, timestamp: float) -> bool:
+        """放入一帧，返回该帧是否入队"""
+        discarded = None
+        accepted = True
+        with self._lock:
+            if self._closed:
+                accepted = False
+            elif len(self._items) >= self.capacity:
+                if self.policy == self.POLICY_BLOCK:
+                    while len(self._items) >= self.capacity and not self._closed:
+                        self._not_full.wait()
+                    accepted = not self._closed
+                elif self.policy == self.POLICY_DROP_OLDEST:
+                    discarded = self._items.popleft()
+                    self.dropped_oldest += 1
+                else:
+                    accepted = False
+                    self.dropped_newest += 1
+
+            if accepted:
+                self._items.append((frame, timestamp))
+                self.enqueued += 1
+                self.max_depth = max(self.max_depth, len(self._items))
+                self._not_empty.notify()
+            else:
+                discarded = (frame, timestamp)
+
+        if discarded is not None:
+            self._discard(*discarded)
+        return accepted
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[object, float]]:
+        """取出一帧 (frame, timestamp)；队列关闭且为空或超时时返回None"""
+        with self._lock:
+            if not self._items and not self._closed:
+                self._not_empty.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._not_full.notify()
+            return item
+
+    def close(self):
+        """关闭队列，已入队的帧仍可取出"""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def clear(self):
+        """清空队列并丢弃所有帧"""
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+            self._not_full.notify_all()
+        for frame, timestamp in items:
+            self._discard(frame, timestamp)
+
+    @property
+    def closed(self) -> bool:
+        """队列是否已关闭"""
+        return self._closed
+
+    def depth(self) -> int:
+        """当前队列深度"""
+        with self._lock:
+            return len(self._items)
+
+    def get_stats(self) -> dict:
+        """获取队列统计"""
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "capacity": self.capacity,
+                "depth": len(self._items),
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "dropped_oldest": self.dropped_oldest,
+                "dropped_newest": self.dropped_newest,
+                "dropped": self.dropped_oldest + self.dropped_newest
+            }
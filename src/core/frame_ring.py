@@ -0,0 +1,95 @@
+"""
+帧缓冲环模块
+"""
+
+import threading
+from collections import deque
+from typing import Optional, Tuple
+import numpy as np
+
+class FrameRing:
+    """预分配的帧缓冲环
+
+    捕获线程通过 acquire() 取得空闲缓冲并原地写入，消费者处理完后调用
+    release() 归还。缓冲使用引用计数，计数归零后才会被再次分配，
+    因此稳定状态下捕获不会产生逐帧的内存分配。
+    """
+
+    def __init__(self, slots: int = 8):
+        self.slots = max(2, slots)
+        self.shape = None
+        self.dtype = np.uint8
+        self._buffers = []
+        self._refcounts = []
+        self._slot_by_id = {}
+        self._free = deque()
+        self._lock = threading.Lock()
+        self.overruns = 0  # 无空闲缓冲的次数
+
+    def _allocate(self, shape: Tuple[int, ...]):
+        """按帧形状重新分配缓冲（区域改变时调用）"""
+        # 旧缓冲仍被消费者引用时由numpy负责回收，这里只丢弃对它们的记录
+        self.shape = shape
+        self._buffers = [np.empty(shape, dtype=self.dtype) for _ in range(self.slots)]
+        self._refcounts = [0] * self.slots
+        self._slot_by_id = {id(buf): i for i, buf in enumerate(self._buffers)}
+        self._free = deque(range(self.slots))
+
+    def _slot_of(self, frame) -> Optional[int]:
+        """查找帧所属的缓冲槽，不属于本环时返回None"""
+        if frame is None:
+            return None
+        slot = self._slot_by_id.get(id(frame))
+        if slot is None and getattr(frame, 'base', None) is not None:
+            slot = self._slot_by_id.get(id(frame.base))
+        return slot
+
+    def acquire(self, shape: Tuple[int, ...]) -> Optional[np.ndarray]:
+        """取得一个空闲缓冲（引用计数为1），没有空闲缓冲时返回None"""
+        with self._lock:
+            if shape != self.shape:
+                self._allocate(shape)
+
+            if not self._free:
+                self.overruns += 1
+                return None
+
+            slot = self._free.popleft()
+            self._refcounts[slot] = 1
+            return self._buffers[slot]
+
+    def retain(self, frame, count: int = 1):
+        """增加帧的引用计数"""
+        with self._lock:
+            slot = self._slot_of(frame)
+            if slot is not None and self._refcounts[slot] > 0:
+                self._refcounts[slot] += count
+
+    def release(self, frame):
+        """释放一次帧引用，计数归零后缓冲回到空闲队列"""
+        with self._lock:
+            slot = self._slot_of(frame)
+            if slot is None or self._refcounts[slot] <= 0:
+                return
+            self._refcounts[slot] -= 1
+            if self._refcounts[slot] == 0:
+                self._free.append(slot)
+
+    def owns(self, frame) -> bool:
+        """帧是否来自本缓冲环"""
+        with self._lock:
+            return self._slot_of(frame) is not None
+
+    def free_count(self) -> int:
+        """空闲缓冲数量"""
+        with self._lock:
+            return len(self._free)
+
+    def get_stats(self) -> dict:
+        """获取缓冲环统计"""
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "free": len(self._free),
+                "overruns": self.overruns
+            }
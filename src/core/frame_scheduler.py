@@ -0,0 +1,101 @@
+"""
+帧调度模块
+"""
+
+import time
+from typing import Tuple
+
+class FrameScheduler:
+    """基于绝对截止时间的帧调度器
+
+    以 time.monotonic() 为时钟，第 n 帧的截止时间固定为 start + n * interval，
+    不会因为单帧处理耗时而累积漂移。
+    """
+
+    # 距离截止时间小于该值时改为让出CPU的短循环，以弥补系统sleep精度不足
+    SPIN_THRESHOLD = 0.002
+
+    def __init__(self, fps: int = 30):
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.start_time = 0.0
+        self.slot_index = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """重置统计信息"""
+        self.frames_scheduled = 0  # 已调度的帧槽数
+        self.late_frames = 0       # 晚于截止时间但仍在本帧槽内的帧
+        self.dropped_frames = 0    # 因严重滞后而整体跳过的帧槽
+        self.duplicated_frames = 0  # 以上一帧填充的帧槽
+
+    def start(self, fps: int = None):
+        """开始调度（重置时钟和统计）"""
+        if fps:
+            self.fps = fps
+            self.interval = 1.0 / fps
+        self.start_time = time.monotonic()
+        self.slot_index = 0
+        self.reset_stats()
+
+    def restart_clock(self):
+        """以当前时间重新开始排帧槽（保留统计），用于暂停后恢复"""
+        self.start_time = time.monotonic()
+        self.slot_index = 0
+    
+    def deadline(self, slot_index: int) -> float:
+        """获取指定帧槽的截止时间"""
+        return self.start_time + slot_index * self.interval
+
+    def wait_next(self, should_continue=None) -> Tuple[int, float, int]:
+        """等待下一个帧槽
+
+        返回 (帧槽序号, 截止时间, 被跳过的帧槽数)。
+        should_continue 为可选的回调，返回False时提前结束等待。
+        """
+        deadline = self.deadline(self.slot_index)
+        now = time.monotonic()
+
+        # 粗粒度睡眠到截止时间附近，剩余部分短循环等待
+        while now < deadline:
+            if should_continue is not None and not should_continue():
+                break
+            remaining = deadline - now
+            if remaining > self.SPIN_THRESHOLD:
+                time.sleep(remaining - self.SPIN_THRESHOLD)
+            else:
+                time.sleep(0)
+            now = time.monotonic()
+
+        skipped = 0
+        lateness = now - deadline
+        if lateness >= self.interval:
+            # 已经错过了一个或多个完整帧槽，直接跳到当前帧槽
+            skipped = int(lateness / self.interval)
+            self.slot_index += skipped
+            deadline = self.deadline(self.slot_index)
+        if now - deadline > self.SPIN_THRESHOLD:
+            self.late_frames += 1
+
+        slot = self.slot_index
+        self.slot_index += 1
+        self.frames_scheduled += 1
+        return slot, deadline, skipped
+
+    def record_dropped(self, count: int = 1):
+        """记录被丢弃的帧槽"""
+        self.dropped_frames += count
+
+    def record_duplicated(self, count: int = 1):
+        """记录以重复帧填充的帧槽"""
+        self.duplicated_frames += count
+
+    def get_stats(self) -> dict:
+        """获取调度统计"""
+        return {
+            "fps": self.fps,
+            "frames": self.frames_scheduled,
+            "late": self.late_frames,
+            "dropped": self.dropped_frames,
+            "duplicated": self.duplicated_frames
+        }
@@ -0,0 +1,199 @@
+"""
+无界面录制模块
+
+不创建任何窗口部件，直接驱动 ScreenCapture、VideoEncoder、AudioCapture 和
+ScreenRecorder，用于命令行和无显示器环境（如 Xvfb）。
+
+即时回放模式下只保留最近N分钟，收到SIGUSR1或按下保存回放快捷键时保存一份，
+停止时把最近的内容保存到输出文件。
+"""
+
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer
+
+from core.replay_buffer import ReplayBuffer
+from core.screen_capture import ScreenCapture
+from core.video_encoder import VideoEncoder, ScreenRecorder
+
+class HeadlessRecorder(QObject):
+    """无界面录制器"""
+
+    # 状态输出间隔（毫秒），同时让Python有机会处理Ctrl+C
+    STATUS_INTERVAL_MS = 1000
+    SIGNAL_POLL_MS = 200
+
+    def __init__(self, output_path: str, fps: int = 30, quality: str = "高质量",
+                 format_type: str = "MP4", region: Optional[Tuple[int, int, int, int]] = None,
+                 monitor: int = 0, duration: float = 0.0, audio: bool = False,
+                 encoder_backend: Optional[str] = None, pipeline_mode: Optional[str] = None,
+                 replay_minutes: float = 0.0, quiet: bool = False):
+        super().__init__()
+        self.output_path = output_path
+        self.fps = fps
+        self.quality = quality
+        self.format_type = format_type
+        self.region = region
+        self.monitor = monitor
+        self.duration = duration  # 秒，0表示直到收到中断信号
+        self.audio = audio
+        self.encoder_backend = encoder_backend
+        self.pipeline_mode = pipeline_mode  # None表示使用配置
+        self.replay_minutes = replay_minutes  # 大于0时为即时回放模式
+        self.quiet = quiet
+
+        self.app = None
+        self.recorder = None
+        self.replay_buffer = None
+        self.hotkey_manager = None
+        self.exit_code = 0
+        self.frames_encoded = 0
+        self._timers = []
+
+    def _build_recorder(self) -> ScreenRecorder:
+        """创建录制组件"""
+        screen_capture = ScreenCapture()
+        screen_capture.set_monitor(self.monitor)
+        if self.region:
+            screen_capture.set_capture_region(*self.region)
+
+        audio_capture = None
+        if self.audio:
+            # 只有需要录音时才加载PyAudio
+            from core.audio_capture import AudioCapture
+            audio_capture = AudioCapture()
+
+        recorder = ScreenRecorder()
+        recorder.setup(screen_capture, VideoEncoder(), audio_capture)
+        recorder.set_pipeline_mode(self.pipeline_mode)
+        recorder.error_occurred.connect(self._on_error)
+        recorder.progress_updated.connect(self._on_progress)
+        return recorder
+
+    def run(self) -> int:
+        """开始录制并运行事件循环，返回退出码"""
+        self.app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+
+        try:
+            self.recorder = self._build_recorder()
+        except Exception as e:
+            print(f"初始化录制组件失败: {e}", file=sys.stderr)
+            return 1
+
+        if self.replay_minutes > 0:
+            self.replay_buffer = ReplayBuffer(self.replay_minutes * 60)
+            self.replay_buffer.error_occurred.connect(self._on_error)
+            started = self.recorder.start_replay(self.replay_buffer, self.fps, self.quality,
+                                                 self.encoder_backend)
+        else:
+            started = self.recorder.start_recording(self.output_path, self.fps, self.quality,
+                                                    self.format_type, self.encoder_backend)
+        if not started:
+            print("开始录制失败", file=sys.stderr)
+            return 1
+
+        width, height = self.recorder.screen_capture.get_screen_size()
+        limit = f"{self.duration:g}秒" if self.duration > 0 else "按Ctrl+C停止"
+        print(f"开始录制: {width}x{height} @ {self.fps}fps → {self.output_path}（{limit}）")
+        if self.replay_buffer is not None:
+            self._setup_replay_triggers()
+
+        # Ctrl+C / SIGTERM 正常停止并完成封装
+        signal.signal(signal.SIGINT, lambda *_: self.stop())
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        self._start_timer(self.SIGNAL_POLL_MS, lambda: None)
+        if not self.quiet:
+            self._start_timer(self.STATUS_INTERVAL_MS, self._print_status)
+        if self.duration > 0:
+            QTimer.singleShot(int(self.duration * 1000), self.stop)
+
+        self.app.exec()
+        return self.exit_code
+
+    def _setup_replay_triggers(self):
+        """注册保存回放的信号和快捷键"""
+        triggers = []
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda *_: self.save_replay())
+            triggers.append("SIGUSR1")
+
+        from utils.hotkey_manager import HotkeyManager, DefaultHotkeys
+        try:
+            from utils.config_manager import get_config
+            hotkey = get_config("hotkeys.save_replay", DefaultHotkeys.SAVE_REPLAY) or DefaultHotkeys.SAVE_REPLAY
+        except Exception as e:
+            print(f"读取快捷键配置失败: {e}")
+            hotkey = DefaultHotkeys.SAVE_REPLAY
+        self.hotkey_manager = HotkeyManager()
+        if self.hotkey_manager.register_hotkey(hotkey, None, "保存即时回放"):
+            # 快捷键回调在keyboard线程中执行，经由信号回到主线程
+            self.hotkey_manager.hotkey_triggered.connect(lambda _: self.save_replay())
+            triggers.append(hotkey.upper())
+
+        print(f"即时回放: 保留最近{self.replay_minutes:g}分钟，"
+              f"{' 或 '.join(triggers) or '停止时'}保存")
+
+    def save_replay(self):
+        """保存最近的回放到输出目录"""
+        if self.replay_buffer is not None and self.recorder.is_recording:
+            output_path = str(Path(self.output_path).parent / Path(self.replay_buffer.default_output_path()).name)
+            self.recorder.save_replay(output_path)
+
+    def _start_timer(self, interval_ms: int, callback):
+        """创建周期定时器"""
+        timer = QTimer(self)
+        timer.timeout.connect(callback)
+        timer.start(interval_ms)
+        self._timers.append(timer)
+
+    def stop(self):
+        """停止录制并退出事件循环"""
+        if self.recorder is None or not self.recorder.is_recording:
+            return
+
+        for timer in self._timers:
+            timer.stop()
+
+        duration = self.recorder.get_recording_duration()
+        started = time.monotonic()
+        self.recorder.stop_recording()
+        # 命令行录制结束即退出，等待后台收尾完成并处理收尾期间发出的错误
+        self.recorder.wait_finalized()
+        self.app.processEvents()
+        if not self.recorder.last_finalize_success:
+            self.exit_code = 1
+        if self.replay_buffer is not None:
+            if self.hotkey_manager is not None:
+                self.hotkey_manager.unregister_all()
+            # 等待进行中的保存完成，再把最近的内容保存到输出文件
+            self.replay_buffer.wait_for_save()
+            if not self.replay_buffer.save_sync(self.output_path, self.format_type):
+                self.exit_code = 1
+            self.replay_buffer.clear()
+        self.frames_encoded = self.recorder.last_frame_count
+        stats = self.recorder.get_pipeline_stats() or self.recorder.screen_capture.get_capture_stats()
+        print(f"\n录制完成: {self.output_path}")
+        print(f"时长 {duration:.1f}秒, 编码 {self.frames_encoded} 帧, "
+              f"迟到 {stats.get('late', 0)}, 丢弃 {stats.get('dropped', 0)}, "
+              f"收尾 {time.monotonic() - started:.2f}秒")
+        self.app.quit()
+
+    def _print_status(self):
+        """输出录制状态"""
+        if self.recorder and self.recorder.is_recording:
+            duration = self.recorder.get_recording_duration()
+            print(f"\r录制中 {duration:6.1f}秒  {self.frames_encoded} 帧", end="", flush=True)
+
+    def _on_progress(self, frame_count: int, duration: float):
+        """编码进度"""
+        self.frames_encoded = frame_count
+
+    def _on_error(self, message: str):
+        """录制出错"""
+        print(f"\n错误: {message}", file=sys.stderr)
+        self.exit_code = 1
+        self.stop()
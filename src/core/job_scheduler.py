@@ -0,0 +1,256 @@
+"""
+后台处理任务调度模块
+
+限制同时运行的ffmpeg进程数，任务按优先级排队，支持取消。
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from config.settings import AppConfig
+
+class ProcessingJob:
+    """处理任务"""
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_FINISHED = "finished"
+    STATUS_FAILED = "failed"
+    STATUS_CANCELLED = "cancelled"
+    FINAL_STATUSES = (STATUS_FINISHED, STATUS_FAILED, STATUS_CANCELLED)
+
+    def __init__(self, cmd: List[str], input_path: str, output_path: str,
+                 priority: int = 0, duration: Optional[float] = None, kind: str = ""):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.cmd = cmd
+        self.input_path = input_path
+        self.output_path = output_path
+        self.priority = priority  # 数值越大越先执行
+        self.duration = duration  # 输出时长（秒），None表示使用输入时长
+        self.kind = kind
+        self.status = self.STATUS_QUEUED
+        self.progress = 0
+        self.detail = {}
+        self.error = ""
+        self.process = None
+        self.processes = []  # 一个任务启动多个进程时（如分块并行转码）的全部进程
+        self.task = None  # 多进程任务（分块转码、智能裁剪），None表示直接运行cmd
+        self.reserved_slots = 0  # 额外占用的并发槽数（见 JobScheduler.reserve_slots）
+        self.cancel_requested = False
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def is_final(self) -> bool:
+        """任务是否已结束"""
+        return self.status in self.FINAL_STATUSES
+
+    def to_dict(self) -> Dict:
+        """任务状态快照"""
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "input_path": self.input_path,
+            "output_path": self.output_path,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": self.progress,
+            "speed": self.detail.get("speed", 0.0),
+            "eta": self.detail.get("eta", -1.0),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class JobScheduler:
+    """有界工作线程池任务调度器
+
+    工作线程按需创建，数量不超过 max_workers；
+    runner(job) 在工作线程中执行任务，负责启动进程并设置 job.process
+    （启动多个进程时加入 job.processes，并用 reserve_slots() 为多出的进程占用并发槽）。
+    """
+
+    # 保留的已结束任务数
+    MAX_FINISHED_JOBS = 200
+
+    def __init__(self, runner: Callable[[ProcessingJob], None], max_workers: Optional[int] = None,
+                 on_status_changed: Optional[Callable[[ProcessingJob], None]] = None):
+        self.runner = runner
+        self.on_status_changed = on_status_changed
+        self.max_workers = max_workers or self.default_max_workers()
+        self._heap = []
+        self._counter = itertools.count()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._workers = []
+        self._running = 0
+        self._reserved = 0  # 运行中的任务额外占用的并发槽
+        self._shutdown = False
+
+    @staticmethod
+    def default_max_workers(threads_per_job: int = AppConfig.FFMPEG_THREADS_PER_JOB) -> int:
+        """默认并发数：CPU核心数 / 每个任务的ffmpeg线程数"""
+        return max(1, (os.cpu_count() or 1) // max(1, threads_per_job))
+
+    def set_max_workers(self, max_workers: int):
+        """设置最大并发数（对新任务立即生效，运行中的任务不受影响）"""
+        with self._cond:
+            self.max_workers = max(1, int(max_workers))
+            self._ensure_workers()
+            self._cond.notify_all()
+
+    def submit(self, job: ProcessingJob) -> str:
+        """提交任务，返回任务ID"""
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("任务调度器已关闭")
+            self._jobs[job.job_id] = job
+            heapq.heappush(self._heap, (-job.priority, next(self._counter), job))
+            self._prune_finished()
+            self._ensure_workers()
+            self._cond.notify()
+        self._notify(job)
+        return job.job_id
+
+    def _ensure_workers(self):
+        """按需创建工作线程（调用方持有锁）"""
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _worker_loop(self):
+        """工作线程"""
+        while True:
+            with self._cond:
+                while not self._shutdown and (not self._heap or self._running + self._reserved >= self.max_workers):
+                    self._cond.wait()
+                if self._shutdown:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                if job.status != ProcessingJob.STATUS_QUEUED:
+                    continue  # 排队时已取消
+                job.status = ProcessingJob.STATUS_RUNNING
+                job.started_at = time.time()
+                self._running += 1
+            self._notify(job)
+
+            try:
+                self.runner(job)
+            except Exception as e:
+                job.error = str(e)
+                job.status = ProcessingJob.STATUS_FAILED
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._reserved -= job.reserved_slots
+                    job.reserved_slots = 0
+                    if job.status == ProcessingJob.STATUS_RUNNING:
+                        job.status = ProcessingJob.STATUS_FAILED
+                    job.finished_at = time.time()
+                    job.process = None
+                    job.processes = []
+                    self._cond.notify_all()
+                self._notify(job)
+
+    def reserve_slots(self, job: ProcessingJob, count: int) -> int:
+        """运行中的任务额外占用最多count个空闲并发槽（不等待），返回实际占用数
+
+        一个任务同时运行多个ffmpeg进程时每个进程各占一个槽，进程总数仍不超过 max_workers。
+        占用的槽在任务结束时释放。
+        """
+        with self._cond:
+            granted = max(0, min(count, self.max_workers - self._running - self._reserved))
+            self._reserved += granted
+            job.reserved_slots += granted
+            return granted
+
+    def release_slots(self, job: ProcessingJob, keep: int = 0):
+        """释放任务额外占用的并发槽，保留keep个"""
+        with self._cond:
+            released = max(0, job.reserved_slots - max(0, keep))
+            if released:
+                self._reserved -= released
+                job.reserved_slots -= released
+                self._cond.notify_all()
+
+    def cancel(self, job_id: str) -> bool:
+        """取消任务：排队中的直接移除，运行中的结束其进程"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.is_final:
+                return False
+            if job.status == ProcessingJob.STATUS_QUEUED:
+                job.status = ProcessingJob.STATUS_CANCELLED
+                job.finished_at = time.time()
+                queued = True
+            else:
+                queued = False
+
+        if queued:
+            self._notify(job)
+            return True
+
+        with job.lock:
+            job.cancel_requested = True
+            for process in [job.process] + job.processes:
+                if process is not None and process.poll() is None:
+                    process.kill()
+        return True
+
+    def cancel_all(self):
+        """取消所有未结束的任务"""
+        with self._lock:
+            job_ids = [job_id for job_id, job in self._jobs.items() if not job.is_final]
+        for job_id in job_ids:
+            self.cancel(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """查询任务状态"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def list_jobs(self) -> List[Dict]:
+        """所有任务的状态（按提交顺序）"""
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def get_stats(self) -> Dict:
+        """调度器统计"""
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.status == ProcessingJob.STATUS_QUEUED)
+            return {"max_workers": self.max_workers, "running": self._running, "reserved": self._reserved,
+                    "queued": queued}
+
+    def _prune_finished(self):
+        """清理最早结束的任务（调用方持有锁）"""
+        finished = [job for job in self._jobs.values() if job.is_final]
+        for job in finished[:max(0, len(finished) - self.MAX_FINISHED_JOBS)]:
+            del self._jobs[job.job_id]
+
+    def _notify(self, job: ProcessingJob):
+        """通知任务状态变化"""
+        if self.on_status_changed is not None:
+            try:
+                self.on_status_changed(job)
+            except Exception as e:
+                print(f"任务状态回调失败: {e}")
+
+    def shutdown(self, cancel_running: bool = True):
+        """关闭调度器"""
+        if cancel_running:
+            self.cancel_all()
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
@@ -0,0 +1,278 @@
+"""
+媒体信息探测模块
+
+使用 ffprobe 读取容器和流的头信息（不解码视频），结果按
+(路径, 文件大小, 修改时间) 持久化缓存。
+find_keyframes / list_frame_times 读取视频流的关键帧和逐帧时间，供按关键帧切分使用。
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.settings import AppConfig
+
+def find_keyframes(ffmpeg_path: str, input_path: str, timeout: float = 600) -> List[float]:
+    """列出第一个视频流的关键帧时间（秒，相对文件开头）
+
+    -skip_frame nokey 只解码关键帧，showinfo 输出每帧的 pts_time。
+    """
+    cmd = [
+        ffmpeg_path, '-hide_banner', '-nostats', '-skip_frame', 'nokey', '-i', input_path,
+        '-map', '0:v:0', '-vf', 'showinfo', '-fps_mode', 'passthrough', '-f', 'null', '-'
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, errors="replace", timeout=timeout)
+    except (subprocess.TimeoutExpired, OSError) as e:
+        print(f"查找关键帧失败: {e}")
+        return []
+    if result.returncode != 0:
+        return []
+    times = [float(value) for value in re.findall(r"pts_time:(-?[\d.]+)", result.stderr)]
+    return sorted(set(t for t in times if t >= 0))
+
+def list_frame_times(ffmpeg_path: str, input_path: str, timeout: float = 600) -> List[float]:
+    """列出第一个视频流每一帧的显示时间（秒，升序）
+
+    只复制数据包输出framecrc（不解码），每行为 流, dts, pts, 时长, 大小, 校验和。
+    """
+    cmd = [ffmpeg_path, '-hide_banner', '-nostats', '-i', input_path,
+           '-map', '0:v:0', '-c', 'copy', '-f', 'framecrc', '-']
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, errors="replace", timeout=timeout)
+    except (subprocess.TimeoutExpired, OSError) as e:
+        print(f"读取帧时间失败: {e}")
+        return []
+    if result.returncode != 0:
+        return []
+
+    time_base = 0.0
+    times = []
+    for line in result.stdout.splitlines():
+        if line.startswith("#tb 0:"):
+            num, _, den = line.split(":", 1)[1].strip().partition("/")
+            time_base = int(num) / int(den or 1)
+        elif not line.startswith("#") and time_base:
+            fields = [field.strip() for field in line.split(",")]
+            if len(fields) >= 3 and fields[2].lstrip("-").isdigit():
+                times.append(int(fields[2]) * time_base)
+    return sorted(times)
+
+class MediaProbe:
+    """媒体信息探测器"""
+
+    # 缓存条目上限，超出时淘汰最早写入的条目
+    MAX_CACHE_ENTRIES = 500
+    # 缓存格式版本，探测结果结构变化时递增
+    CACHE_VERSION = 1
+
+    def __init__(self, ffmpeg_path: Optional[str] = None, cache_path: Optional[str] = None):
+        self.ffmpeg_path = ffmpeg_path
+        self.ffprobe_path = self.find_ffprobe(ffmpeg_path)
+        self.cache_path = Path(cache_path or Path(AppConfig.get_cache_dir()) / "media_probe.json")
+        self._cache = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def find_ffprobe(ffmpeg_path: Optional[str] = None) -> Optional[str]:
+        """查找与ffmpeg同目录的ffprobe，找不到时查找PATH"""
+        if ffmpeg_path:
+            ffmpeg_file = Path(ffmpeg_path)
+            if ffmpeg_file.parent != Path('.'):
+                candidate = ffmpeg_file.with_name("ffprobe" + ffmpeg_file.suffix)
+                if candidate.exists():
+                    return str(candidate)
+        return shutil.which('ffprobe')
+
+    # ---------- 缓存 ----------
+
+    @staticmethod
+    def _cache_key(path: str) -> Optional[str]:
+        """根据路径、大小和修改时间生成缓存键"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def _load_cache(self) -> Dict:
+        """加载缓存（调用方持有锁）"""
+        if self._cache is None:
+            self._cache = {}
+            try:
+                if self.cache_path.exists():
+                    with open(self.cache_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if data.get("version") == self.CACHE_VERSION:
+                        self._cache = data.get("entries", {})
+            except Exception as e:
+                print(f"加载媒体信息缓存失败: {e}")
+        return self._cache
+
+    def _save_cache(self):
+        """保存缓存（调用方持有锁）"""
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.cache_path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": self.CACHE_VERSION, "entries": self._cache}, f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_path)
+        except Exception as e:
+            print(f"保存媒体信息缓存失败: {e}")
+
+    def clear_cache(self):
+        """清空缓存"""
+        with self._lock:
+            self._cache = {}
+            self._save_cache()
+
+    # ---------- 探测 ----------
+
+    def probe(self, path: str, use_cache: bool = True) -> Dict:
+        """获取媒体信息，失败时返回空字典"""
+        key = self._cache_key(path)
+        if key is None:
+            return {}
+
+        if use_cache:
+            with self._lock:
+                cached = self._load_cache().get(key)
+            if cached is not None:
+                return dict(cached)
+
+        info = self._probe_ffprobe(path) or self._probe_header(path)
+        if info:
+            with self._lock:
+                cache = self._load_cache()
+                # 同一路径的旧条目已失效
+                prefix = key.rsplit('|', 2)[0] + '|'
+                for stale in [k for k in cache if k.startswith(prefix)]:
+                    del cache[stale]
+                cache[key] = info
+                while len(cache) > self.MAX_CACHE_ENTRIES:
+                    del cache[next(iter(cache))]
+                self._save_cache()
+        return info
+
+    def _probe_ffprobe(self, path: str) -> Dict:
+        """使用ffprobe读取JSON格式的容器和流信息"""
+        if not self.ffprobe_path:
+            return {}
+
+        cmd = [
+            self.ffprobe_path, "-v", "error",
+            "-show_format", "-show_streams", "-of", "json", path
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            if result.returncode != 0:
+                return {}
+            return self.parse_ffprobe_json(json.loads(result.stdout or "{}"))
+        except Exception as e:
+            print(f"ffprobe探测失败: {str(e)}")
+            return {}
+
+    def _probe_header(self, path: str) -> Dict:
+        """ffprobe不可用时，用ffmpeg只读取文件头（不指定输出，不解码）"""
+        if not self.ffmpeg_path:
+            return {}
+
+        cmd = [self.ffmpeg_path, "-hide_banner", "-i", path]
+        try:
+            # 没有输出文件时ffmpeg读取完头信息即以非零状态退出
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            return self.parse_header_output(result.stderr)
+        except Exception as e:
+            print(f"读取文件头失败: {str(e)}")
+            return {}
+
+    @staticmethod
+    def _parse_rate(rate: Optional[str]) -> float:
+        """解析 "30000/1001" 形式的帧率"""
+        try:
+            if rate and "/" in rate:
+                num, den = rate.split("/")
+                return float(num) / float(den) if float(den) else 0.0
+            return float(rate) if rate else 0.0
+        except ValueError:
+            return 0.0
+
+    @classmethod
+    def parse_ffprobe_json(cls, data: Dict) -> Dict:
+        """把ffprobe的JSON输出整理为视频信息字典"""
+        info = {}
+        fmt = data.get("format", {})
+        try:
+            info["duration"] = float(fmt.get("duration", 0.0))
+        except (TypeError, ValueError):
+            info["duration"] = 0.0
+        if fmt.get("bit_rate"):
+            info["bitrate"] = int(fmt["bit_rate"])
+        info["format_name"] = fmt.get("format_name", "")
+        info["size"] = int(fmt.get("size", 0) or 0)
+
+        for stream in data.get("streams", []):
+            codec_type = stream.get("codec_type")
+            if codec_type == "video" and "width" not in info:
+                info["width"] = int(stream.get("width", 0))
+                info["height"] = int(stream.get("height", 0))
+                info["resolution"] = f"{info['width']}x{info['height']}"
+                info["video_codec"] = stream.get("codec_name", "")
+                info["pix_fmt"] = stream.get("pix_fmt", "")
+                info["time_base"] = stream.get("time_base", "")
+                fps = cls._parse_rate(stream.get("avg_frame_rate")) or cls._parse_rate(stream.get("r_frame_rate"))
+                if fps:
+                    info["fps"] = round(fps, 3)
+                if not info["duration"] and stream.get("duration"):
+                    info["duration"] = float(stream["duration"])
+            elif codec_type == "audio" and "audio_codec" not in info:
+                info["audio_codec"] = stream.get("codec_name", "")
+                info["sample_rate"] = int(stream.get("sample_rate", 0) or 0)
+                info["channels"] = int(stream.get("channels", 0) or 0)
+        return info
+
+    @staticmethod
+    def _parse_duration(duration_str: str) -> float:
+        """解析 HH:MM:SS.mmm 格式的时长"""
+        try:
+            hours, minutes, seconds = duration_str.split(":")
+            return float(hours) * 3600 + float(minutes) * 60 + float(seconds)
+        except ValueError:
+            return 0.0
+
+    @classmethod
+    def parse_header_output(cls, ffmpeg_output: str) -> Dict:
+        """解析 ffmpeg -i 输出的文件头信息"""
+        info = {}
+        try:
+            for line in ffmpeg_output.split('\n'):
+                if "Duration:" in line and "duration" not in info:
+                    duration_str = line.split("Duration:")[1].split(",")[0].strip()
+                    info["duration"] = cls._parse_duration(duration_str)
+                    bitrate = re.search(r"bitrate:\s*(\d+)\s*kb/s", line)
+                    if bitrate:
+                        info["bitrate"] = int(bitrate.group(1)) * 1000
+                elif "Video:" in line and "resolution" not in info:
+                    codec = re.search(r"Video:\s*(\w+)", line)
+                    if codec:
+                        info["video_codec"] = codec.group(1)
+                    resolution = re.search(r"\b(\d{2,5})x(\d{2,5})\b", line)
+                    if resolution:
+                        info["width"] = int(resolution.group(1))
+                        info["height"] = int(resolution.group(2))
+                        info["resolution"] = f"{info['width']}x{info['height']}"
+                    fps = re.search(r"([\d.]+)\s*fps", line)
+                    if fps:
+                        info["fps"] = float(fps.group(1))
+                elif "Audio:" in line and "audio_codec" not in info:
+                    codec = re.search(r"Audio:\s*(\w+)", line)
+                    if codec:
+                        info["audio_codec"] = codec.group(1)
+        except Exception as e:
+            print(f"解析视频信息失败: {str(e)}")
+        return info
@@ -0,0 +1,158 @@
+"""
+预览渲染模块
+
+预览以独立的较低帧率（默认10fps）刷新：捕获线程只按预览间隔挑出帧，
+缩放（INTER_AREA）和颜色通道处理在后台线程完成，界面线程只收到已缩放到
+预览窗口大小的BGR帧。
+"""
+
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QObject, pyqtSignal
+
+class PreviewRenderer(QObject):
+    """预览帧渲染器
+
+    submit() 在捕获线程中直接调用（DirectConnection），只做限速判断和保存引用；
+    只保留最新的一帧，后台线程来不及处理时旧帧直接丢弃。
+    缩放完成后发出 preview_ready，界面线程处理完上一帧之前不会再次发出，
+    信号不会在事件队列中堆积。
+    """
+
+    preview_ready = pyqtSignal()  # 有新的预览帧，通过 take_frame() 取得
+
+    DEFAULT_FPS = 10
+
+    def __init__(self, fps: int = DEFAULT_FPS,
+                 retain: Optional[Callable] = None, release: Optional[Callable] = None):
+        super().__init__()
+        self.interval = 1.0 / max(1, fps)
+        self.retain = retain    # 为挑中的帧额外保留一次引用（帧来自缓冲环时）
+        self.release = release  # 缩放完成后归还该引用
+        self.target_size = (0, 0)
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+
+        self._pending = None
+        self._result = None
+        self._delivering = False
+        self._next_time = 0.0
+        self._running = False
+        self._thread = None
+        self._condition = threading.Condition()
+
+    def set_fps(self, fps: int):
+        """设置预览帧率"""
+        self.interval = 1.0 / max(1, fps)
+
+    def set_target_size(self, width: int, height: int):
+        """设置预览区域的像素大小，帧按比例缩放到不超过该大小"""
+        self.target_size = (max(1, int(width)), max(1, int(height)))
+
+    def start(self):
+        """启动后台渲染线程"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._render_loop, name="PreviewRenderer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台渲染线程并归还未处理的帧"""
+        with self._condition:
+            self._running = False
+            pending, self._pending = self._pending, None
+            self._condition.notify_all()
+        if pending is not None:
+            self._release(pending)
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def submit(self, frame: np.ndarray):
+        """提交一帧（在捕获线程中调用，未到预览间隔的帧直接忽略）"""
+        if frame is None or not self._running:
+            return
+        now = time.monotonic()
+        if now < self._next_time:
+            return
+        # 按固定间隔推进，捕获帧率不是预览帧率的整数倍时也不会漂移
+        self._next_time = max(self._next_time + self.interval, now - self.interval)
+
+        if self.retain:
+            self.retain(frame)
+        with self._condition:
+            replaced, self._pending = self._pending, frame
+            self._condition.notify()
+        if replaced is not None:
+            self.frames_skipped += 1
+            self._release(replaced)
+
+    def take_frame(self) -> Optional[np.ndarray]:
+        """取得最新的预览帧（界面线程调用）"""
+        with self._condition:
+            frame, self._result = self._result, None
+            self._delivering = False
+        return frame
+
+    def _release(self, frame):
+        if self.release:
+            try:
+                self.release(frame)
+            except Exception as e:
+                print(f"归还预览帧失败: {e}")
+
+    def _render_loop(self):
+        while True:
+            with self._condition:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                frame, self._pending = self._pending, None
+
+            try:
+                image = self.render(frame, self.target_size)
+            except Exception as e:
+                print(f"预览渲染失败: {e}")
+                image = None
+            finally:
+                self._release(frame)
+
+            if image is None:
+                continue
+            with self._condition:
+                self._result = image
+                notify = not self._delivering
+                self._delivering = True
+            self.frames_rendered += 1
+            if notify:
+                self.preview_ready.emit()
+
+    @staticmethod
+    def fit_size(width: int, height: int, target: Tuple[int, int]) -> Tuple[int, int]:
+        """按比例缩放到不超过目标大小（不放大）"""
+        target_width, target_height = target
+        if target_width <= 0 or target_height <= 0:
+            return width, height
+        scale = min(target_width / width, target_height / height, 1.0)
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    @classmethod
+    def render(cls, frame: np.ndarray, target: Tuple[int, int]) -> np.ndarray:
+        """缩放到目标大小并转为连续的BGR帧（先缩小再转换通道，处理的像素最少）"""
+        height, width = frame.shape[:2]
+        size = cls.fit_size(width, height, target)
+        if size != (width, height):
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        if frame.ndim == 2:
+            return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        # 未缩放时仍是捕获缓冲本身，复制一份以便归还
+        return np.ascontiguousarray(frame) if size != (width, height) else frame.copy()
@@ -0,0 +1,378 @@
+"""
+多进程捕获/编码管线模块
+
+截图和编码分别在独立进程中运行，帧数据经 multiprocessing.shared_memory
+中的帧缓冲环传递，进程间只传递帧槽序号和时间戳。
+主进程（GUI）只负责控制和监控，界面操作不会占用捕获和编码的GIL。
+
+本模块不依赖Qt，子进程以spawn方式启动。
+"""
+
+import multiprocessing as mp
+import queue
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+# 共享计数器下标
+COUNTER_CAPTURED = 0   # 写入帧缓冲环的帧数
+COUNTER_HELD = 1       # 画面未变化而未传递的帧数
+COUNTER_OVERRUNS = 2   # 帧缓冲环已满而丢弃的帧数
+COUNTER_SKIPPED = 3    # 捕获滞后而跳过的帧槽数
+COUNTER_LATE = 4       # 晚于截止时间的帧数
+COUNTER_ENCODED = 5    # 编码的捕获帧数
+COUNTER_WRITTEN = 6    # 写入编码器的帧数（含补齐帧槽的重复帧）
+COUNTER_COUNT = 7
+
+# 画面未变化时代替帧槽序号发送的标记
+HOLD = -1
+
+class SharedFrameRing:
+    """共享内存帧缓冲环（BGRA）"""
+
+    def __init__(self, slots: int, shape: Tuple[int, int, int], name: Optional[str] = None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        frame_bytes = int(np.prod(self.shape))
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * frame_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    def close(self):
+        """关闭本进程的映射"""
+        self.frames = None
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+    def unlink(self):
+        """释放共享内存（仅创建者调用）"""
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+def build_source(source_spec: Optional[Dict]):
+    """根据描述创建画面源（子进程中调用）"""
+    if source_spec and source_spec.get("type") == "synthetic":
+        from core.synthetic_source import SyntheticScreenSource
+        params = {k: v for k, v in source_spec.items() if k != "type"}
+        return SyntheticScreenSource(**params)
+    import mss
+    return mss.mss()
+
+def _capture_main(source_spec, monitor, fps, ring_name, slots, shape, damage_detection,
+                  free_queue, ready_queue, stop_event, pause_event, encoder_ready,
+                  capture_ready, counters, error_queue):
+    """捕获进程：截图写入共享帧缓冲环，发送 (帧槽序号, 时间戳)"""
+    from core.frame_scheduler import FrameScheduler
+
+    ring = None
+    try:
+        ring = SharedFrameRing(slots, shape, ring_name)
+        source = build_source(source_spec)
+        detector = None
+        if damage_detection:
+            from core.damage_detector import DamageDetector
+            detector = DamageDetector()
+
+        # 等待编码进程就绪，避免启动阶段帧缓冲环被占满
+        encoder_ready.wait(timeout=30)
+        capture_ready.set()
+
+        height, width = shape[:2]
+        scheduler = FrameScheduler(fps)
+        scheduler.start(fps)
+        paused_total = 0.0
+        has_frame = False
+
+        while not stop_event.is_set():
+            if pause_event.is_set():
+                # 暂停期间不截图，恢复后时间戳扣除暂停时长
+                paused_at = time.monotonic()
+                while pause_event.is_set() and not stop_event.is_set():
+                    time.sleep(0.01)
+                paused_total += time.monotonic() - paused_at
+                scheduler.restart_clock()
+                continue
+
+            _, _, skipped = scheduler.wait_next(lambda: not stop_event.is_set())
+            if stop_event.is_set():
+                break
+            counters[COUNTER_SKIPPED] += skipped
+
+            shot = source.grab(monitor)
+            raw = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+            timestamp = time.monotonic() - paused_total
+
+            if detector is not None and not detector.update(raw) and has_frame:
+                counters[COUNTER_HELD] += 1
+                ready_queue.put((HOLD, timestamp))
+                continue
+
+            try:
+                index = free_queue.get_nowait()
+            except queue.Empty:
+                # 编码进程跟不上，丢弃本帧而不阻塞捕获
+                counters[COUNTER_OVERRUNS] += 1
+                continue
+
+            if raw.shape[:2] != (height, width):
+                import cv2
+                cv2.resize(raw, (width, height), dst=ring.frames[index])
+            else:
+                np.copyto(ring.frames[index], raw)
+            counters[COUNTER_CAPTURED] += 1
+            has_frame = True
+            ready_queue.put((index, timestamp))
+
+        counters[COUNTER_LATE] = scheduler.late_frames
+    except Exception as e:
+        error_queue.put(f"捕获进程出错: {e}")
+    finally:
+        capture_ready.set()
+        ready_queue.put(None)
+        if ring is not None:
+            ring.close()
+
+def _encode_main(writer_args, ring_name, slots, shape, ready_queue, free_queue,
+                 encoder_ready, counters, error_queue):
+    """编码进程：按时间戳把帧放到帧槽并直接从共享内存写入ffmpeg"""
+    from core.ffmpeg_pipe import FFmpegPipeWriter
+
+    ring = None
+    writer = None
+    try:
+        ring = SharedFrameRing(slots, shape, ring_name)
+        writer = FFmpegPipeWriter(pixel_format="bgra", **writer_args)
+        if not writer.open():
+            error_queue.put(f"无法启动FFmpeg: {writer.get_error_output()}")
+            writer = None
+            return
+        encoder_ready.set()
+
+        fps = writer.fps
+        origin = None
+        next_slot = 0
+        held = None  # 最近写入的帧槽，保留到下一帧到达以便补齐
+        last_hold = None
+
+        def write(frame, slot=None):
+            writer.write(frame, slot)
+            counters[COUNTER_WRITTEN] += 1
+
+        while True:
+            item = ready_queue.get()
+            if item is None:
+                break
+            index, timestamp = item
+            if index == HOLD:
+                last_hold = timestamp
+                continue
+
+            if origin is None:
+                origin = timestamp
+            slot = max(next_slot, round((timestamp - origin) * fps))
+            if held is not None:
+                # 可变帧率时帧带时间戳写入，画面未变化的帧槽直接跳过
+                if not writer.vfr:
+                    for _ in range(slot - next_slot):
+                        write(ring.frames[held])
+                free_queue.put(held)
+            write(ring.frames[index], slot)
+            counters[COUNTER_ENCODED] += 1
+            next_slot = slot + 1
+            held = index
+
+        if held is not None:
+            # 结尾画面未变化时补齐到最后一次捕获的时间
+            if last_hold is not None:
+                tail = round((last_hold - origin) * fps) + 1 - next_slot
+                if tail > 0:
+                    if writer.vfr:
+                        # 与线程管线一致：在最后一个帧槽再写一次最后一帧，确定视频结束时间
+                        write(ring.frames[held], next_slot + tail - 1)
+                    else:
+                        for _ in range(tail):
+                            write(ring.frames[held])
+            free_queue.put(held)
+    except Exception as e:
+        error_queue.put(f"编码进程出错: {e}")
+    finally:
+        # 编码失败时也要放行捕获进程
+        encoder_ready.set()
+        if writer is not None and not writer.release():
+            error_queue.put(f"FFmpeg编码失败: {writer.get_error_output()}")
+        if ring is not None:
+            ring.close()
+
+class ProcessPipeline:
+    """多进程捕获/编码管线控制器（在主进程中使用）"""
+
+    RING_SLOTS = 8
+    START_TIMEOUT = 15.0
+
+    def __init__(self, output_path: str, fps: int, frame_size: Tuple[int, int],
+                 monitor: Dict, format_type: str = "MP4", quality: str = "高质量",
+                 source_spec: Optional[Dict] = None, damage_detection: bool = False,
+                 ffmpeg_path: Optional[str] = None, slots: int = RING_SLOTS,
+                 segment_args: Optional[List[str]] = None):
+        self.output_path = output_path
+        self.fps = fps
+        self.frame_size = frame_size
+        self.monitor = dict(monitor)
+        self.format_type = format_type
+        self.quality = quality
+        self.source_spec = source_spec
+        self.damage_detection = damage_detection
+        self.ffmpeg_path = ffmpeg_path
+        self.slots = max(2, slots)
+        self.segment_args = segment_args  # 分段输出参数，此时output_path为分段文件名模板
+
+        self._ctx = mp.get_context("spawn")
+        self.ring = None
+        self.capture_process = None
+        self.encode_process = None
+        self.counters = None
+        self.errors = []
+        self._error_queue = None
+        self._stop_event = None
+        self._pause_event = None
+        self._sync_objects = ()  # 子进程启动完成前必须保持引用，否则其信号量会被释放
+
+    @staticmethod
+    def is_supported() -> bool:
+        """当前环境是否支持共享内存"""
+        return shared_memory is not None
+
+    def start(self) -> bool:
+        """启动捕获和编码进程，编码器就绪后返回"""
+        if not self.is_supported():
+            self.errors.append("当前Python不支持multiprocessing.shared_memory")
+            return False
+
+        width, height = self.frame_size
+        shape = (height, width, 4)
+        ctx = self._ctx
+
+        self.ring = SharedFrameRing(self.slots, shape)
+        free_queue = ctx.Queue()
+        for index in range(self.slots):
+            free_queue.put(index)
+        ready_queue = ctx.Queue()
+        self._error_queue = ctx.Queue()
+        self._stop_event = ctx.Event()
+        self._pause_event = ctx.Event()
+        encoder_ready = ctx.Event()
+        capture_ready = ctx.Event()
+        self._sync_objects = (free_queue, ready_queue, encoder_ready, capture_ready)
+        self.counters = ctx.Array('q', COUNTER_COUNT, lock=False)
+
+        writer_args = {
+            "output_path": self.output_path, "fps": self.fps, "frame_size": self.frame_size,
+            "format_type": self.format_type, "quality": self.quality,
+            "ffmpeg_path": self.ffmpeg_path, "vfr": self.damage_detection,
+            "segment_args": self.segment_args
+        }
+        self.encode_process = ctx.Process(
+            target=_encode_main, name="encode",
+            args=(writer_args, self.ring.name, self.slots, shape, ready_queue, free_queue,
+                  encoder_ready, self.counters, self._error_queue),
+            daemon=True
+        )
+        self.capture_process = ctx.Process(
+            target=_capture_main, name="capture",
+            args=(self.source_spec, self.monitor, self.fps, self.ring.name, self.slots, shape,
+                  self.damage_detection, free_queue, ready_queue, self._stop_event,
+                  self._pause_event, encoder_ready, capture_ready, self.counters, self._error_queue),
+            daemon=True
+        )
+        self.encode_process.start()
+        self.capture_process.start()
+
+        # 等待两个进程都就绪（或失败退出），录制时长从开始截图算起
+        deadline = time.monotonic() + self.START_TIMEOUT
+        while not capture_ready.wait(0.05):
+            if not self.capture_process.is_alive() or time.monotonic() > deadline:
+                break
+        if (not capture_ready.is_set() or not self.encode_process.is_alive()
+                or not self.capture_process.is_alive()):
+            self.poll_errors()
+            if not self.errors:
+                self.errors.append("编码进程启动失败")
+            self.stop()
+            return False
+        return True
+
+    def pause(self):
+        """暂停截图"""
+        if self._pause_event is not None:
+            self._pause_event.set()
+
+    def resume(self):
+        """恢复截图"""
+        if self._pause_event is not None:
+            self._pause_event.clear()
+
+    def stop(self, timeout: float = 60.0) -> bool:
+        """停止捕获，等待编码进程写完剩余帧并封装，返回是否成功"""
+        if self._stop_event is None:
+            return False
+        self._stop_event.set()
+        self.resume()
+
+        for process, wait in ((self.capture_process, 5.0), (self.encode_process, timeout)):
+            if process is None:
+                continue
+            process.join(wait)
+            if process.is_alive():
+                process.terminate()
+                process.join(1.0)
+                self.errors.append(f"{process.name}进程未能及时退出")
+
+        self.poll_errors()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
+        self._stop_event = None
+        self._sync_objects = ()
+        return not self.errors
+
+    def poll_errors(self) -> List[str]:
+        """取出子进程报告的新错误"""
+        new_errors = []
+        if self._error_queue is not None:
+            while True:
+                try:
+                    new_errors.append(self._error_queue.get_nowait())
+                except (queue.Empty, OSError, ValueError):
+                    break
+        self.errors.extend(new_errors)
+        return new_errors
+
+    def get_stats(self) -> Dict:
+        """获取管线统计"""
+        if self.counters is None:
+            return {}
+        counters = list(self.counters)
+        return {
+            "captured": counters[COUNTER_CAPTURED],
+            "held": counters[COUNTER_HELD],
+            "overruns": counters[COUNTER_OVERRUNS],
+            "skipped": counters[COUNTER_SKIPPED],
+            "late": counters[COUNTER_LATE],
+            "encoded": counters[COUNTER_ENCODED],
+            "written": counters[COUNTER_WRITTEN],
+            "dropped": counters[COUNTER_OVERRUNS] + counters[COUNTER_SKIPPED]
+        }
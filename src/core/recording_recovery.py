@@ -0,0 +1,76 @@
+"""
+录制恢复模块
+
+在后台线程中恢复异常中断的分段录制（拼接分段并合并单独录制的音频），
+拼接长录制需要较长时间，不能阻塞界面线程。
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from core.segment_output import SegmentedRecording
+
+class RecordingRecovery(QObject):
+    """后台恢复一组分段录制
+
+    依次恢复，进度按已完成的录制数和当前录制的拼接进度汇总；
+    全部完成后发出 recovery_finished（成功数, 失败说明列表）。
+    """
+
+    # 信号
+    progress_updated = pyqtSignal(str, int)   # 恢复进度: 当前录制的输出文件名, 总进度百分比
+    recovery_finished = pyqtSignal(int, list)  # 恢复完成: 成功数, 失败说明
+
+    def __init__(self, recordings: List[SegmentedRecording]):
+        super().__init__()
+        self.recordings = list(recordings)
+        self._thread = None
+
+    def start(self):
+        """开始恢复（在工作线程中进行）"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._recover_worker, name="RecordingRecovery", daemon=True)
+        self._thread.start()
+
+    def is_running(self) -> bool:
+        """是否正在恢复"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待恢复完成，返回是否已完成"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.is_running()
+
+    def _recover_worker(self):
+        """工作线程：依次恢复每个录制"""
+        started = time.monotonic()
+        total = len(self.recordings)
+        failed = []
+        for index, recording in enumerate(self.recordings):
+            name = Path(recording.output_path).name
+
+            def report(fraction: float, index=index, name=name):
+                self._emit("progress_updated", name, int((index + max(0.0, min(1.0, fraction))) / total * 100))
+
+            report(0.0)
+            try:
+                success, error = recording.recover(on_progress=report)
+            except Exception as e:
+                success, error = False, str(e)
+            if not success:
+                failed.append(f"{name}: {error}")
+        print(f"录制恢复完成: {total - len(failed)}/{total}, 用时{time.monotonic() - started:.1f}秒")
+        self._emit("recovery_finished", total - len(failed), failed)
+
+    def _emit(self, signal_name: str, *args):
+        """在工作线程中发出信号，失败（如对象已被销毁）时只输出日志"""
+        try:
+            getattr(self, signal_name).emit(*args)
+        except RuntimeError as e:
+            print(f"发出{signal_name}信号失败: {e}")
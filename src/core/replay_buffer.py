@@ -0,0 +1,168 @@
+"""
+即时回放模块
+
+录制持续进行，但只在磁盘上保留最近N分钟的编码分段（按关键帧对齐、文件名循环覆盖），
+需要时把这些分段无损拼接为一个完整视频，不重新编码。
+"""
+
+import math
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from config.settings import AppConfig
+from core.segment_output import (SEGMENT_EXTENSION, build_segment_args, concat_segments,
+                                 read_segment_list)
+
+class ReplayBuffer(QObject):
+    """即时回放分段环
+
+    分段数 = 覆盖回放时长所需的分段 + 正在写入的分段 + 安全余量，
+    磁盘占用只与回放时长和码率有关，与录制总时长无关。
+    保存时只读取最新的分段，最旧的安全余量分段留给ffmpeg循环覆盖，
+    保存期间不会读到正在被覆盖的文件。
+    """
+
+    # 信号
+    replay_saved = pyqtSignal(str)           # 回放已保存（文件路径）
+    error_occurred = pyqtSignal(str)         # 发生错误
+
+    SEGMENT_SECONDS = 2.0
+    SAFETY_SEGMENTS = 2
+    SEGMENT_PATTERN = f"replay_%04d.{SEGMENT_EXTENSION}"
+    LIST_NAME = "replay.csv"
+
+    def __init__(self, duration_seconds: float = 300.0, segment_seconds: float = SEGMENT_SECONDS,
+                 directory: Optional[str] = None):
+        super().__init__()
+        self.duration_seconds = max(segment_seconds, duration_seconds)
+        self.segment_seconds = segment_seconds
+        self.directory = Path(directory or Path(AppConfig.get_temp_dir()) / "replay")
+        self.ring_size = math.ceil(self.duration_seconds / segment_seconds) + 1 + self.SAFETY_SEGMENTS
+        self.is_saving = False
+        self._save_thread = None
+
+    @property
+    def segment_pattern(self) -> str:
+        """分段文件名模板（作为编码器输出路径）"""
+        return str(self.directory / self.SEGMENT_PATTERN)
+
+    @property
+    def list_path(self) -> str:
+        """ffmpeg维护的分段列表"""
+        return str(self.directory / self.LIST_NAME)
+
+    def prepare(self):
+        """清空分段目录，准备开始录制"""
+        self.clear()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def build_output_args(self) -> List[str]:
+        """编码器使用的分段输出参数"""
+        return build_segment_args(self.segment_seconds, self.list_path,
+                                  wrap=self.ring_size, list_size=self.ring_size)
+
+    def _segment_path(self, index: int) -> Path:
+        """循环序号对应的分段文件"""
+        return self.directory / (self.SEGMENT_PATTERN % (index % self.ring_size))
+
+    def get_segments(self) -> List[str]:
+        """按时间顺序返回覆盖最近回放时长的分段（包括正在写入的分段）"""
+        finished = read_segment_list(self.list_path)
+
+        # 正在写入的分段：最后一个已完成分段的下一个序号
+        if finished:
+            last_name = Path(finished[-1][0]).name
+            current = None
+            for index in range(self.ring_size):
+                if self._segment_path(index).name == last_name:
+                    current = self._segment_path(index + 1)
+                    break
+        else:
+            current = self._segment_path(0)
+
+        segments = []
+        if current is not None and current.exists() and current.stat().st_size > 0:
+            if not finished or current.stat().st_mtime >= Path(finished[-1][0]).stat().st_mtime:
+                segments.append(str(current))
+
+        covered = 0.0
+        for path, start, end in reversed(finished):
+            if covered >= self.duration_seconds or len(segments) >= self.ring_size - self.SAFETY_SEGMENTS:
+                break
+            if not Path(path).exists():
+                break
+            segments.append(path)
+            covered += end - start
+
+        segments.reverse()
+        return segments
+
+    def default_output_path(self, format_type: str = "MP4") -> str:
+        """默认的回放文件路径"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return str(Path(AppConfig.get_default_output_dir()) / f"回放_{timestamp}.{format_type.lower()}")
+
+    def save(self, output_path: Optional[str] = None, format_type: str = "MP4") -> bool:
+        """在后台线程中保存最近的回放，返回是否已开始保存"""
+        if self.is_saving:
+            print("回放正在保存中，忽略本次请求")
+            return False
+
+        output_path = output_path or self.default_output_path(format_type)
+        self.is_saving = True
+        self._save_thread = threading.Thread(target=self._save_worker, args=(output_path, format_type),
+                                             daemon=True)
+        self._save_thread.start()
+        return True
+
+    def save_sync(self, output_path: str, format_type: str = "MP4") -> bool:
+        """同步保存最近的回放"""
+        segments = self.get_segments()
+        if not segments:
+            self.error_occurred.emit("回放缓冲中还没有可保存的内容")
+            return False
+
+        started = time.monotonic()
+        success, error = concat_segments(segments, output_path, format_type=format_type)
+        if not success:
+            self.error_occurred.emit(f"保存回放失败: {error}")
+            return False
+
+        print(f"回放已保存: {output_path}（{len(segments)}个分段, {time.monotonic() - started:.2f}秒）")
+        self.replay_saved.emit(output_path)
+        return True
+
+    def _save_worker(self, output_path: str, format_type: str):
+        """保存线程"""
+        try:
+            self.save_sync(output_path, format_type)
+        finally:
+            self.is_saving = False
+
+    def wait_for_save(self, timeout: Optional[float] = None):
+        """等待后台保存完成"""
+        thread = self._save_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def clear(self):
+        """删除所有分段"""
+        if self.directory.exists():
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def get_stats(self) -> dict:
+        """获取分段环统计（分段数、磁盘占用）"""
+        files = list(self.directory.glob(f"*.{SEGMENT_EXTENSION}")) if self.directory.exists() else []
+        return {
+            "segments": len(files),
+            "ring_size": self.ring_size,
+            "bytes": sum(f.stat().st_size for f in files if f.exists()),
+            "duration_seconds": self.duration_seconds,
+            "saving": self.is_saving
+        }
@@ -11,24 +11,43 @@ import mss
 import platform
 from PyQt6.QtCore import QObject, pyqtSignal
 
+from core.frame_scheduler import FrameScheduler
+from core.frame_ring import FrameRing
+from core.damage_detector import DamageDetector
+
 class ScreenCapture(QObject):
     """屏幕捕获类"""
     
     # 信号
     frame_captured = pyqtSignal(np.ndarray)  # 捕获到新帧
+    frame_held = pyqtSignal(float)           # 画面未变化（捕获时间戳，time.monotonic）
     capture_started = pyqtSignal()           # 开始捕获
     capture_stopped = pyqtSignal()           # 停止捕获
     error_occurred = pyqtSignal(str)         # 发生错误
     
-    def __init__(self):
+    def __init__(self, source_factory: Optional[Callable] = None):
         super().__init__()
-        self.sct = mss.mss()
+        # 画面源工厂，返回与mss.mss接口兼容的对象（可替换为合成画面源）
+        self.source_factory = source_factory or mss.mss
+        self.source_spec = getattr(source_factory, "spec", None)  # 可在子进程中重建的源描述，None为mss
+        self.sct = self.source_factory()
         self.is_capturing = False
+        self.is_paused = False
         self.capture_thread = None
+        self._resume_event = threading.Event()  # 未暂停时处于置位状态
+        self._resume_event.set()
         self.fps = 30
         self.region = None  # 捕获区域 (x, y, width, height)
         self.monitor_index = 0  # 显示器索引
         self._thread_local_sct = None  # 线程本地的mss对象
+        self.scheduler = FrameScheduler(self.fps)  # 帧调度器
+        self.fill_dropped_slots = True  # 用上一帧填充错过的帧槽，保持输出帧率
+        self.frame_ring = FrameRing()  # 捕获循环使用的预分配帧缓冲
+        self.output_bgra = False  # 直接输出BGRA帧，跳过颜色转换
+        self._ring_consumers = 0  # 会调用release_frame归还帧的消费者数量
+        self.damage_detector = None  # 启用后画面未变化的帧只发出frame_held
+        self.held_frames = 0  # 因画面未变化而未发出的帧数
+        self.frame_timestamp = 0.0  # 正在发出的帧的捕获时间（time.monotonic），供直连的槽函数读取
         
     def get_monitors(self):
         """获取所有显示器信息"""
@@ -70,59 +89,203 @@ class ScreenCapture(QObject):
         monitor = self.sct.monitors[self.monitor_index] if self.monitor_index < len(self.sct.monitors) else self.sct.monitors[1]
         return monitor['width'], monitor['height']
     
+    def get_capture_target(self, sct=None) -> dict:
+        """获取截图区域（指定区域或整个显示器）"""
+        if self.region:
+            return dict(self.region)
+        sct = sct or self.sct
+        monitor = sct.monitors[self.monitor_index] if self.monitor_index < len(sct.monitors) else sct.monitors[1]
+        return dict(monitor)
+    
     def _get_thread_sct(self):
         """获取线程本地的mss对象"""
         # 在捕获线程中，使用独立的mss对象避免线程本地存储问题
         if threading.current_thread() != threading.main_thread():
             if self._thread_local_sct is None:
-                self._thread_local_sct = mss.mss()
+                self._thread_local_sct = self.source_factory()
             return self._thread_local_sct
         else:
             return self.sct
     
-    def capture_frame(self) -> Optional[np.ndarray]:
-        """捕获单帧"""
+    def set_output_bgra(self, enabled: bool):
+        """设置是否直接输出BGRA帧（供可接受BGRA的消费者使用）"""
+        self.output_bgra = enabled
+    
+    def enable_frame_ring(self, slots: int = 8):
+        """启用预分配帧缓冲环"""
+        self.frame_ring = FrameRing(slots)
+    
+    def disable_frame_ring(self):
+        """禁用帧缓冲环，每帧单独分配"""
+        self.frame_ring = None
+    
+    def enable_damage_detection(self, tile_size: int = DamageDetector.TILE_SIZE):
+        """启用画面变化检测
+
+        启用后未变化的帧不做颜色转换也不发出frame_captured，只发出frame_held；
+        错过的帧槽也不再用重复帧补齐，由消费者按时间戳放置帧（可变帧率）。
+        """
+        self.damage_detector = DamageDetector(tile_size)
+    
+    def disable_damage_detection(self):
+        """禁用画面变化检测，每个帧槽都发出帧"""
+        self.damage_detector = None
+    
+    def register_frame_consumer(self):
+        """注册一个会归还帧的消费者
+
+        注册后，捕获循环发出的每一帧都会为该消费者保留一次引用，
+        消费者处理完后必须调用 release_frame() 归还。
+        """
+        self._ring_consumers += 1
+    
+    def unregister_frame_consumer(self):
+        """取消注册帧消费者"""
+        self._ring_consumers = max(0, self._ring_consumers - 1)
+    
+    def retain_frame(self, frame):
+        """为帧额外保留一次引用（只处理部分帧的消费者在frame_captured中直接调用）"""
+        ring = self.frame_ring
+        if ring is not None:
+            ring.retain(frame)
+
+    def release_frame(self, frame):
+        """归还帧缓冲（非缓冲环中的帧会被忽略）"""
+        ring = self.frame_ring
+        if ring is not None:
+            ring.release(frame)
+    
+    def capture_frame(self, pooled: bool = False) -> Optional[np.ndarray]:
+        """捕获单帧
+
+        pooled为True时BGR帧写入缓冲环中的预分配缓冲，调用方持有一次引用。
+        """
+        raw = self._grab_raw()
+        if raw is None:
+            return None
+        return self._convert_raw(raw, pooled)
+    
+    def _grab_raw(self) -> Optional[np.ndarray]:
+        """截图并返回原始BGRA帧"""
         try:
             # 使用线程安全的mss对象
             sct = self._get_thread_sct()
             
-            if self.region:
-                # 捕获指定区域
-                screenshot = sct.grab(self.region)
-            else:
-                # 捕获整个显示器
-                monitor = sct.monitors[self.monitor_index] if self.monitor_index < len(sct.monitors) else sct.monitors[1]
-                screenshot = sct.grab(monitor)
+            screenshot = sct.grab(self.get_capture_target(sct))
             
-            # 转换为numpy数组
-            frame = np.array(screenshot)
+            # 直接引用mss的原始BGRA缓冲区，避免np.array()的额外拷贝
+            return np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
             
-            # 转换颜色格式 BGRA -> BGR
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        except Exception as e:
+            self.error_occurred.emit(f"捕获帧失败: {str(e)}")
+            return None
+    
+    def _convert_raw(self, raw: np.ndarray, pooled: bool = False) -> Optional[np.ndarray]:
+        """把原始BGRA帧转换为输出格式"""
+        # BGRA模式下原样交给消费者，缓冲区每次截图都是新的，无需再拷贝
+        if self.output_bgra:
+            return raw
+        
+        try:
+            ring = self.frame_ring if pooled else None
+            if ring is not None:
+                frame = ring.acquire(raw.shape[:2] + (3,))
+                if frame is not None:
+                    # 颜色转换直接写入预分配缓冲
+                    cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR, dst=frame)
+                    return frame
             
-            return frame
+            # 转换颜色格式 BGRA -> BGR
+            return cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR)
             
         except Exception as e:
             self.error_occurred.emit(f"捕获帧失败: {str(e)}")
             return None
     
+    def _emit_frame(self, frame: np.ndarray, timestamp: float):
+        """发出帧信号，并为已注册的消费者保留引用"""
+        self.frame_timestamp = timestamp
+        if self._ring_consumers and self.frame_ring is not None:
+            self.frame_ring.retain(frame, self._ring_consumers)
+        self.frame_captured.emit(frame)
+    
     def _capture_loop(self):
         """捕获循环（在单独线程中运行）"""
-        frame_interval = 1.0 / self.fps
-        last_time = time.time()
-        
+        scheduler = self.scheduler
+        scheduler.start(self.fps)
+        last_frame = None
+
         while self.is_capturing:
-            current_time = time.time()
-            
-            # 控制帧率
-            if current_time - last_time >= frame_interval:
-                frame = self.capture_frame()
-                if frame is not None:
-                    self.frame_captured.emit(frame)
-                last_time = current_time
-            else:
-                # 短暂休眠以避免CPU占用过高
-                time.sleep(0.001)
+            if not self._resume_event.is_set():
+                # 暂停期间不截图；恢复后从当前时间重新排帧槽，暂停的时长不计为丢帧
+                self._resume_event.wait()
+                scheduler.restart_clock()
+                continue
+
+            # 精确睡眠到下一个帧槽的截止时间
+            slot, deadline, skipped = scheduler.wait_next(lambda: self.is_capturing and not self.is_paused)
+            if not self.is_capturing:
+                break
+            if self.is_paused:
+                continue
+
+            detector = self.damage_detector
+            if skipped:
+                # 最多补齐1秒的帧槽，更长的停顿直接计为丢帧；可变帧率模式下不补齐
+                fill = min(skipped, scheduler.fps) if self.fill_dropped_slots and last_frame is not None else 0
+                if detector is not None:
+                    fill = 0
+                for i in range(fill):
+                    # 补齐的帧使用所在帧槽的截止时间
+                    self._emit_frame(last_frame, scheduler.deadline(slot - skipped + i))
+                scheduler.record_duplicated(fill)
+                scheduler.record_dropped(skipped - fill)
+
+            captured = time.monotonic()
+            raw = self._grab_raw()
+            if raw is not None and detector is not None and not detector.update(raw) and last_frame is not None:
+                # 画面未变化：跳过颜色转换和编码，只通知时间戳
+                self.held_frames += 1
+                self.frame_held.emit(captured)
+                continue
+
+            frame = self._convert_raw(raw, pooled=True) if raw is not None else None
+            if frame is None:
+                # 捕获失败时重复上一帧，避免帧槽空缺
+                if last_frame is not None:
+                    self._emit_frame(last_frame, captured)
+                    scheduler.record_duplicated()
+                else:
+                    scheduler.record_dropped()
+                continue
+
+            # 捕获线程对最近一帧保留一次引用，用于填充帧槽
+            self.release_frame(last_frame)
+            last_frame = frame
+            self._emit_frame(frame, captured)
+
+        self.release_frame(last_frame)
+    
+    @property
+    def late_frames(self) -> int:
+        """晚于截止时间捕获的帧数"""
+        return self.scheduler.late_frames
+    
+    @property
+    def dropped_frames(self) -> int:
+        """丢弃的帧槽数"""
+        return self.scheduler.dropped_frames
+    
+    @property
+    def duplicated_frames(self) -> int:
+        """以重复帧填充的帧槽数"""
+        return self.scheduler.duplicated_frames
+    
+    def get_capture_stats(self) -> dict:
+        """获取捕获统计信息"""
+        stats = self.scheduler.get_stats()
+        stats["held"] = self.held_frames
+        return stats
     
     def start_capture(self):
         """开始捕获"""
@@ -130,6 +293,11 @@ class ScreenCapture(QObject):
             return
         
         self.is_capturing = True
+        self.is_paused = False
+        self._resume_event.set()
+        self.held_frames = 0
+        if self.damage_detector is not None:
+            self.damage_detector.reset()
         self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
         self.capture_thread.start()
         self.capture_started.emit()
@@ -140,6 +308,8 @@ class ScreenCapture(QObject):
             return
         
         self.is_capturing = False
+        self.is_paused = False
+        self._resume_event.set()
         if self.capture_thread and self.capture_thread.is_alive():
             self.capture_thread.join(timeout=1.0)
         
@@ -153,6 +323,23 @@ class ScreenCapture(QObject):
         
         self.capture_stopped.emit()
     
+    def pause_capture(self):
+        """暂停捕获
+
+        捕获线程和截图句柄保持不变，只是不再截图，resume_capture() 后立即恢复。
+        """
+        if not self.is_capturing or self.is_paused:
+            return
+        self.is_paused = True
+        self._resume_event.clear()
+    
+    def resume_capture(self):
+        """恢复捕获"""
+        if not self.is_paused:
+            return
+        self.is_paused = False
+        self._resume_event.set()
+    
     def take_screenshot(self, save_path: str = None) -> Optional[np.ndarray]:
         """截图"""
         frame = self.capture_frame()
@@ -0,0 +1,391 @@
+"""
+分段输出模块
+
+构建ffmpeg segment复用器参数（按关键帧切分、可循环覆盖），
+读取分段列表，并用concat分离器无损拼接分段。
+SegmentedRecording 把一次长时间录制写成带清单的分段，异常退出后也能恢复。
+"""
+
+import csv
+import json
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+from config.settings import AppConfig
+from core.ffmpeg_progress import FFmpegProgressReader, with_progress_args
+from utils.ffmpeg_locator import find_ffmpeg
+
+# 分段容器：matroska在写入过程中即可播放，进程异常退出时已写入的数据仍可读取
+SEGMENT_FORMAT = "matroska"
+SEGMENT_EXTENSION = "mkv"
+
+# 分段录制使用碎片化MP4：可变帧率拼接后时长准确，每秒写出一个片段，异常退出最多丢失约1秒
+FRAGMENTED_MP4_OPTIONS = "movflags=+frag_keyframe+empty_moov+default_base_moof:frag_duration=1000000"
+
+# 只有文件头、没有采样的WAV文件大小
+WAV_HEADER_BYTES = 44
+
+def build_segment_args(segment_time: float, list_path: str, wrap: int = 0, list_size: int = 0,
+                       segment_format: str = SEGMENT_FORMAT,
+                       format_options: Optional[str] = None) -> List[str]:
+    """构建segment复用器输出参数
+
+    每隔segment_time秒强制插入关键帧，保证每个分段都从关键帧开始、可独立播放。
+    wrap大于0时分段文件名循环使用，磁盘上最多保留wrap个分段；
+    list_size大于0时分段列表只保留最近的条目。
+    """
+    args = [
+        '-force_key_frames', f'expr:gte(t,n_forced*{segment_time:g})',
+        '-f', 'segment', '-segment_time', f'{segment_time:g}',
+        '-segment_format', segment_format,
+        '-segment_list', list_path, '-segment_list_type', 'csv',
+        '-reset_timestamps', '1'
+    ]
+    if format_options:
+        args.extend(['-segment_format_options', format_options])
+    if wrap > 0:
+        args.extend(['-segment_wrap', str(wrap)])
+    if list_size > 0:
+        args.extend(['-segment_list_size', str(list_size)])
+    return args
+
+def read_segment_list(list_path: str) -> List[Tuple[str, float, float]]:
+    """读取csv分段列表，返回 (文件路径, 开始时间, 结束时间)，只包含已写完的分段"""
+    segments = []
+    try:
+        with open(list_path, newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                if len(row) < 3:
+                    continue
+                try:
+                    start, end = float(row[1]), float(row[2])
+                except ValueError:
+                    continue
+                path = row[0] if os.path.isabs(row[0]) else str(Path(list_path).parent / row[0])
+                segments.append((path, start, end))
+    except OSError:
+        pass
+    return segments
+
+def concat_segments(segments: Sequence[Union[str, Tuple[str, Optional[float]]]], output_path: str,
+                    ffmpeg_path: Optional[str] = None, format_type: str = "MP4",
+                    timeout: float = 600, audio_path: Optional[str] = None,
+                    audio_codec: str = "copy", duration: float = 0.0,
+                    on_progress: Optional[Callable[[float], None]] = None) -> Tuple[bool, str]:
+    """用concat分离器把分段无损拼接为一个文件，返回 (是否成功, 错误信息)
+
+    segments 的元素可以是路径，也可以是 (路径, 时长)。给出时长时下一分段从该时长处接续，
+    可变帧率分段末尾的静止时间不会因拼接而丢失。
+    给出 audio_path 时只取分段中的视频，音频来自该文件，按 audio_codec 编码（如WAV需编码为aac）。
+    给出 on_progress 时按输出时长占 duration 的比例回调进度（0-1）。
+    """
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+    if not ffmpeg_path:
+        return False, "FFmpeg不可用"
+    if not segments:
+        return False, "没有可拼接的分段"
+
+    list_fd, list_file = tempfile.mkstemp(prefix="concat_", suffix=".txt")
+    try:
+        with os.fdopen(list_fd, "w", encoding="utf-8") as f:
+            for segment in segments:
+                path, duration = segment if isinstance(segment, tuple) else (segment, None)
+                escaped = str(Path(path).resolve()).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+                if duration:
+                    f.write(f"duration {duration:.6f}\n")
+
+        cmd = [ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y',
+               '-f', 'concat', '-safe', '0', '-i', list_file]
+        if audio_path:
+            cmd.extend(['-i', audio_path, '-map', '0:v', '-map', '1:a'])
+        else:
+            cmd.extend(['-map', '0'])
+        cmd.extend(['-c', 'copy'])
+        if audio_path and audio_codec != "copy":
+            cmd.extend(['-c:a', audio_codec])
+        if format_type in ("MP4", "MOV"):
+            cmd.extend(['-movflags', '+faststart'])
+        cmd.append(output_path)
+
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        if on_progress is None:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+            returncode, error = result.returncode, result.stderr.strip()
+        else:
+            process = subprocess.Popen(with_progress_args(cmd), stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+            def callback(progress):
+                if progress["percent"] >= 0:
+                    on_progress(progress["percent"] / 100)
+
+            reader = FFmpegProgressReader(process, duration, callback)
+            reader.start()
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                reader.join()
+            returncode, error = process.returncode, reader.get_error_output()
+        if returncode != 0:
+            return False, error or f"FFmpeg退出码 {returncode}"
+        return True, ""
+    except subprocess.TimeoutExpired:
+        return False, "拼接分段超时"
+    except OSError as e:
+        return False, str(e)
+    finally:
+        try:
+            os.remove(list_file)
+        except OSError:
+            pass
+
+def repair_wav_length(path: str) -> bool:
+    """按文件大小回填WAV头中的长度，返回是否得到了有采样的文件
+
+    录制中溢写的WAV文件只在正常结束时回填长度，进程异常退出后头中的长度不含之后写入的采样。
+    只处理标准的44字节PCM文件头（wave模块写出的格式）。
+    """
+    try:
+        with open(path, "r+b") as f:
+            header = f.read(WAV_HEADER_BYTES)
+            if len(header) < WAV_HEADER_BYTES or header[:4] != b"RIFF" or header[8:12] != b"WAVE" \
+                    or header[36:40] != b"data":
+                return False
+            block_align = max(1, struct.unpack_from("<H", header, 32)[0])
+            size = os.fstat(f.fileno()).st_size
+            data_size = (size - WAV_HEADER_BYTES) // block_align * block_align
+            if data_size <= 0:
+                return False
+            if struct.unpack_from("<I", header, 40)[0] != data_size:
+                f.seek(4)
+                f.write(struct.pack("<I", WAV_HEADER_BYTES - 8 + data_size))
+                f.seek(40)
+                f.write(struct.pack("<I", data_size))
+            return True
+    except OSError as e:
+        print(f"修复音频文件失败 {path}: {e}")
+        return False
+
+class SegmentedRecording:
+    """带清单的分段录制
+
+    录制期间编码器把视频写成固定时长的分段（每段从关键帧开始，可独立播放），
+    ffmpeg每写完一段就更新csv分段列表；清单（manifest.json）记录输出路径和录制参数。
+    停止时用concat分离器无损拼接，不重新编码；进程异常退出时分段和清单保留在磁盘上，
+    可用 recover() 恢复。音频录制到单独的WAV文件时清单记录其路径（audio_path），
+    恢复时一并合并。
+    """
+
+    MANIFEST_NAME = "manifest.json"
+    LIST_NAME = "segments.csv"
+    SEGMENT_EXTENSION = "mp4"
+    SEGMENT_PATTERN = f"segment_%05d.{SEGMENT_EXTENSION}"
+    DEFAULT_SEGMENT_SECONDS = 60.0
+
+    STATUS_RECORDING = "recording"
+    STATUS_FINALIZED = "finalized"
+    STATUS_FAILED = "failed"
+
+    def __init__(self, output_path: str, directory: Optional[str] = None,
+                 segment_seconds: float = DEFAULT_SEGMENT_SECONDS, format_type: str = "MP4"):
+        self.output_path = output_path
+        self.format_type = format_type
+        self.segment_seconds = max(1.0, segment_seconds)
+        if directory is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            directory = Path(self.get_root_dir()) / f"{Path(output_path).stem}_{timestamp}"
+        self.directory = Path(directory)
+        self.status = self.STATUS_RECORDING
+        self.params = {}
+        self.vfr = False  # 可变帧率分段需按分段列表中的开始时间拼接
+        self.audio_path = None  # 录制期间溢写的WAV文件（音频与视频事后合并时）
+
+    @staticmethod
+    def get_root_dir() -> str:
+        """所有分段录制所在的目录"""
+        return str(Path(AppConfig.get_temp_dir()) / "segments")
+
+    @staticmethod
+    def segment_seconds_for_size(size_mb: float, quality: str) -> float:
+        """按质量设置的码率上限把分段大小换算为分段时长"""
+        settings = AppConfig.QUALITY_SETTINGS.get(quality, AppConfig.QUALITY_SETTINGS[AppConfig.DEFAULT_QUALITY])
+        bitrate = settings["bitrate"]
+        bits_per_second = float(bitrate[:-1]) * (1_000_000 if bitrate[-1] in "Mm" else 1_000)
+        return max(1.0, size_mb * 8 * 1_000_000 / bits_per_second)
+
+    @property
+    def segment_pattern(self) -> str:
+        """分段文件名模板（作为编码器输出路径）"""
+        return str(self.directory / self.SEGMENT_PATTERN)
+
+    @property
+    def list_path(self) -> str:
+        """ffmpeg维护的分段列表"""
+        return str(self.directory / self.LIST_NAME)
+
+    @property
+    def manifest_path(self) -> str:
+        """清单文件"""
+        return str(self.directory / self.MANIFEST_NAME)
+
+    def start(self, vfr: bool = False, audio_path: Optional[str] = None, **params):
+        """创建分段目录并写入清单（params为录制参数，仅用于记录）
+
+        audio_path 为单独录制的WAV文件，正常停止时由录制器合并，异常退出后由 recover() 合并。
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.status = self.STATUS_RECORDING
+        self.vfr = vfr
+        self.audio_path = audio_path
+        self.params = params
+        self.write_manifest()
+
+    def build_output_args(self) -> List[str]:
+        """编码器使用的分段输出参数"""
+        # 可变帧率时编码器已不用B帧（见 FFmpegPipeWriter），分段时间戳不会整体偏移
+        return build_segment_args(self.segment_seconds, self.list_path, segment_format="mp4",
+                                  format_options=FRAGMENTED_MP4_OPTIONS)
+
+    def get_segments(self) -> List[Tuple[str, Optional[float]]]:
+        """按顺序返回 (分段路径, 时长)
+
+        可变帧率时时长取相邻分段开始时间之差（包含分段末尾的静止时间），
+        最后一段（可能未写完）和固定帧率的分段不指定时长。
+        """
+        starts = {Path(path).name: start for path, start, _ in read_segment_list(self.list_path)}
+        files = sorted(p for p in self.directory.glob(f"segment_*.{self.SEGMENT_EXTENSION}")
+                       if p.stat().st_size > 0)
+
+        segments = []
+        for index, path in enumerate(files):
+            duration = None
+            if self.vfr and index + 1 < len(files):
+                start, next_start = starts.get(path.name), starts.get(files[index + 1].name)
+                if start is not None and next_start is not None and next_start > start:
+                    duration = next_start - start
+            segments.append((str(path), duration))
+        return segments
+
+    def write_manifest(self, error: str = ""):
+        """原子写入清单"""
+        manifest = {
+            "output_path": self.output_path,
+            "format": self.format_type,
+            "segment_seconds": self.segment_seconds,
+            "vfr": self.vfr,
+            "audio_path": self.audio_path,
+            "status": self.status,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "params": self.params,
+            "segments": [
+                {"file": Path(path).name, "duration": duration}
+                for path, duration in self.get_segments()
+            ] if self.directory.exists() else []
+        }
+        if error:
+            manifest["error"] = error
+        temp_path = f"{self.manifest_path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.manifest_path)
+        except OSError as e:
+            print(f"写入分段清单失败: {e}")
+
+    def finalize(self, output_path: Optional[str] = None, keep_segments: bool = False,
+                 audio_path: Optional[str] = None,
+                 on_progress: Optional[Callable[[float], None]] = None) -> Tuple[bool, str]:
+        """无损拼接所有分段，成功后删除分段目录，返回 (是否成功, 错误信息)
+
+        给出 audio_path 时同时混入该WAV文件（编码为AAC，与录制器的音频合并一致）；
+        on_progress 按拼接进度回调（0-1，按分段时长估算）。
+        """
+        output_path = output_path or self.output_path
+        started = time.monotonic()
+        segments = self.get_segments()
+        duration = len(segments) * self.segment_seconds
+        success, error = concat_segments(segments, output_path, format_type=self.format_type,
+                                         timeout=max(600, duration), audio_path=audio_path,
+                                         audio_codec="aac", duration=duration, on_progress=on_progress)
+
+        if not success:
+            # 保留分段和清单，之后仍可恢复
+            self.status = self.STATUS_FAILED
+            self.write_manifest(error)
+            return False, error
+
+        print(f"分段已拼接: {output_path}（{len(segments)}个分段, {time.monotonic() - started:.2f}秒）")
+        self.status = self.STATUS_FINALIZED
+        if keep_segments:
+            self.write_manifest()
+        else:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        return True, ""
+
+    def discard(self):
+        """删除分段目录"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @classmethod
+    def load(cls, manifest_path: str) -> "SegmentedRecording":
+        """从清单加载分段录制"""
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        recording = cls(manifest["output_path"], str(Path(manifest_path).parent),
+                        manifest.get("segment_seconds", cls.DEFAULT_SEGMENT_SECONDS),
+                        manifest.get("format", "MP4"))
+        recording.status = manifest.get("status", cls.STATUS_RECORDING)
+        recording.vfr = manifest.get("vfr", False)
+        recording.params = manifest.get("params", {})
+        recording.audio_path = manifest.get("audio_path")
+        return recording
+
+    @classmethod
+    def find_unfinished(cls, root: Optional[str] = None) -> List["SegmentedRecording"]:
+        """查找未完成拼接的分段录制（录制中异常退出或拼接失败）"""
+        recordings = []
+        root_dir = Path(root or cls.get_root_dir())
+        if not root_dir.exists():
+            return recordings
+        for manifest_path in sorted(root_dir.glob(f"*/{cls.MANIFEST_NAME}")):
+            try:
+                recording = cls.load(str(manifest_path))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"读取分段清单失败 {manifest_path}: {e}")
+                continue
+            if recording.status != cls.STATUS_FINALIZED:
+                recordings.append(recording)
+        return recordings
+
+    def recover(self, output_path: Optional[str] = None,
+                on_progress: Optional[Callable[[float], None]] = None) -> Tuple[bool, str]:
+        """拼接异常中断的录制并合并单独录制的音频（输出文件已存在时另存为 *_recovered）
+
+        on_progress 按拼接进度回调（0-1）。
+        """
+        output_path = output_path or self.output_path
+        if os.path.exists(output_path):
+            path = Path(output_path)
+            output_path = str(path.with_name(f"{path.stem}_recovered{path.suffix}"))
+        audio_path = self.audio_path
+        if audio_path and not repair_wav_length(audio_path):
+            audio_path = None  # 音频文件已丢失或没有写入采样，只恢复视频
+        success, error = self.finalize(output_path, audio_path=audio_path, on_progress=on_progress)
+        if success and audio_path:
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+        return success, error
@@ -0,0 +1,173 @@
+"""
+关键帧感知的智能裁剪模块
+
+裁剪范围内完整的GOP直接复制数据包，只有起点和终点所在的不完整GOP重新编码
+（使用与源视频相同的编解码器和像素格式），最后无损拼接。
+裁剪点精确到帧，耗时接近直接复制。
+"""
+
+import bisect
+import math
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config.settings import AppConfig
+from core.ffmpeg_progress import run_processes
+from core.media_probe import find_keyframes, list_frame_times
+from core.segment_output import concat_segments
+from utils.ffmpeg_locator import get_ffmpeg_locator
+
+# 源视频编解码器对应的编码器，不在表中的编解码器无法智能裁剪
+ENCODERS = {
+    "h264": "libx264",
+    "hevc": "libx265",
+    "vp9": "libvpx-vp9",
+    "vp8": "libvpx",
+    "mpeg4": "mpeg4"
+}
+
+# 支持 -crf 质量参数的编码器
+CRF_ENCODERS = ("libx264", "libx265")
+
+def format_time(seconds: float) -> str:
+    """格式化为ffmpeg时间参数，向下取整到微秒
+
+    ffmpeg按微秒解析时间，向下取整保证定位点不晚于目标帧，该帧不会被丢弃。
+    """
+    return f"{math.floor(seconds * 1_000_000) / 1_000_000:.6f}"
+
+class SmartTrim:
+    """一次智能裁剪
+
+    plan() 在工作线程中读取关键帧和逐帧时间并划分片段：
+    起点到第一个关键帧、最后一个关键帧到终点重新编码，中间复制；
+    范围内没有完整的GOP时整段重新编码。各片段按帧数截取，边界不会重复或丢帧。
+    """
+
+    def __init__(self, ffmpeg_path: str, input_path: str, output_path: str,
+                 start: float, duration: float, info: Dict, encode_args: Optional[List[str]] = None,
+                 work_dir: Optional[str] = None):
+        self.ffmpeg_path = ffmpeg_path
+        self.input_path = input_path
+        self.output_path = output_path
+        self.start = max(0.0, start)
+        self.duration = duration
+        self.encoder = ENCODERS.get(info.get("video_codec", ""))
+        self.pix_fmt = info.get("pix_fmt", "")
+        self.has_audio = bool(info.get("audio_codec"))
+        self.encode_args = list(encode_args or [])
+        self.work_dir = Path(work_dir) if work_dir else None
+        self.suffix = Path(output_path).suffix or ".mp4"
+        self.parts = []  # (是否复制, 开始时间, 帧数, 时长)
+        self.range = (0.0, 0.0)
+
+    def plan(self, duration: float = 0.0) -> bool:
+        """划分复制和重新编码的片段，返回是否可以智能裁剪"""
+        encoders = get_ffmpeg_locator().get_info(self.ffmpeg_path).get("encoders")
+        if not self.encoder or (encoders and self.encoder not in encoders):
+            return False
+        frames = list_frame_times(self.ffmpeg_path, self.input_path)
+        keyframes = find_keyframes(self.ffmpeg_path, self.input_path)
+        if not frames or not keyframes:
+            return False
+
+        # 裁剪范围内的帧：显示时间在 [起点, 终点) 内
+        eps = 1e-4
+        end = self.start + self.duration if self.duration > 0 else math.inf
+        first = bisect.bisect_left(frames, self.start - eps)
+        last = bisect.bisect_left(frames, end - eps)
+        if first >= last:
+            return False
+        start_time = frames[first]
+        if last < len(frames):
+            frame_end = frames[last]
+        else:
+            frame_end = frames[-1] + (frames[-1] - frames[-2] if len(frames) > 1 else 0.0)
+        end_time = min(end, frame_end)
+        self.range = (start_time, end_time)
+
+        def count(a: float, b: float) -> int:
+            return bisect.bisect_left(frames, b - eps) - bisect.bisect_left(frames, a - eps)
+
+        # 中间可复制的部分：第一个不早于起点的关键帧到最后一个不晚于终点的关键帧，
+        # 裁剪到文件末尾时最后一个GOP也完整
+        if last >= len(frames):
+            keyframes = keyframes + [frame_end]
+        k1 = bisect.bisect_left(keyframes, start_time - eps)
+        k2 = bisect.bisect_right(keyframes, end_time + eps) - 1
+        if k1 >= len(keyframes) or k2 <= k1 or keyframes[k2] > end_time + eps:
+            self.parts = [(False, start_time, last - first, end_time - start_time)]
+        else:
+            copy_start, copy_end = keyframes[k1], keyframes[k2]
+            self.parts = []
+            if count(start_time, copy_start) > 0:
+                self.parts.append((False, start_time, count(start_time, copy_start), copy_start - start_time))
+            self.parts.append((True, copy_start, count(copy_start, copy_end), copy_end - copy_start))
+            if count(copy_end, end_time) > 0:
+                self.parts.append((False, copy_end, count(copy_end, end_time), end_time - copy_end))
+
+        copied = sum(part[3] for part in self.parts if part[0])
+        print(f"智能裁剪: {start_time:.3f}-{end_time:.3f}秒，复制{copied:.1f}秒，"
+              f"重新编码{end_time - start_time - copied:.1f}秒")
+        return True
+
+    def _part_path(self, index: int) -> Path:
+        return self.work_dir / f"part_{index:03d}{self.suffix}"
+
+    def _audio_path(self) -> Path:
+        return self.work_dir / f"audio{self.suffix}"
+
+    def build_part_cmd(self, index: int) -> List[str]:
+        """构建一个片段的命令（复制或按源编解码器重新编码）"""
+        copy, start, frame_count, _ = self.parts[index]
+        cmd = [self.ffmpeg_path, '-ss', format_time(start), '-i', self.input_path,
+               '-map', '0:v:0', '-an', '-sn', '-frames:v', str(frame_count)]
+        if copy:
+            cmd.extend(['-c', 'copy'])
+        else:
+            cmd.extend(['-c:v', self.encoder])
+            if self.encoder in CRF_ENCODERS:
+                cmd.extend(self.encode_args)
+            if self.pix_fmt:
+                cmd.extend(['-pix_fmt', self.pix_fmt])
+            cmd.extend(['-fps_mode', 'passthrough'])
+        cmd.extend(['-y', str(self._part_path(index))])
+        return cmd
+
+    def build_audio_cmd(self) -> List[str]:
+        """构建音频裁剪命令（复制音频数据包，误差在一个音频帧内）"""
+        start_time, end_time = self.range
+        return [self.ffmpeg_path, '-ss', format_time(start_time), '-i', self.input_path,
+                '-t', f'{end_time - start_time:.6f}', '-map', '0:a:0', '-vn', '-sn', '-c', 'copy',
+                '-y', str(self._audio_path())]
+
+    def run(self, job, on_progress: Optional[Callable[[Dict], None]] = None) -> Tuple[bool, str]:
+        """生成所有片段并拼接，返回 (是否成功, 错误信息)"""
+        if self.work_dir is None:
+            self.work_dir = Path(AppConfig.get_temp_dir()) / "trim" / job.job_id
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            return self._run(job, on_progress)
+        finally:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _run(self, job, on_progress) -> Tuple[bool, str]:
+        started = time.monotonic()
+        commands = [(self.build_part_cmd(i), self.parts[i][3]) for i in range(len(self.parts))]
+        if self.has_audio:
+            commands.append((self.build_audio_cmd(), 0.0))
+        start_time, end_time = self.range
+        success, error = run_processes(job, commands, end_time - start_time, on_progress)
+        if not success:
+            return False, error
+
+        success, error = concat_segments(
+            [str(self._part_path(i)) for i in range(len(self.parts))], self.output_path,
+            self.ffmpeg_path, format_type=self.suffix.lstrip(".").upper(),
+            audio_path=str(self._audio_path()) if self.has_audio else None
+        )
+        if success:
+            print(f"智能裁剪完成: {len(self.parts)}个片段, 用时{time.monotonic() - started:.1f}秒")
+        return success, error
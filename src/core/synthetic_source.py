@@ -0,0 +1,113 @@
+"""
+合成画面源模块
+
+提供与 mss.mss 接口兼容的测试图案源（monitors/grab/close），
+可替代真实屏幕用于基准测试和无显示器环境。
+"""
+
+import threading
+import time
+from typing import Dict
+
+import numpy as np
+
+class SyntheticScreenshot:
+    """与 mss 截图对象兼容的帧（raw 为BGRA字节）"""
+
+    def __init__(self, raw: bytearray, width: int, height: int, left: int = 0, top: int = 0):
+        self.raw = raw
+        self.width = width
+        self.height = height
+        self.size = (width, height)
+        self.left = left
+        self.top = top
+
+class SyntheticScreenSource:
+    """合成画面源
+
+    图案模式：
+      scroll - 彩条整体水平滚动，每帧所有像素都变化
+      cursor - 静态彩条上移动一个小方块，模拟IDE/终端等大部分静止的画面
+      static - 完全静止的画面
+    """
+
+    PATTERNS = ("scroll", "cursor", "static")
+
+    # 彩条颜色（BGRA）
+    BAR_COLORS = [
+        (255, 255, 255, 255), (0, 255, 255, 255), (255, 255, 0, 255), (0, 255, 0, 255),
+        (255, 0, 255, 255), (0, 0, 255, 255), (255, 0, 0, 255), (32, 32, 32, 255)
+    ]
+
+    def __init__(self, width: int = 1920, height: int = 1080, pattern: str = "scroll",
+                 speed: int = 8, grab_delay: float = 0.0):
+        if pattern not in self.PATTERNS:
+            raise ValueError(f"未知的图案模式: {pattern}")
+        self.width = width
+        self.height = height
+        self.pattern = pattern
+        self.speed = speed  # 每帧移动的像素数
+        self.grab_delay = grab_delay  # 模拟截图耗时（秒）
+        self.monitors = [
+            {"left": 0, "top": 0, "width": width, "height": height},
+            {"left": 0, "top": 0, "width": width, "height": height}
+        ]
+        self.frames_generated = 0
+        self._lock = threading.Lock()
+        self._base = self._build_pattern(width * 2, height)
+
+    def _build_pattern(self, width: int, height: int) -> np.ndarray:
+        """生成带渐变的彩条图案（宽度为画面的两倍，便于滚动取窗口）"""
+        pattern = np.empty((height, width, 4), dtype=np.uint8)
+        bar_width = max(1, self.width // len(self.BAR_COLORS))
+        for x in range(0, width, bar_width):
+            color = self.BAR_COLORS[(x // bar_width) % len(self.BAR_COLORS)]
+            pattern[:, x:x + bar_width] = color
+        # 纵向亮度渐变，避免画面过于容易压缩
+        gradient = np.linspace(0.35, 1.0, height, dtype=np.float32)[:, None, None]
+        pattern[..., :3] = (pattern[..., :3] * gradient).astype(np.uint8)
+        return pattern
+
+    def grab(self, monitor: Dict) -> SyntheticScreenshot:
+        """生成一帧（与 mss.grab 一样每次返回新的缓冲区）"""
+        if self.grab_delay > 0:
+            time.sleep(self.grab_delay)
+
+        with self._lock:
+            index = self.frames_generated
+            self.frames_generated += 1
+
+        left = max(0, int(monitor.get("left", 0)))
+        top = max(0, int(monitor.get("top", 0)))
+        width = min(int(monitor["width"]), self.width - left)
+        height = min(int(monitor["height"]), self.height - top)
+
+        offset = (index * self.speed) % self.width if self.pattern == "scroll" else 0
+        frame = self._base[top:top + height, left + offset:left + offset + width]
+        raw = bytearray(frame.tobytes())
+
+        if self.pattern == "cursor":
+            # 在新缓冲区上绘制移动的方块
+            view = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+            size = max(4, min(width, height) // 40)
+            x = (index * self.speed) % max(1, width - size)
+            y = (index * self.speed // max(1, width - size) * size) % max(1, height - size)
+            view[y:y + size, x:x + size] = (0, 0, 0, 255)
+
+        return SyntheticScreenshot(raw, width, height, left, top)
+
+    def close(self):
+        """释放资源（与 mss 接口保持一致）"""
+        pass
+
+def make_source_factory(width: int = 1920, height: int = 1080, pattern: str = "scroll",
+                        speed: int = 8, grab_delay: float = 0.0):
+    """创建供 ScreenCapture 使用的源工厂，所有线程共享同一个合成源
+
+    工厂的 spec 属性描述了源参数，供多进程管线在子进程中重建同样的源。
+    """
+    source = SyntheticScreenSource(width, height, pattern, speed, grab_delay)
+    factory = lambda: source
+    factory.spec = {"type": "synthetic", "width": width, "height": height, "pattern": pattern,
+                    "speed": speed, "grab_delay": grab_delay}
+    return factory
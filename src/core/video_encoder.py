@@ -10,16 +10,32 @@ import subprocess
 import tempfile
 from typing import Optional, Tuple
 from pathlib import Path
-from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, Qt
 
-# 尝试导入ffmpeg-python
-try:
-    import ffmpeg
-    FFMPEG_PYTHON_AVAILABLE = True
-    print("✅ 使用ffmpeg-python库进行视频处理")
-except ImportError:
-    FFMPEG_PYTHON_AVAILABLE = False
-    print("⚠️ ffmpeg-python未安装，将尝试使用系统FFmpeg命令")
+from config.settings import AppConfig
+from core.av_sync import AVSync
+from core.ffmpeg_progress import FFmpegProgressReader, with_progress_args
+from core.frame_queue import FrameQueue
+from core.ffmpeg_pipe import FFmpegPipeWriter, FFmpegLiveMuxer, find_missing_encoders, get_video_codec
+from core.process_pipeline import ProcessPipeline
+from core.segment_output import SegmentedRecording
+from utils.ffmpeg_locator import find_ffmpeg
+
+# ffmpeg-python只在合并音频时使用，首次合并时再导入（None表示尚未检查）
+_ffmpeg_python = None
+
+def _load_ffmpeg_python():
+    """导入ffmpeg-python，未安装时返回None"""
+    global _ffmpeg_python
+    if _ffmpeg_python is None:
+        try:
+            import ffmpeg
+            _ffmpeg_python = ffmpeg
+            print("✅ 使用ffmpeg-python库进行视频处理")
+        except ImportError:
+            _ffmpeg_python = False
+            print("⚠️ ffmpeg-python未安装，将尝试使用系统FFmpeg命令")
+    return _ffmpeg_python or None
 
 class VideoEncoder(QObject):
     """视频编码器类"""
@@ -39,6 +55,14 @@ class VideoEncoder(QObject):
         self.output_path = ""
         self.codec = "mp4v"
         self.quality = "高质量"
+        self.accepts_bgra = False  # 当前写入器是否接受BGRA帧
+        self.backend = AppConfig.DEFAULT_ENCODER_BACKEND  # 请求的编码后端
+        self.active_backend = None  # 实际使用的编码后端
+        self.audio_input = None  # 实时封装的音频参数 (采样率, 声道数)
+        self.muxes_audio = False  # 当前写入器是否同时封装音频
+        self.variable_frame_rate = False  # 帧带时间戳写入，输出可变帧率（仅FFmpeg后端）
+        self.segment_args = None  # 分段输出参数（仅FFmpeg后端），None表示输出单个文件
+        self._write_failed = False
         
         # 编码参数
         self.fourcc_map = {
@@ -68,6 +92,26 @@ class VideoEncoder(QObject):
         # 确保输出目录存在
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     
+    def set_variable_frame_rate(self, enabled: bool):
+        """设置是否输出可变帧率
+
+        启用后FFmpeg后端的每帧带上所在帧槽的时间戳（见 encode_frame 的slot），
+        画面未变化的帧槽不写入；OpenCV后端仍需调用方写入重复帧补齐。
+        """
+        self.variable_frame_rate = enabled
+    
+    @property
+    def writes_timestamps(self) -> bool:
+        """当前写入器是否按帧槽时间戳写入（画面未变化的帧槽无需写入重复帧）"""
+        return self.active_backend == "ffmpeg" and self.variable_frame_rate
+    
+    def set_segment_output(self, segment_args: Optional[list]):
+        """设置分段输出参数（见 core.segment_output），None恢复为单个文件
+
+        分段输出时 output_path 为分段文件名模板（如 seg_%03d.mkv）。
+        """
+        self.segment_args = segment_args
+    
     def start_encoding(self) -> bool:
         """开始编码"""
         if self.is_encoding:
@@ -92,25 +136,21 @@ class VideoEncoder(QObject):
                 self.error_occurred.emit(f"帧率无效: {self.fps}")
                 return False
 
-            # 获取编码器
-            fourcc = self.fourcc_map.get(self.format_type, cv2.VideoWriter_fourcc(*'mp4v'))
-
-            print(f"创建视频写入器: {self.output_path}, {fourcc}, {self.fps}, {self.frame_size}")
-
-            # 创建视频写入器
-            self.writer = cv2.VideoWriter(
-                self.output_path,
-                fourcc,
-                self.fps,
-                self.frame_size
-            )
-
-            if not self.writer.isOpened():
-                self.error_occurred.emit(f"无法创建视频写入器 - 路径: {self.output_path}, 大小: {self.frame_size}, FPS: {self.fps}")
+            # 优先使用FFmpeg管道编码，失败时回退到OpenCV
+            self.writer = None
+            if self.backend == "ffmpeg" or self.segment_args:
+                self.writer = self._open_ffmpeg_writer()
+            
+            if self.writer is None and self.segment_args:
+                self.error_occurred.emit("分段输出需要FFmpeg，但FFmpeg管道启动失败")
+                return False
+            
+            if self.writer is None and not self._open_opencv_writer():
                 return False
 
             self.is_encoding = True
             self.frame_count = 0
+            self._write_failed = False
             self.encoding_started.emit()
             return True
 
@@ -118,23 +158,116 @@ class VideoEncoder(QObject):
             self.error_occurred.emit(f"开始编码失败: {str(e)}")
             return False
     
-    def encode_frame(self, frame: np.ndarray) -> bool:
-        """编码单帧"""
-        if not self.is_encoding or self.writer is None:
+    def set_backend(self, backend: str):
+        """设置编码后端（ffmpeg/opencv）"""
+        if backend not in AppConfig.ENCODER_BACKENDS:
+            raise ValueError(f"未知的编码后端: {backend}")
+        self.backend = backend
+    
+    def set_audio_input(self, sample_rate: int, channels: int):
+        """设置实时封装的PCM音频输入（仅FFmpeg后端支持）"""
+        self.audio_input = (sample_rate, channels)
+    
+    def clear_audio_input(self):
+        """取消实时音频封装"""
+        self.audio_input = None
+    
+    def write_audio(self, data: bytes):
+        """写入一块PCM音频（s16le），可在音频回调线程中调用"""
+        writer = self.writer
+        if self.is_encoding and self.muxes_audio and writer is not None:
+            writer.write_audio(data)
+    
+    def end_audio(self):
+        """音频输入已结束，之后只写入视频帧"""
+        writer = self.writer
+        if self.muxes_audio and writer is not None:
+            writer.end_audio()
+    
+    def _open_ffmpeg_writer(self) -> Optional[FFmpegPipeWriter]:
+        """启动FFmpeg管道写入器，失败时返回None"""
+        if self.audio_input and FFmpegLiveMuxer.is_supported():
+            sample_rate, channels = self.audio_input
+            writer = FFmpegLiveMuxer(
+                self.output_path, self.fps, self.frame_size,
+                self.format_type, self.quality, pixel_format="bgra",
+                vfr=self.variable_frame_rate, segment_args=self.segment_args,
+                sample_rate=sample_rate, channels=channels
+            )
+        else:
+            writer = FFmpegPipeWriter(
+                self.output_path, self.fps, self.frame_size,
+                self.format_type, self.quality, pixel_format="bgra",
+                vfr=self.variable_frame_rate, segment_args=self.segment_args
+            )
+        print(f"创建FFmpeg管道写入器: {self.output_path}, {self.fps}, {self.frame_size}")
+        
+        if not writer.open():
+            print(f"FFmpeg管道不可用，回退到OpenCV: {writer.get_error_output()}")
+            return None
+        
+        self.active_backend = "ffmpeg"
+        self.accepts_bgra = True
+        self.muxes_audio = isinstance(writer, FFmpegLiveMuxer)
+        return writer
+    
+    def _open_opencv_writer(self) -> bool:
+        """创建OpenCV视频写入器"""
+        # 获取编码器
+        fourcc = self.fourcc_map.get(self.format_type, cv2.VideoWriter_fourcc(*'mp4v'))
+
+        print(f"创建视频写入器: {self.output_path}, {fourcc}, {self.fps}, {self.frame_size}")
+
+        # 创建视频写入器
+        self.writer = cv2.VideoWriter(
+            self.output_path,
+            fourcc,
+            self.fps,
+            self.frame_size
+        )
+
+        if not self.writer.isOpened():
+            self.error_occurred.emit(f"无法创建视频写入器 - 路径: {self.output_path}, 大小: {self.frame_size}, FPS: {self.fps}")
+            self.writer = None
+            return False
+
+        self.active_backend = "opencv"
+        self.accepts_bgra = False
+        self.muxes_audio = False
+        return True
+    
+    def encode_frame(self, frame: np.ndarray, slot: Optional[int] = None) -> bool:
+        """编码单帧
+
+        slot 为该帧所在的输出帧槽，仅在 writes_timestamps 时使用（省略时紧接上一帧）。
+        """
+        if not self.is_encoding or self.writer is None or self._write_failed:
             return False
         
         try:
+            # 转换为写入器接受的像素格式
+            channels = frame.shape[2] if frame.ndim == 3 else 1
+            if channels == 4 and not self.accepts_bgra:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+            elif channels == 3 and self.accepts_bgra:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+            
             # 调整帧大小（如果需要）
             if frame.shape[:2][::-1] != self.frame_size:
                 frame = cv2.resize(frame, self.frame_size)
             
             # 写入帧
-            self.writer.write(frame)
+            if self.writes_timestamps:
+                self.writer.write(frame, slot)
+            else:
+                self.writer.write(frame)
             self.frame_count += 1
             self.frame_encoded.emit(self.frame_count)
             return True
             
         except Exception as e:
+            # 写入器已失效时只报告一次错误
+            self._write_failed = self.active_backend == "ffmpeg"
             self.error_occurred.emit(f"编码帧失败: {str(e)}")
             return False
     
@@ -147,8 +280,13 @@ class VideoEncoder(QObject):
             self.is_encoding = False
             
             if self.writer:
-                self.writer.release()
+                writer = self.writer
                 self.writer = None
+                if self.active_backend == "ffmpeg":
+                    if not writer.release():
+                        self.error_occurred.emit(f"FFmpeg编码失败: {writer.get_error_output()}")
+                else:
+                    writer.release()
             
             self.encoding_stopped.emit()
             
@@ -165,17 +303,41 @@ class VideoEncoder(QObject):
             return self.frame_count / self.fps
         return 0.0
 
+class RecordingFinalization:
+    """一次录制的收尾工作
+
+    停止录制时把该次录制的编码器、帧队列、同步时钟和临时文件交给收尾线程，
+    录制器随即换上新的编码器，可以立即开始下一次录制。
+    """
+
+    def __init__(self, output_path: str, video_encoder: VideoEncoder, sync: AVSync, duration: float):
+        self.output_path = output_path
+        self.video_encoder = video_encoder
+        self.sync = sync
+        self.duration = duration  # 录制时长（秒），用于估计合并进度
+        self.frame_queue = None
+        self.encode_thread = None
+        self.process_pipeline = None
+        self.segmented_recording = None
+        self.video_temp_path = None  # 有值时收尾需合并音频和视频
+        self.audio_temp_path = None
+        self.write_sync_report = False
+        self.success = True
+        self.thread = None
+
 class ScreenRecorder(QObject):
     """屏幕录制器（整合屏幕捕获和视频编码）"""
-    
+
     # 信号
     recording_started = pyqtSignal()         # 开始录制
-    recording_stopped = pyqtSignal()         # 停止录制
+    recording_stopped = pyqtSignal()         # 停止录制（捕获已停止，收尾在后台进行）
     recording_paused = pyqtSignal()          # 暂停录制
     recording_resumed = pyqtSignal()         # 恢复录制
     progress_updated = pyqtSignal(int, float)  # 进度更新（帧数，时长）
+    finalize_progress = pyqtSignal(str, str, int)  # 收尾进度（输出路径，阶段，百分比）
+    recording_finalized = pyqtSignal(str, bool)  # 收尾完成（输出路径，是否成功）
     error_occurred = pyqtSignal(str)         # 发生错误
-    
+
     def __init__(self):
         super().__init__()
         self.screen_capture = None
@@ -192,27 +354,103 @@ class ScreenRecorder(QObject):
         self.video_temp_path = None
         self.audio_temp_path = None
         self.final_output_path = None
-    
+
+        # 实时音视频封装
+        self.live_mux_enabled = True
+        self.live_mux = False
+
+        # 捕获→编码帧队列
+        self.frame_queue = None
+        self.encode_thread = None
+        self.queue_policy = FrameQueue.POLICY_BLOCK
+        self.buffer_size_mb = None  # None表示使用配置项 advanced.buffer_size_mb
+        self.last_queue_stats = {}
+        
+        # 阶段耗时回调 (阶段名, 秒)，在编码线程中调用，用于性能分析
+        self.stage_observer = None
+        
+        # 画面变化检测：未变化的帧只记录时间戳，编码端按时间戳放置帧
+        self.damage_detection = None  # None表示使用配置项 advanced.damage_detection
+        self.pause_started_monotonic = 0.0  # 累计暂停时长记录在本次录制的同步时钟中（AVSync.paused）
+        
+        # 音画同步：帧按捕获时间戳放入输出帧槽，有音频时以音频采样时钟为主时钟
+        self.av_sync = AVSync()
+        self.sync_report = None  # None表示使用配置项 advanced.sync_report
+        self._audio_frame_bytes = 1
+        
+        # 多进程管线：捕获和编码在子进程中运行，帧经共享内存传递
+        self.pipeline_mode = None  # None表示使用配置项 advanced.pipeline_mode
+        self.process_pipeline = None
+        self.last_pipeline_stats = {}
+        self._pipeline_timer = None
+        
+        # 即时回放：编码输出为循环覆盖的分段，只保留最近N分钟
+        self.replay_buffer = None
+        self._replay_detached_audio = None
+        
+        # 分段录制：视频写成带清单的分段，停止时无损拼接，异常退出也不会丢失已录内容
+        self.segmented_output = None  # None表示使用配置项 advanced.segmented_output
+        self.segmented_recording = None
+
+        # 后台收尾：停止录制后在收尾线程中编码剩余帧、拼接分段和合并音频
+        self._finalizations = []
+        self._finalize_lock = threading.Lock()
+        self.last_frame_count = 0  # 最近一次完成收尾的录制编码的帧数
+        self.last_finalize_success = True
+
     def setup(self, screen_capture, video_encoder, audio_capture=None):
         """设置录制组件"""
         self.screen_capture = screen_capture
-        self.video_encoder = video_encoder
+        self.video_encoder = None
         self.audio_capture = audio_capture
 
         # 连接信号
         if self.screen_capture:
-            self.screen_capture.frame_captured.connect(self._on_frame_captured)
+            # 直接在捕获线程中入队，避免经由GUI事件队列转发帧
+            self.screen_capture.frame_captured.connect(
+                self._on_frame_captured, Qt.ConnectionType.DirectConnection
+            )
+            self.screen_capture.frame_held.connect(
+                self._on_frame_held, Qt.ConnectionType.DirectConnection
+            )
             self.screen_capture.error_occurred.connect(self.error_occurred)
 
-        if self.video_encoder:
-            self.video_encoder.frame_encoded.connect(self._on_frame_encoded)
-            self.video_encoder.error_occurred.connect(self.error_occurred.emit)
-            self.video_encoder.error_occurred.connect(self.error_occurred)
-    
-    def start_recording(self, output_path: str, fps: int = 30, quality: str = "高质量", format_type: str = "MP4"):
-        """开始录制"""
+        if video_encoder:
+            self._attach_video_encoder(video_encoder)
+
+    def _attach_video_encoder(self, video_encoder: VideoEncoder):
+        """使用该编码器进行之后的录制"""
+        self.video_encoder = video_encoder
+        video_encoder.frame_encoded.connect(self._on_frame_encoded)
+        video_encoder.error_occurred.connect(self.error_occurred)
+
+    def _detach_video_encoder(self) -> VideoEncoder:
+        """把当前编码器交给收尾线程，换上同样设置的新编码器
+
+        旧编码器不再上报录制进度，错误仍然转发。
+        """
+        encoder = self.video_encoder
+        try:
+            encoder.frame_encoded.disconnect(self._on_frame_encoded)
+        except (TypeError, RuntimeError):
+            pass
+        replacement = VideoEncoder()
+        replacement.backend = encoder.backend
+        self._attach_video_encoder(replacement)
+        return encoder
+
+    def start_recording(self, output_path: str, fps: int = 30, quality: str = "高质量", format_type: str = "MP4",
+                        encoder_backend: Optional[str] = None):
+        """开始录制
+
+        encoder_backend 可为本次录制指定编码后端（ffmpeg/opencv）。
+        """
         if self.is_recording:
             return False
+        
+        if self.video_encoder.segment_args is None:
+            # 普通录制，不再保留上一次的即时回放
+            self.replay_buffer = None
 
         try:
             # 获取屏幕尺寸
@@ -227,109 +465,714 @@ class ScreenRecorder(QObject):
             # 保存最终输出路径
             self.final_output_path = output_path
 
-            # 如果有音频录制，创建临时文件
-            if self.audio_capture:
-                # 创建临时视频文件（无音频）
-                temp_dir = tempfile.gettempdir()
-                self.video_temp_path = str(Path(temp_dir) / f"temp_video_{int(time.time())}.mp4")
-                self.audio_temp_path = str(Path(temp_dir) / f"temp_audio_{int(time.time())}.wav")
+            # 设置编码后端
+            if encoder_backend:
+                self.video_encoder.set_backend(encoder_backend)
+
+            self.live_mux = False
+            self.video_temp_path = None
+            self.audio_temp_path = None
 
-                # 设置视频编码器参数为临时文件
-                self.video_encoder.set_output_params(self.video_temp_path, fps, screen_size, format_type, quality)
+            # 画面变化检测与可变帧率输出
+            # 即时回放的分段循环覆盖、无法按分段时长拼接，跳过画面未变化的帧槽会让分段末尾的静止时间丢失，因此固定帧率
+            damage_detection = self._get_damage_detection() and self.replay_buffer is None
+            if damage_detection:
+                self.screen_capture.enable_damage_detection()
             else:
-                # 没有音频，直接输出到最终文件
-                self.video_encoder.set_output_params(output_path, fps, screen_size, format_type, quality)
+                self.screen_capture.disable_damage_detection()
+            self.video_encoder.set_variable_frame_rate(damage_detection)
+            self.av_sync.reset(fps, self.audio_capture.sample_rate if self.audio_capture else 0)
+            self.last_pipeline_stats = {}
+            self.segmented_recording = self._create_segmented_recording(output_path, quality, format_type)
+
+            if self._get_pipeline_mode() == "process" and self.replay_buffer is None:
+                if self._start_process_recording(output_path, fps, screen_size, format_type, quality,
+                                                 damage_detection):
+                    return True
+                print("多进程管线启动失败，回退到线程管线")
+
+            if self.audio_capture and self.live_mux_enabled:
+                # 先打开音频流（暂不采集），确认可用后再让ffmpeg等待音频输入
+                if self.audio_capture.open_stream():
+                    self._set_encoder_output(output_path, fps, screen_size, format_type, quality)
+                    self.video_encoder.set_audio_input(self.audio_capture.sample_rate, self.audio_capture.channels)
+                    started = self.video_encoder.start_encoding()
+                    self.video_encoder.clear_audio_input()
+                    if not started:
+                        self.audio_capture.close_stream()
+                        self._discard_segments()
+                        return False
+
+                    if self.video_encoder.muxes_audio:
+                        # 音视频实时送入同一个ffmpeg进程，无需临时文件和事后合并
+                        self.live_mux = True
+                    else:
+                        # 编码器无法实时封装音频（如已回退到OpenCV），改用临时文件合并
+                        self.video_encoder.stop_encoding()
+
+            if not self.live_mux:
+                if self.audio_capture:
+                    # 创建临时视频文件（无音频）
+                    self.video_temp_path, self.audio_temp_path = self._create_temp_paths()
+
+                    # 设置视频编码器参数为临时文件
+                    self._set_encoder_output(self.video_temp_path, fps, screen_size, format_type, quality)
+
+                    # 录制期间音频直接流式写入临时WAV文件
+                    self.audio_capture.begin_spill(self.audio_temp_path)
+                else:
+                    # 没有音频，直接输出到最终文件
+                    self._set_encoder_output(output_path, fps, screen_size, format_type, quality)
+
+                # 开始编码
+                if not self.video_encoder.start_encoding():
+                    if self.audio_capture:
+                        self.audio_capture.close_stream()
+                        self.audio_capture.discard_spill()
+                    self._discard_segments()
+                    return False
             
-            # 开始编码
-            if not self.video_encoder.start_encoding():
-                return False
+            # 创建捕获→编码队列并启动编码线程
+            self._start_encode_pipeline(screen_size)
             
-            # 开始屏幕捕获
+            # 开始屏幕捕获，编码器可接受BGRA时跳过颜色转换
             self.screen_capture.set_fps(fps)
-            self.screen_capture.start_capture()
-            
-            # 开始音频录制（如果启用）
-            if self.audio_capture:
-                self.audio_capture.start_recording()
+            self.screen_capture.set_output_bgra(self.video_encoder.accepts_bgra)
+            self.screen_capture.register_frame_consumer()
             
+            # 先进入录制状态，第一帧即可入队（启用画面变化检测时后续静止帧不会再发出）
             self.is_recording = True
             self.is_paused = False
             self.start_time = time.time()
             self.total_pause_duration = 0
             
+            # 先开始音频录制（如果启用），编码线程放置第一帧时需要音频时钟；
+            # 音频数据的去向（实时封装或溢写文件）已接好，采集开始后的第一个音频块即可写入
+            if self.audio_capture:
+                self._connect_audio()
+                self.audio_capture.start_recording()
+                if not self.audio_capture.is_recording:
+                    # 音频流无法打开，视频改以录制时钟放置
+                    self.av_sync.reset(fps)
+                    if self.live_mux:
+                        self.video_encoder.end_audio()
+            self.screen_capture.start_capture()
+            
             self.recording_started.emit()
             return True
             
         except Exception as e:
+            self.is_recording = False
+            if self.audio_capture:
+                self.audio_capture.close_stream()
+            self._discard_segments()
             self.error_occurred.emit(f"开始录制失败: {str(e)}")
             return False
     
+    def start_replay(self, replay_buffer, fps: int = 30, quality: str = "高质量",
+                     encoder_backend: Optional[str] = None) -> bool:
+        """以即时回放模式开始录制
+
+        编码器输出循环覆盖的分段，停止前后都可以调用 save_replay() 保存最近的内容。
+        音频只能实时封装进分段，平台不支持时本次回放只录制视频。
+        """
+        if self.is_recording:
+            return False
+        
+        self.replay_buffer = replay_buffer
+        replay_buffer.prepare()
+        self.video_encoder.set_segment_output(replay_buffer.build_output_args())
+        
+        if self.audio_capture and not (self.live_mux_enabled and FFmpegLiveMuxer.is_supported()):
+            print("当前平台不支持实时音视频封装，即时回放不录制音频")
+            self._replay_detached_audio = self.audio_capture
+            self.audio_capture = None
+        
+        if self.start_recording(replay_buffer.segment_pattern, fps, quality, "MP4", encoder_backend):
+            return True
+        
+        self.video_encoder.set_segment_output(None)
+        if self._replay_detached_audio is not None:
+            self.audio_capture = self._replay_detached_audio
+            self._replay_detached_audio = None
+        self.replay_buffer = None
+        return False
+    
+    def save_replay(self, output_path: Optional[str] = None) -> bool:
+        """保存即时回放中最近的内容（后台拼接分段，完成后回放缓冲发出replay_saved）"""
+        if self.replay_buffer is None:
+            self.error_occurred.emit("未启用即时回放")
+            return False
+        return self.replay_buffer.save(output_path)
+    
     def stop_recording(self):
-        """停止录制"""
+        """停止录制
+
+        只停止捕获和音频流并交出本次录制的编码器，随即发出 recording_stopped，
+        之后即可开始新的录制。剩余帧的编码、分段拼接和音频合并在收尾线程中完成，
+        期间发出 finalize_progress，完成后发出 recording_finalized。
+        """
         if not self.is_recording:
             return
 
         try:
+            job = RecordingFinalization(self.final_output_path, self.video_encoder, self.av_sync,
+                                        self.get_recording_duration())
             self.is_recording = False
             self.is_paused = False
 
+            if self.process_pipeline is not None:
+                if self._pipeline_timer is not None:
+                    self._pipeline_timer.stop()
+                    self._pipeline_timer = None
+                job.process_pipeline = self.process_pipeline
+                self.process_pipeline = None
+
             # 停止屏幕捕获
-            if self.screen_capture:
+            elif self.screen_capture:
+                # 先关闭帧队列，阻塞在入队上的捕获线程立即返回；已入队的帧仍由收尾线程编码
+                if self.frame_queue is not None:
+                    self.frame_queue.close()
                 self.screen_capture.stop_capture()
+                self.screen_capture.unregister_frame_consumer()
 
-            # 停止视频编码
-            if self.video_encoder:
-                self.video_encoder.stop_encoding()
-
-            # 停止音频录制并保存音频文件
-            if self.audio_capture and self.audio_temp_path:
+            # 先停止音频流再关闭编码器，编码线程据此把视频补齐或截止到音频结尾
+            if self.audio_capture:
                 self.audio_capture.stop_recording()
-                self.audio_capture.save_audio(self.audio_temp_path)
+                self._disconnect_audio()
+                self.av_sync.finish_audio()
+                if self.live_mux:
+                    self.video_encoder.end_audio()
+                elif self.audio_temp_path:
+                    # 结束临时WAV的写入，下一次录制可以使用音频捕获
+                    self.audio_capture.save_audio(self.audio_temp_path)
+                    job.video_temp_path = self.video_temp_path
+                    job.audio_temp_path = self.audio_temp_path
 
-                # 合并音频和视频
-                self._merge_audio_video()
+            job.frame_queue, job.encode_thread = self.frame_queue, self.encode_thread
+            job.segmented_recording = self.segmented_recording
+            # 同步报告与输出文件放在一起（即时回放和多进程管线不生成）
+            job.write_sync_report = bool(job.output_path) and self.replay_buffer is None and self._get_sync_report()
+
+            self.frame_queue = None
+            self.encode_thread = None
+            self.segmented_recording = None
+            self.video_temp_path = None
+            self.audio_temp_path = None
+            self.final_output_path = None
+            self.live_mux = False
+            self._detach_video_encoder()
+            self.av_sync = AVSync()
+            if self._replay_detached_audio is not None:
+                self.audio_capture = self._replay_detached_audio
+                self._replay_detached_audio = None
 
+            job.thread = threading.Thread(target=self._finalize, args=(job,), name="RecordingFinalizer")
+            with self._finalize_lock:
+                self._finalizations.append(job)
+            job.thread.start()
             self.recording_stopped.emit()
 
         except Exception as e:
             self.error_occurred.emit(f"停止录制失败: {str(e)}")
-    
+
+    def is_finalizing(self) -> bool:
+        """是否有录制仍在收尾"""
+        with self._finalize_lock:
+            return bool(self._finalizations)
+
+    def wait_finalized(self, timeout: Optional[float] = None) -> bool:
+        """等待所有进行中的收尾完成，返回是否全部完成"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._finalize_lock:
+                jobs = list(self._finalizations)
+            if not jobs:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            jobs[0].thread.join(remaining)
+
+    def _finalize(self, job: RecordingFinalization):
+        """收尾线程：编码剩余帧、关闭编码器、拼接分段、合并音频并写入同步报告
+
+        编码器关闭、分段拼接和同步报告不依赖前一步和信号发送是否成功，
+        即使录制器已被销毁（信号无法发出），已录制的内容也会完整封装。
+        """
+        started = time.monotonic()
+        output_name = job.output_path or ""
+
+        def report(stage: str, percent: float):
+            self._emit_from_finalizer("finalize_progress", output_name, stage, int(max(0, min(100, percent))))
+
+        try:
+            try:
+                if job.process_pipeline is not None:
+                    report("等待编码进程", 0)
+                    self._stop_process_pipeline(job.process_pipeline, job.video_encoder)
+                else:
+                    self._drain_encode_queue(job, lambda fraction: report("编码剩余帧", fraction * 40))
+            finally:
+                # 剩余帧编码失败也要关闭编码器，否则已写入的内容无法封装
+                job.video_encoder.stop_encoding()
+                job.video_encoder.set_segment_output(None)
+
+            try:
+                report("关闭编码器", 40)
+
+                # 分段录制：无损拼接为完整视频（音频事后合并时拼接到临时视频文件）
+                segments_ok = True
+                if job.segmented_recording is not None:
+                    report("拼接分段", 50)
+                    segments_ok = self._finalize_segments(job.segmented_recording, job.video_temp_path)
+                    job.success = segments_ok and job.success
+
+                # 合并音频和视频（拼接失败时分段和音频文件都保留，可用 main.py recover 恢复）
+                if job.video_temp_path and segments_ok:
+                    report("合并音频", 60)
+                    job.success = self._merge_audio_video(
+                        job.video_temp_path, job.audio_temp_path, job.output_path, job.duration,
+                        on_progress=lambda fraction: report("合并音频", 60 + fraction * 40)
+                    ) and job.success
+            finally:
+                if job.write_sync_report and job.sync.frames_captured:
+                    job.sync.write_report(job.output_path)
+
+        except Exception as e:
+            job.success = False
+            print(f"录制收尾失败: {e}")
+            self._emit_from_finalizer("error_occurred", f"停止录制失败: {str(e)}")
+
+        finally:
+            self.last_frame_count = job.video_encoder.frame_count
+            self.last_finalize_success = job.success
+            print(f"录制收尾完成: {output_name}, 用时{time.monotonic() - started:.2f}秒")
+            with self._finalize_lock:
+                self._finalizations.remove(job)
+            report("完成", 100)
+            self._emit_from_finalizer("recording_finalized", output_name, job.success)
+
+    def _emit_from_finalizer(self, signal_name: str, *args):
+        """在收尾线程中发出信号，失败（如录制器已被销毁）时只输出日志"""
+        try:
+            getattr(self, signal_name).emit(*args)
+        except RuntimeError as e:
+            print(f"发出{signal_name}信号失败: {e}")
+
     def pause_recording(self):
-        """暂停录制"""
+        """暂停录制
+
+        只关闭管线中的闸门：捕获线程、截图句柄和音频流都保持打开，
+        暂停区间从时间轴上去除（捕获时间戳扣除累计暂停时长，音频按暂停时刻裁剪）。
+        """
         if not self.is_recording or self.is_paused:
             return
         
         self.is_paused = True
         self.pause_time = time.time()
+        self.pause_started_monotonic = time.monotonic()
         
-        if self.screen_capture:
-            self.screen_capture.stop_capture()
+        if self.process_pipeline is not None:
+            self.process_pipeline.pause()
+        elif self.screen_capture:
+            self.screen_capture.pause_capture()
         
         if self.audio_capture:
-            self.audio_capture.stop_recording()
+            self.audio_capture.pause(self.pause_started_monotonic)
         
         self.recording_paused.emit()
     
     def resume_recording(self):
-        """恢复录制"""
+        """恢复录制（重新打开闸门，无需重建捕获线程和音频流）"""
         if not self.is_recording or not self.is_paused:
             return
         
+        resumed = time.monotonic()
         self.total_pause_duration += time.time() - self.pause_time
+        self.av_sync.paused += resumed - self.pause_started_monotonic
         self.is_paused = False
         
-        if self.screen_capture:
-            self.screen_capture.start_capture()
+        if self.audio_capture:
+            self.audio_capture.resume(resumed)
+        
+        if self.process_pipeline is not None:
+            self.process_pipeline.resume()
+        elif self.screen_capture:
+            self.screen_capture.resume_capture()
+        
+        self.recording_resumed.emit()
+    
+    def set_queue_policy(self, policy: str):
+        """设置帧队列满时的处理策略（block/drop_oldest/drop_newest）"""
+        if policy not in FrameQueue.POLICIES:
+            raise ValueError(f"未知的队列策略: {policy}")
+        self.queue_policy = policy
+    
+    def set_buffer_size_mb(self, buffer_size_mb: Optional[float]):
+        """设置帧队列缓冲区大小（MB），None表示使用配置"""
+        self.buffer_size_mb = buffer_size_mb
+    
+    def set_damage_detection(self, enabled: Optional[bool]):
+        """设置是否启用画面变化检测（None表示使用配置）"""
+        self.damage_detection = enabled
+    
+    def _get_damage_detection(self) -> bool:
+        """是否启用画面变化检测"""
+        if self.damage_detection is not None:
+            return self.damage_detection
+        try:
+            from utils.config_manager import get_config
+            return bool(get_config("advanced.damage_detection", True))
+        except Exception as e:
+            print(f"读取画面变化检测配置失败: {e}")
+            return True
+    
+    def set_sync_report(self, enabled: Optional[bool]):
+        """设置是否在输出文件旁写入音画同步报告（None表示使用配置）"""
+        self.sync_report = enabled
+    
+    def _get_sync_report(self) -> bool:
+        """是否写入音画同步报告"""
+        if self.sync_report is not None:
+            return self.sync_report
+        try:
+            from utils.config_manager import get_config
+            return bool(get_config("advanced.sync_report", True))
+        except Exception as e:
+            print(f"读取同步报告配置失败: {e}")
+            return True
+    
+    def set_pipeline_mode(self, mode: Optional[str]):
+        """设置录制管线（thread/process），None表示使用配置"""
+        if mode is not None and mode not in AppConfig.PIPELINE_MODES:
+            raise ValueError(f"未知的录制管线: {mode}")
+        self.pipeline_mode = mode
+    
+    def _get_pipeline_mode(self) -> str:
+        """获取录制管线"""
+        if self.pipeline_mode is not None:
+            return self.pipeline_mode
+        try:
+            from utils.config_manager import get_config
+            mode = get_config("advanced.pipeline_mode", AppConfig.DEFAULT_PIPELINE_MODE)
+            return mode if mode in AppConfig.PIPELINE_MODES else AppConfig.DEFAULT_PIPELINE_MODE
+        except Exception as e:
+            print(f"读取录制管线配置失败: {e}")
+            return AppConfig.DEFAULT_PIPELINE_MODE
+    
+    def _start_process_recording(self, output_path: str, fps: int, screen_size: Tuple[int, int],
+                                 format_type: str, quality: str, damage_detection: bool) -> bool:
+        """使用多进程管线开始录制
+
+        仅支持FFmpeg后端；音频仍在本进程中录制到临时WAV，停止后再合并。
+        """
+        if self.video_encoder.backend != "ffmpeg" or not ProcessPipeline.is_supported():
+            return False
         
+        video_path = output_path
         if self.audio_capture:
+            self.video_temp_path, self.audio_temp_path = self._create_temp_paths()
+            video_path = self.video_temp_path
+        
+        segment_args = None
+        if self.segmented_recording is not None:
+            # 清单记录最终输出路径和音频文件，异常退出后恢复时一并合并
+            self.segmented_recording.start(damage_detection, audio_path=self.audio_temp_path, fps=fps,
+                                           frame_size=list(screen_size), quality=quality, pipeline="process")
+            segment_args = self.segmented_recording.build_output_args()
+            video_path = self.segmented_recording.segment_pattern
+        Path(video_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        fps = max(1, min(fps, 120))
+        pipeline = ProcessPipeline(
+            video_path, fps, screen_size, self.screen_capture.get_capture_target(),
+            format_type, quality, source_spec=self.screen_capture.source_spec,
+            damage_detection=damage_detection, segment_args=segment_args
+        )
+        if not pipeline.start():
+            print(f"多进程管线错误: {'; '.join(pipeline.errors)}")
+            self.video_temp_path = None
+            self.audio_temp_path = None
+            if self.segmented_recording is not None:
+                # 回退到线程管线时重新创建分段目录
+                self.segmented_recording.discard()
+            return False
+        
+        self.process_pipeline = pipeline
+        # 与线程管线保持一致，便于界面读取编码器状态
+        self.video_encoder.set_output_params(video_path, fps, screen_size, format_type, quality)
+        self.video_encoder.active_backend = "ffmpeg"
+        self.video_encoder.frame_count = 0
+        
+        self.is_recording = True
+        self.is_paused = False
+        self.start_time = time.time()
+        self.total_pause_duration = 0
+        
+        if self.audio_capture:
+            self.audio_capture.begin_spill(self.audio_temp_path)
             self.audio_capture.start_recording()
         
-        self.recording_resumed.emit()
+        # 子进程不能发出Qt信号，由定时器轮询进度和错误
+        self._pipeline_timer = QTimer(self)
+        self._pipeline_timer.timeout.connect(self._poll_process_pipeline)
+        self._pipeline_timer.start(250)
+        
+        print(f"多进程管线: {pipeline.slots}帧共享缓冲, 画面变化检测{'开启' if damage_detection else '关闭'}")
+        self.recording_started.emit()
+        return True
+    
+    def _poll_process_pipeline(self):
+        """轮询多进程管线的进度和错误"""
+        pipeline = self.process_pipeline
+        if pipeline is None:
+            return
+        for message in pipeline.poll_errors():
+            self.error_occurred.emit(message)
+        frame_count = pipeline.get_stats().get("written", 0)
+        if frame_count != self.video_encoder.frame_count:
+            self.video_encoder.frame_count = frame_count
+            self.progress_updated.emit(frame_count, self.get_recording_duration())
+    
+    def _stop_process_pipeline(self, pipeline: ProcessPipeline, video_encoder: VideoEncoder):
+        """停止多进程管线，等待编码进程完成封装（在收尾线程中执行）"""
+        seen = len(pipeline.errors)
+        pipeline.stop()
+        for message in pipeline.errors[seen:]:
+            self.error_occurred.emit(message)
+
+        self.last_pipeline_stats = pipeline.get_stats()
+        video_encoder.frame_count = self.last_pipeline_stats.get("written", 0)
+
+    def get_pipeline_stats(self) -> dict:
+        """获取多进程管线统计（线程管线时为空）"""
+        if self.process_pipeline is not None:
+            return self.process_pipeline.get_stats()
+        return dict(self.last_pipeline_stats)
+    
+    def set_segmented_output(self, enabled: Optional[bool]):
+        """设置是否分段录制（None表示使用配置）"""
+        self.segmented_output = enabled
+    
+    def _create_segmented_recording(self, output_path: str, quality: str,
+                                    format_type: str) -> Optional[SegmentedRecording]:
+        """按配置创建分段录制（即时回放、OpenCV后端、没有FFmpeg或缺少编码器时返回None）"""
+        if self.replay_buffer is not None or self.video_encoder.backend != "ffmpeg":
+            return None
+        
+        enabled, segment_seconds, segment_size_mb = True, SegmentedRecording.DEFAULT_SEGMENT_SECONDS, 0
+        try:
+            from utils.config_manager import get_config
+            enabled = bool(get_config("advanced.segmented_output", True))
+            segment_seconds = float(get_config("advanced.segment_seconds", segment_seconds))
+            segment_size_mb = float(get_config("advanced.segment_size_mb", 0))
+        except Exception as e:
+            print(f"读取分段录制配置失败: {e}")
+        if self.segmented_output is not None:
+            enabled = self.segmented_output
+        if not enabled or not find_ffmpeg():
+            return None
+        missing = find_missing_encoders([get_video_codec(format_type, quality)])
+        if missing:
+            # 分段输出需要FFmpeg管道，缺少编码器时不分段，编码器回退到OpenCV
+            print(f"FFmpeg不支持编码器 {', '.join(missing)}，本次录制不分段")
+            return None
+        
+        if segment_size_mb > 0:
+            # 按大小分段：用码率上限换算为时长
+            segment_seconds = SegmentedRecording.segment_seconds_for_size(segment_size_mb, quality)
+        return SegmentedRecording(output_path, segment_seconds=segment_seconds, format_type=format_type)
+    
+    @staticmethod
+    def _create_temp_paths() -> Tuple[str, str]:
+        """本次录制的临时视频和音频文件路径（上一次录制可能仍在收尾，文件名精确到毫秒）"""
+        stamp = int(time.time() * 1000)
+        temp_dir = Path(tempfile.gettempdir())
+        return str(temp_dir / f"temp_video_{stamp}.mp4"), str(temp_dir / f"temp_audio_{stamp}.wav")
+
+    def _set_encoder_output(self, path: str, fps: int, frame_size: Tuple[int, int],
+                            format_type: str, quality: str):
+        """设置编码器输出，分段录制时输出分段，停止后再拼接为path
+
+        分段清单记录最终输出路径；音频事后合并时path为临时视频文件，清单同时记录音频文件，
+        异常退出后恢复时一并合并。
+        """
+        segmented = self.segmented_recording
+        if segmented is not None:
+            segmented.start(self.video_encoder.variable_frame_rate, audio_path=self.audio_temp_path, fps=fps,
+                            frame_size=list(frame_size), quality=quality, audio=self.audio_capture is not None)
+            self.video_encoder.set_segment_output(segmented.build_output_args())
+            path = segmented.segment_pattern
+        self.video_encoder.set_output_params(path, fps, frame_size, format_type, quality)
+    
+    def _finalize_segments(self, segmented: SegmentedRecording, output_path: Optional[str] = None) -> bool:
+        """拼接分段到output_path（默认为最终输出文件），失败时保留分段以便恢复"""
+        success, error = segmented.finalize(output_path)
+        if not success:
+            self.error_occurred.emit(
+                f"拼接分段失败: {error}\n分段已保留在 {segmented.directory}，"
+                f"可运行 main.py recover 恢复"
+            )
+        return success
+    
+    def _discard_segments(self):
+        """开始录制失败时删除已创建的分段目录"""
+        if self.segmented_recording is not None:
+            self.segmented_recording.discard()
+            self.segmented_recording = None
+            self.video_encoder.set_segment_output(None)
+    
+    def _get_buffer_size_mb(self) -> float:
+        """获取帧队列缓冲区大小（MB）"""
+        if self.buffer_size_mb is not None:
+            return self.buffer_size_mb
+        try:
+            from utils.config_manager import get_config
+            return float(get_config("advanced.buffer_size_mb", 10))
+        except Exception as e:
+            print(f"读取缓冲区配置失败: {e}")
+            return 10.0
+    
+    def _start_encode_pipeline(self, frame_size: Tuple[int, int]):
+        """创建帧队列并启动编码线程"""
+        width, height = frame_size
+        channels = 4 if self.video_encoder.accepts_bgra else 3
+        capacity = FrameQueue.capacity_for(self._get_buffer_size_mb(), width * height * channels)
+        
+        self.frame_queue = FrameQueue(capacity, self.queue_policy, on_discard=self.screen_capture.release_frame)
+        self.encode_thread = threading.Thread(target=self._encode_loop, daemon=True,
+                                              args=(self.frame_queue, self.video_encoder, self.av_sync,
+                                                    self.screen_capture))
+        self.encode_thread.start()
+        print(f"帧队列: 容量{capacity}帧, 策略{self.queue_policy}")
+    
+    def _drain_encode_queue(self, job: RecordingFinalization, on_progress=None):
+        """关闭帧队列并等待编码线程处理完剩余帧，按队列深度回调进度（0-1）"""
+        frame_queue = job.frame_queue
+        if frame_queue is None:
+            return
+        total = max(1, frame_queue.depth())
+        frame_queue.close()
+        while job.encode_thread is not None and job.encode_thread.is_alive():
+            job.encode_thread.join(0.25)
+            if on_progress:
+                on_progress(1.0 - min(total, frame_queue.depth()) / total)
+        self.last_queue_stats = frame_queue.get_stats()
+
+    def _encode_loop(self, frame_queue: FrameQueue, encoder: VideoEncoder, sync: AVSync, screen_capture):
+        """编码线程：从帧队列取帧，按呈现时间放入输出帧槽
+
+        帧的呈现时间由捕获时间戳经同步时钟换算（见 AVSync），落后时重复上一帧补齐，
+        超前时丢弃，保证捕获丢帧或队列丢帧后视频时长仍与实际时间（有音频时为音频）一致。
+        编码器按时间戳写入时（可变帧率）不写入重复帧，每帧带上所在帧槽的时间戳，
+        画面未变化期间的帧槽直接跳过。
+        编码器、同步时钟（含累计暂停时长）和捕获器都作为参数传入，不读取录制器的当前状态，
+        上一次录制收尾时开始的新录制不会影响本次的编码。
+        """
+        timestamped = encoder.writes_timestamps
+        held = None  # 最近编码的帧，保留引用用于补齐帧槽
+        
+        while True:
+            item = frame_queue.get()
+            if item is None:
+                if frame_queue.closed:
+                    break
+                continue
+            
+            frame, timestamp = item
+            repeats, keep = sync.place(timestamp)
+            if not keep:
+                screen_capture.release_frame(frame)
+                continue
+            slot = sync.next_slot - 1
+            if held is None:
+                # 第一帧之前的空缺（视频晚于音频开始）由第一帧覆盖
+                slot -= repeats
+                if not timestamped:
+                    self._repeat_frame(encoder, frame, repeats)
+            else:
+                if not timestamped:
+                    self._repeat_frame(encoder, held, repeats)
+                screen_capture.release_frame(held)
+            held = frame
+            
+            observer = self.stage_observer
+            if observer is None:
+                encoder.encode_frame(frame, slot)
+            else:
+                dequeued = time.monotonic()
+                encoder.encode_frame(frame, slot)
+                encoded = time.monotonic()
+                observer("queue_wait", dequeued - timestamp - sync.paused)
+                observer("encode", encoded - dequeued)
+                observer("capture_to_encoded", encoded - timestamp - sync.paused)
+        
+        if held is not None:
+            # 补齐到音频结尾，以及最后一帧之后画面一直未变化的时长
+            tail = sync.tail_frames()
+            if tail > 0:
+                sync.add_tail(tail)
+                if timestamped:
+                    # 在最后一个帧槽再写一次最后一帧，确定视频结束时间
+                    encoder.encode_frame(held, sync.next_slot - 1)
+                else:
+                    self._repeat_frame(encoder, held, tail)
+            screen_capture.release_frame(held)
+    
+    def _repeat_frame(self, encoder: VideoEncoder, frame, count: int):
+        """重复写入一帧以填充画面未变化的帧槽"""
+        for _ in range(max(0, count)):
+            if not encoder.encode_frame(frame):
+                break
+    
+    def get_queue_stats(self) -> dict:
+        """获取帧队列统计（深度、丢帧数等）"""
+        if self.frame_queue:
+            return self.frame_queue.get_stats()
+        return dict(self.last_queue_stats)
     
     def _on_frame_captured(self, frame):
-        """处理捕获的帧"""
-        if self.is_recording and not self.is_paused and self.video_encoder:
-            self.video_encoder.encode_frame(frame)
+        """处理捕获的帧（在捕获线程中执行），时间戳为扣除暂停时长后的捕获时间"""
+        frame_queue = self.frame_queue
+        if self.is_recording and not self.is_paused and frame_queue is not None:
+            frame_queue.put(frame, self.screen_capture.frame_timestamp - self.av_sync.paused)
+        elif self.screen_capture:
+            # 未入队的帧立即归还
+            self.screen_capture.release_frame(frame)
+    
+    def _on_frame_held(self, timestamp: float):
+        """画面未变化（在捕获线程中执行），只记录时间戳"""
+        if self.is_recording and not self.is_paused:
+            self.av_sync.hold(timestamp - self.av_sync.paused)
+    
+    def set_live_mux_enabled(self, enabled: bool):
+        """设置是否实时封装音视频（不支持时自动回退到事后合并）"""
+        self.live_mux_enabled = enabled
+    
+    def _on_audio_data(self, data: bytes):
+        """音频块写入输出（在音频回调线程中执行）
+
+        实时封装时送入编码器，否则已由音频捕获写入临时WAV；两种情况都用该块校准同步时钟。
+        暂停由音频捕获按暂停时刻裁剪，这里收到的都是应写入的采样。
+        """
+        if self.live_mux:
+            self.video_encoder.write_audio(data)
+        self.av_sync.add_audio(len(data) // self._audio_frame_bytes,
+                               self.audio_capture.chunk_time - self.av_sync.paused)
+    
+    def _connect_audio(self):
+        """连接音频数据信号"""
+        audio = self.audio_capture
+        self._audio_frame_bytes = max(1, audio.channels * audio.audio.get_sample_size(audio.format))
+        audio.audio_data_ready.connect(self._on_audio_data, Qt.ConnectionType.DirectConnection)
+    
+    def _disconnect_audio(self):
+        """断开音频数据信号"""
+        try:
+            self.audio_capture.audio_data_ready.disconnect(self._on_audio_data)
+        except (TypeError, RuntimeError):
+            pass
     
     def _on_frame_encoded(self, frame_count):
         """处理编码完成的帧"""
@@ -347,26 +1190,31 @@ class ScreenRecorder(QObject):
         else:
             return current_time - self.start_time - self.total_pause_duration
 
-    def _merge_audio_video(self):
-        """合并音频和视频文件"""
+    def _merge_audio_video(self, video_path: str, audio_path: str, output_path: str,
+                           duration: float = 0.0, on_progress=None) -> bool:
+        """合并音频和视频文件，返回是否得到了输出文件（音频合并失败时保存纯视频）
+
+        on_progress 按合并进度回调（0-1），仅系统FFmpeg命令可以报告进度。
+        """
         try:
-            if not self.video_temp_path or not self.audio_temp_path or not self.final_output_path:
-                return
+            if not video_path or not audio_path or not output_path:
+                return False
 
             # 检查临时文件是否存在
-            if not Path(self.video_temp_path).exists():
+            if not Path(video_path).exists():
                 self.error_occurred.emit("临时视频文件不存在")
-                return
+                return False
 
-            if not Path(self.audio_temp_path).exists():
+            if not Path(audio_path).exists():
                 # 如果音频文件不存在，只复制视频文件
                 import shutil
-                shutil.copy2(self.video_temp_path, self.final_output_path)
-                self._cleanup_temp_files()
-                return
+                shutil.copy2(video_path, output_path)
+                self._cleanup_temp_files(video_path, audio_path)
+                return True
 
             # 优先使用ffmpeg-python库
-            if FFMPEG_PYTHON_AVAILABLE:
+            ffmpeg = _load_ffmpeg_python()
+            if ffmpeg is not None:
                 try:
                     print("使用ffmpeg-python库合并音频视频...")
 
@@ -376,12 +1224,12 @@ class ScreenRecorder(QObject):
                         self._setup_ffmpeg_path_macos()
 
                     # 使用ffmpeg-python合并
-                    video_input = ffmpeg.input(self.video_temp_path)
-                    audio_input = ffmpeg.input(self.audio_temp_path)
+                    video_input = ffmpeg.input(video_path)
+                    audio_input = ffmpeg.input(audio_path)
 
                     output = ffmpeg.output(
                         video_input, audio_input,
-                        self.final_output_path,
+                        output_path,
                         vcodec='copy',  # 复制视频流
                         acodec='aac',   # 音频编码为AAC
                         strict='experimental'
@@ -390,8 +1238,8 @@ class ScreenRecorder(QObject):
                     # 执行合并，覆盖输出文件
                     ffmpeg.run(output, overwrite_output=True, quiet=True)
                     print("✅ 音频视频合并成功")
-                    self._cleanup_temp_files()
-                    return
+                    self._cleanup_temp_files(video_path, audio_path)
+                    return True
 
                 except Exception as e:
                     print(f"ffmpeg-python合并失败: {e}")
@@ -399,44 +1247,72 @@ class ScreenRecorder(QObject):
 
             # 使用系统FFmpeg命令作为备选方案
             cmd = [
-                'ffmpeg', '-y',  # -y 覆盖输出文件
-                '-i', self.video_temp_path,  # 输入视频
-                '-i', self.audio_temp_path,  # 输入音频
+                find_ffmpeg() or 'ffmpeg', '-y',  # -y 覆盖输出文件
+                '-i', video_path,  # 输入视频
+                '-i', audio_path,  # 输入音频
                 '-c:v', 'copy',  # 复制视频流
                 '-c:a', 'aac',   # 音频编码为AAC
                 '-strict', 'experimental',
-                self.final_output_path
+                output_path
             ]
 
             print(f"执行系统FFmpeg命令: {' '.join(cmd)}")
 
-            # 执行FFmpeg命令
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            # 执行FFmpeg命令，读取进度输出
+            process = subprocess.Popen(
+                with_progress_args(cmd),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
+            callback = None
+            if on_progress:
+                def callback(progress):
+                    if progress["percent"] >= 0:
+                        on_progress(progress["percent"] / 100)
+            reader = FFmpegProgressReader(process, duration, callback)
+            reader.start()
+            try:
+                # 音频需要重新编码，超时随录制时长增加
+                process.wait(timeout=max(60.0, duration))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                reader.join()
 
-            if result.returncode == 0:
+            if process.returncode == 0:
                 print("✅ 音频视频合并成功")
-                self._cleanup_temp_files()
-            else:
-                print(f"❌ FFmpeg错误: {result.stderr}")
-                # 如果合并失败，至少保存视频文件
-                import shutil
-                shutil.copy2(self.video_temp_path, self.final_output_path)
-                self._cleanup_temp_files()
-                self.error_occurred.emit(f"音频合并失败，已保存纯视频文件: {result.stderr}")
+                self._cleanup_temp_files(video_path, audio_path)
+                return True
+
+            error = reader.get_error_output()
+            print(f"❌ FFmpeg错误: {error}")
+            # 如果合并失败，至少保存视频文件
+            import shutil
+            shutil.copy2(video_path, output_path)
+            self._cleanup_temp_files(video_path, audio_path)
+            self.error_occurred.emit(f"音频合并失败，已保存纯视频文件: {error}")
+            return False
 
         except subprocess.TimeoutExpired:
             self.error_occurred.emit("音频视频合并超时")
+            return False
         except FileNotFoundError:
             # FFmpeg未安装，只保存视频文件
             import shutil
-            shutil.copy2(self.video_temp_path, self.final_output_path)
-            self._cleanup_temp_files()
+            shutil.copy2(video_path, output_path)
+            self._cleanup_temp_files(video_path, audio_path)
             self.error_occurred.emit("FFmpeg未安装，已保存纯视频文件")
+            return False
         except Exception as e:
             self.error_occurred.emit(f"合并音频视频失败: {str(e)}")
+            return False
 
     def _setup_ffmpeg_path_macos(self):
-        """设置macOS的FFmpeg路径"""
+        """设置macOS的FFmpeg路径（ffmpeg-python按名称调用ffmpeg，需要在PATH中）"""
         try:
             import os
             import shutil
@@ -445,39 +1321,26 @@ class ScreenRecorder(QObject):
             if shutil.which('ffmpeg'):
                 return
 
-            # 检查常见的macOS FFmpeg安装位置
-            possible_paths = [
-                '/usr/local/bin',
-                '/opt/homebrew/bin',
-                str(Path.home() / '.local' / 'bin'),
-                '/usr/bin'
-            ]
-
-            for bin_path in possible_paths:
-                ffmpeg_path = Path(bin_path) / 'ffmpeg'
-                if ffmpeg_path.exists():
-                    # 添加到PATH环境变量
-                    current_path = os.environ.get('PATH', '')
-                    if bin_path not in current_path:
-                        os.environ['PATH'] = f"{bin_path}:{current_path}"
-                        print(f"✅ 已添加FFmpeg路径到PATH: {bin_path}")
-                    return
+            ffmpeg_path = find_ffmpeg()
+            if ffmpeg_path:
+                # 添加到PATH环境变量
+                bin_path = str(Path(ffmpeg_path).parent)
+                current_path = os.environ.get('PATH', '')
+                os.environ['PATH'] = f"{bin_path}{os.pathsep}{current_path}"
+                print(f"✅ 已添加FFmpeg路径到PATH: {bin_path}")
+                return
 
             print("⚠️ 未找到FFmpeg，可能需要安装")
 
         except Exception as e:
             print(f"设置FFmpeg路径失败: {e}")
 
-    def _cleanup_temp_files(self):
+    def _cleanup_temp_files(self, video_path: Optional[str], audio_path: Optional[str]):
         """清理临时文件"""
         try:
-            if self.video_temp_path and Path(self.video_temp_path).exists():
-                Path(self.video_temp_path).unlink()
-            if self.audio_temp_path and Path(self.audio_temp_path).exists():
-                Path(self.audio_temp_path).unlink()
+            if video_path and Path(video_path).exists():
+                Path(video_path).unlink()
+            if audio_path and Path(audio_path).exists():
+                Path(audio_path).unlink()
         except Exception as e:
             print(f"清理临时文件失败: {e}")
-        finally:
-            self.video_temp_path = None
-            self.audio_temp_path = None
-            self.final_output_path = None
@@ -4,11 +4,18 @@
 
 import os
 import subprocess
-import threading
 from pathlib import Path
 from typing import Optional, Dict, List, Callable
 from PyQt6.QtCore import QObject, pyqtSignal
 
+from core.media_probe import MediaProbe
+from core.ffmpeg_progress import FFmpegProgressReader, with_progress_args
+from core.job_scheduler import JobScheduler, ProcessingJob
+from core.chunked_transcode import ChunkedTranscode
+from core.smart_trim import SmartTrim
+from config.settings import AppConfig
+from utils.ffmpeg_locator import find_ffmpeg, get_ffmpeg_locator
+
 class VideoProcessor(QObject):
     """视频处理器"""
     
@@ -17,36 +24,23 @@ class VideoProcessor(QObject):
     processing_finished = pyqtSignal(str)    # 处理完成
     processing_failed = pyqtSignal(str, str) # 处理失败 (文件路径, 错误信息)
     progress_updated = pyqtSignal(str, int)  # 进度更新 (文件路径, 百分比)
+    progress_detail = pyqtSignal(str, dict)  # 详细进度 (文件路径, {job_id, percent, speed, eta, ...})
+    job_status_changed = pyqtSignal(str, str) # 任务状态变化 (任务ID, 状态)
     
     def __init__(self):
         super().__init__()
         self.ffmpeg_path = self.find_ffmpeg()
-        self.processing_queue = []
-        self.is_processing = False
+        self.probe = MediaProbe(self.ffmpeg_path)
+        self.threads_per_job = AppConfig.FFMPEG_THREADS_PER_JOB
+        self.scheduler = JobScheduler(
+            self._run_job,
+            self._get_max_concurrent_jobs(),
+            on_status_changed=lambda job: self.job_status_changed.emit(job.job_id, job.status)
+        )
         
     def find_ffmpeg(self) -> Optional[str]:
-        """查找FFmpeg可执行文件"""
-        # 常见的FFmpeg路径
-        possible_paths = [
-            "ffmpeg",  # 系统PATH中
-            "ffmpeg.exe",  # Windows
-            "/usr/bin/ffmpeg",  # Linux
-            "/usr/local/bin/ffmpeg",  # macOS Homebrew
-            "./ffmpeg/bin/ffmpeg.exe",  # 本地目录
-        ]
-        
-        for path in possible_paths:
-            try:
-                result = subprocess.run([path, "-version"], 
-                                      capture_output=True, 
-                                      text=True, 
-                                      timeout=5)
-                if result.returncode == 0:
-                    return path
-            except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
-                continue
-        
-        return None
+        """查找FFmpeg可执行文件（共享查找结果，二进制文件未变化时不运行子进程）"""
+        return find_ffmpeg()
     
     def is_ffmpeg_available(self) -> bool:
         """检查FFmpeg是否可用"""
@@ -54,57 +48,53 @@ class VideoProcessor(QObject):
     
     def convert_video(self, input_path: str, output_path: str, 
                      format_type: str = "mp4", quality: str = "高质量",
-                     custom_options: Dict = None) -> bool:
-        """转换视频格式"""
+                     custom_options: Dict = None, priority: int = 0,
+                     parallel: Optional[bool] = None) -> Optional[str]:
+        """转换视频格式，返回任务ID
+
+        parallel 为True时在关键帧处分块并行转码（None表示读取配置）。
+        """
         if not self.is_ffmpeg_available():
             self.processing_failed.emit(input_path, "FFmpeg不可用")
-            return False
-        
-        # 构建FFmpeg命令
-        cmd = [self.ffmpeg_path, "-i", input_path]
+            return None
         
         # 添加质量设置
-        quality_settings = self.get_quality_settings(quality)
-        cmd.extend(quality_settings)
+        encode_args = self.get_quality_settings(quality)
         
         # 添加格式特定设置
-        format_settings = self.get_format_settings(format_type)
-        cmd.extend(format_settings)
+        encode_args.extend(self.get_format_settings(format_type))
         
         # 添加自定义选项
         if custom_options:
             for key, value in custom_options.items():
-                cmd.extend([f"-{key}", str(value)])
+                encode_args.extend([f"-{key}", str(value)])
         
-        # 输出文件
-        cmd.extend(["-y", output_path])  # -y 覆盖输出文件
+        # 构建FFmpeg命令，-y 覆盖输出文件
+        cmd = [self.ffmpeg_path, "-i", input_path] + encode_args + ["-y", output_path]
         
-        # 在后台线程中执行转换
-        thread = threading.Thread(
-            target=self._run_conversion,
-            args=(cmd, input_path, output_path)
-        )
-        thread.daemon = True
-        thread.start()
-        
-        return True
+        task = self._create_chunked_transcode(input_path, output_path, encode_args, parallel)
+        return self._submit_job(cmd, input_path, output_path, priority, kind="convert", task=task)
     
     def compress_video(self, input_path: str, output_path: str,
                       target_size_mb: Optional[int] = None,
-                      compression_level: str = "medium") -> bool:
-        """压缩视频"""
+                      compression_level: str = "medium", priority: int = 0,
+                      parallel: Optional[bool] = None) -> Optional[str]:
+        """压缩视频，返回任务ID
+
+        parallel 为True时在关键帧处分块并行转码（None表示读取配置）。
+        """
         if not self.is_ffmpeg_available():
             self.processing_failed.emit(input_path, "FFmpeg不可用")
-            return False
+            return None
         
-        cmd = [self.ffmpeg_path, "-i", input_path]
+        encode_args = []
         
         if target_size_mb:
             # 基于目标文件大小计算比特率
             duration = self.get_video_duration(input_path)
             if duration > 0:
                 target_bitrate = int((target_size_mb * 8 * 1024) / duration)
-                cmd.extend(["-b:v", f"{target_bitrate}k"])
+                encode_args.extend(["-b:v", f"{target_bitrate}k"])
         else:
             # 使用预设压缩级别
             compression_settings = {
@@ -112,25 +102,19 @@ class VideoProcessor(QObject):
                 "medium": ["-crf", "23", "-preset", "medium"],
                 "high": ["-crf", "18", "-preset", "slow"]
             }
-            cmd.extend(compression_settings.get(compression_level, compression_settings["medium"]))
+            encode_args.extend(compression_settings.get(compression_level, compression_settings["medium"]))
         
-        cmd.extend(["-y", output_path])
-        
-        thread = threading.Thread(
-            target=self._run_conversion,
-            args=(cmd, input_path, output_path)
-        )
-        thread.daemon = True
-        thread.start()
+        cmd = [self.ffmpeg_path, "-i", input_path] + encode_args + ["-y", output_path]
         
-        return True
+        task = self._create_chunked_transcode(input_path, output_path, encode_args, parallel)
+        return self._submit_job(cmd, input_path, output_path, priority, kind="compress", task=task)
     
     def extract_audio(self, input_path: str, output_path: str,
-                     audio_format: str = "mp3") -> bool:
-        """提取音频"""
+                     audio_format: str = "mp3", priority: int = 0) -> Optional[str]:
+        """提取音频，返回任务ID"""
         if not self.is_ffmpeg_available():
             self.processing_failed.emit(input_path, "FFmpeg不可用")
-            return False
+            return None
         
         cmd = [
             self.ffmpeg_path, "-i", input_path,
@@ -139,57 +123,40 @@ class VideoProcessor(QObject):
             "-y", output_path
         ]
         
-        thread = threading.Thread(
-            target=self._run_conversion,
-            args=(cmd, input_path, output_path)
-        )
-        thread.daemon = True
-        thread.start()
-        
-        return True
+        return self._submit_job(cmd, input_path, output_path, priority, kind="extract_audio")
     
     def trim_video(self, input_path: str, output_path: str,
-                  start_time: str, duration: str) -> bool:
-        """裁剪视频"""
+                  start_time: str, duration: str, priority: int = 0,
+                  smart: bool = True) -> Optional[str]:
+        """裁剪视频，返回任务ID
+
+        smart 为True时中间完整的GOP直接复制，只重新编码两端不完整的GOP，裁剪点精确到帧；
+        源视频编解码器不支持时退回直接复制（裁剪点对齐到关键帧）。
+        """
         if not self.is_ffmpeg_available():
             self.processing_failed.emit(input_path, "FFmpeg不可用")
-            return False
+            return None
         
         cmd = [
-            self.ffmpeg_path, "-i", input_path,
-            "-ss", start_time,  # 开始时间
+            self.ffmpeg_path,
+            "-ss", start_time,  # 开始时间（输入定位，不解码跳过的部分）
+            "-i", input_path,
             "-t", duration,     # 持续时间
             "-c", "copy",       # 复制流，不重新编码
             "-y", output_path
         ]
         
-        thread = threading.Thread(
-            target=self._run_conversion,
-            args=(cmd, input_path, output_path)
-        )
-        thread.daemon = True
-        thread.start()
-        
-        return True
+        task = None
+        if smart:
+            task = SmartTrim(self.ffmpeg_path, input_path, output_path,
+                             self._parse_time(start_time), self._parse_time(duration),
+                             self.get_video_info(input_path), self.get_quality_settings("高质量"))
+        return self._submit_job(cmd, input_path, output_path, priority,
+                                self._parse_time(duration) or None, "trim", task=task)
     
-    def get_video_info(self, video_path: str) -> Dict:
-        """获取视频信息"""
-        if not self.is_ffmpeg_available():
-            return {}
-        
-        cmd = [
-            self.ffmpeg_path, "-i", video_path,
-            "-hide_banner", "-f", "null", "-"
-        ]
-        
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            # 解析FFmpeg输出获取视频信息
-            info = self._parse_video_info(result.stderr)
-            return info
-        except Exception as e:
-            print(f"获取视频信息失败: {str(e)}")
-            return {}
+    def get_video_info(self, video_path: str, use_cache: bool = True) -> Dict:
+        """获取视频信息（ffprobe读取文件头，结果按路径/大小/修改时间缓存）"""
+        return self.probe.probe(video_path, use_cache)
     
     def get_video_duration(self, video_path: str) -> float:
         """获取视频时长（秒）"""
@@ -207,7 +174,7 @@ class VideoProcessor(QObject):
         return quality_map.get(quality, quality_map["高质量"])
     
     def get_format_settings(self, format_type: str) -> List[str]:
-        """获取格式设置"""
+        """获取格式设置（FFmpeg未编译该编码器时改用内置编码器）"""
         format_map = {
             "mp4": ["-c:v", "libx264", "-c:a", "aac"],
             "avi": ["-c:v", "libxvid", "-c:a", "mp3"],
@@ -215,7 +182,14 @@ class VideoProcessor(QObject):
             "webm": ["-c:v", "libvpx-vp9", "-c:a", "libopus"],
             "mkv": ["-c:v", "libx264", "-c:a", "aac"]
         }
-        return format_map.get(format_type.lower(), format_map["mp4"])
+        fallbacks = {"libxvid": "mpeg4"}
+        settings = list(format_map.get(format_type.lower(), format_map["mp4"]))
+        locator = get_ffmpeg_locator()
+        if locator.get_info().get("encoders"):
+            for index, codec in enumerate(settings):
+                if codec in fallbacks and not locator.has_encoder(codec):
+                    settings[index] = fallbacks[codec]
+        return settings
     
     def get_audio_codec(self, audio_format: str) -> str:
         """获取音频编解码器"""
@@ -227,86 +201,203 @@ class VideoProcessor(QObject):
         }
         return codec_map.get(audio_format.lower(), "libmp3lame")
     
-    def _run_conversion(self, cmd: List[str], input_path: str, output_path: str):
-        """运行转换命令"""
-        self.processing_started.emit(input_path)
+    def _get_max_concurrent_jobs(self) -> int:
+        """读取最大并发任务数配置（0表示自动）"""
+        try:
+            from utils.config_manager import get_config
+            value = int(get_config("advanced.max_concurrent_jobs", 0))
+        except Exception as e:
+            print(f"读取并发任务配置失败: {e}")
+            value = 0
+        return value if value > 0 else JobScheduler.default_max_workers(self.threads_per_job)
+    
+    def set_max_concurrent_jobs(self, max_jobs: int):
+        """设置最大并发任务数（0表示自动）"""
+        if max_jobs <= 0:
+            max_jobs = JobScheduler.default_max_workers(self.threads_per_job)
+        self.scheduler.set_max_workers(max_jobs)
+    
+    def _create_chunked_transcode(self, input_path: str, output_path: str, encode_args: List[str],
+                                  parallel: Optional[bool] = None) -> Optional[ChunkedTranscode]:
+        """按配置创建分块并行转码，未启用时返回None
+
+        块数默认与自动并发数相同（CPU核心数 / 每任务线程数），任务开始时再按空闲的并发槽数限制；
+        是否真正分块在任务开始时根据关键帧和时长决定，否则仍以单进程转码。
+        """
+        try:
+            from utils.config_manager import get_config
+            if parallel is None:
+                parallel = bool(get_config("advanced.parallel_transcode", False))
+            chunks = int(get_config("advanced.transcode_chunks", 0))
+        except Exception as e:
+            print(f"读取并行转码配置失败: {e}")
+            parallel = bool(parallel)
+            chunks = 0
+        if not parallel:
+            return None
+        if chunks <= 0:
+            chunks = JobScheduler.default_max_workers(self.threads_per_job)
+        
+        info = self.get_video_info(input_path)
+        return ChunkedTranscode(
+            self.ffmpeg_path, input_path, output_path, encode_args, chunks, self.threads_per_job,
+            has_audio=bool(info.get("audio_codec")), fps=info.get("fps", 0.0)
+        )
+    
+    def _submit_job(self, cmd: List[str], input_path: str, output_path: str,
+                    priority: int = 0, duration: Optional[float] = None, kind: str = "",
+                    task=None) -> str:
+        """把ffmpeg命令加入任务队列
+
+        task 为多进程任务（ChunkedTranscode、SmartTrim），任务开始时 task.plan()
+        返回False则改为运行cmd。
+        """
+        if "-threads" not in cmd:
+            # 限制每个任务的编码线程数，与并发数配合避免过载
+            cmd = cmd[:-1] + ["-threads", str(self.threads_per_job)] + cmd[-1:]
+        job = ProcessingJob(cmd, input_path, output_path, priority, duration, kind)
+        job.task = task
+        return self.scheduler.submit(job)
+    
+    def get_job_status(self, job_id: str) -> Optional[Dict]:
+        """查询任务状态"""
+        return self.scheduler.get_job(job_id)
+    
+    def list_jobs(self) -> List[Dict]:
+        """所有任务的状态"""
+        return self.scheduler.list_jobs()
+    
+    def cancel_job(self, job_id: str) -> bool:
+        """取消任务（排队中或运行中）"""
+        return self.scheduler.cancel(job_id)
+    
+    def cancel_all_jobs(self):
+        """取消所有任务"""
+        self.scheduler.cancel_all()
+    
+    @property
+    def is_processing(self) -> bool:
+        """是否有任务正在运行"""
+        return self.scheduler.get_stats()["running"] > 0
+    
+    def _plan_task(self, job: ProcessingJob, duration: float) -> bool:
+        """任务开始时规划多进程任务，返回是否按多进程运行
+
+        分块转码的每个进程各占一个并发槽（任务本身已占一个），块数不超过当前空闲的槽数，
+        多个分块任务同时运行时ffmpeg进程总数仍不超过最大并发数。
+        """
+        task = job.task
+        if not isinstance(task, ChunkedTranscode):
+            return task.plan(duration)
+
+        task.limit_processes(1 + self.scheduler.reserve_slots(job, task.processes_wanted() - 1))
+        planned = task.plan(duration)
+        self.scheduler.release_slots(job, keep=task.process_count() - 1 if planned else 0)
+        return planned
+    
+    def _run_job(self, job: ProcessingJob):
+        """在工作线程中运行任务
+
+        job.duration 为输出时长（秒），未指定时使用输入文件的时长。
+        """
+        self.processing_started.emit(job.input_path)
+        
+        duration = job.duration
+        if duration is None:
+            duration = self.get_video_duration(job.input_path)
         
         try:
-            # 启动FFmpeg进程
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                universal_newlines=True
-            )
+            if job.task is not None and not job.cancel_requested and self._plan_task(job, duration):
+                success, error = job.task.run(job, self._make_progress_callback(job))
+                self._finish_job(job, success, error)
+                return
+            
+            with job.lock:
+                if job.cancel_requested:
+                    job.status = ProcessingJob.STATUS_CANCELLED
+                else:
+                    # 启动FFmpeg进程，进度从stdout读取
+                    job.process = subprocess.Popen(
+                        with_progress_args(job.cmd),
+                        stdin=subprocess.DEVNULL,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        text=True,
+                        errors="replace"
+                    )
+            
+            if job.status == ProcessingJob.STATUS_CANCELLED:
+                self.processing_failed.emit(job.input_path, "任务已取消")
+                return
             
             # 监控进度
-            self._monitor_progress(process, input_path)
+            reader = self._monitor_progress(job, duration)
             
             # 等待完成
-            stdout, stderr = process.communicate()
+            returncode = job.process.wait()
+            reader.join()
             
-            if process.returncode == 0:
-                self.processing_finished.emit(output_path)
-            else:
-                error_msg = stderr or "转换失败"
-                self.processing_failed.emit(input_path, error_msg)
+            self._finish_job(job, returncode == 0, reader.get_error_output())
                 
         except Exception as e:
-            self.processing_failed.emit(input_path, str(e))
+            job.error = str(e)
+            job.status = ProcessingJob.STATUS_FAILED
+            self.processing_failed.emit(job.input_path, str(e))
+    
+    def _finish_job(self, job: ProcessingJob, success: bool, error: str = ""):
+        """根据进程结果设置任务状态并发出信号"""
+        if job.cancel_requested:
+            job.status = ProcessingJob.STATUS_CANCELLED
+            self._remove_partial_output(job.output_path)
+            self.processing_failed.emit(job.input_path, "任务已取消")
+        elif success:
+            job.progress = 100
+            job.status = ProcessingJob.STATUS_FINISHED
+            self.progress_updated.emit(job.input_path, 100)
+            self.processing_finished.emit(job.output_path)
+        else:
+            job.error = error or "转换失败"
+            job.status = ProcessingJob.STATUS_FAILED
+            self.processing_failed.emit(job.input_path, job.error)
     
-    def _monitor_progress(self, process, input_path: str):
-        """监控转换进度"""
-        # 简化的进度监控实现
-        # 实际实现需要解析FFmpeg的输出来获取准确进度
+    def _make_progress_callback(self, job: ProcessingJob) -> Callable[[Dict], None]:
+        """进度回调：更新任务进度并发出信号"""
+        def on_progress(progress: Dict):
+            progress["job_id"] = job.job_id
+            job.detail = progress
+            if progress["percent"] >= 0:
+                job.progress = int(progress["percent"])
+                self.progress_updated.emit(job.input_path, job.progress)
+            self.progress_detail.emit(job.input_path, progress)
+        return on_progress
+    
+    def _monitor_progress(self, job: ProcessingJob, duration: float) -> FFmpegProgressReader:
+        """监控转换进度（读取线程阻塞在管道上，不占用CPU）"""
+        reader = FFmpegProgressReader(job.process, duration, self._make_progress_callback(job))
+        reader.start()
+        return reader
+    
+    def _remove_partial_output(self, output_path: str):
+        """删除被取消任务的不完整输出"""
         try:
-            while process.poll() is None:
-                # 这里应该解析FFmpeg输出来获取实际进度
-                # 由于篇幅限制，使用简化实现
-                pass
-        except Exception:
-            pass
+            if os.path.exists(output_path):
+                os.remove(output_path)
+        except OSError as e:
+            print(f"删除不完整输出失败: {e}")
     
     def _parse_video_info(self, ffmpeg_output: str) -> Dict:
         """解析FFmpeg输出获取视频信息"""
-        info = {}
-        
-        try:
-            lines = ffmpeg_output.split('\n')
-            for line in lines:
-                if "Duration:" in line:
-                    # 解析时长
-                    duration_str = line.split("Duration:")[1].split(",")[0].strip()
-                    info["duration"] = self._parse_duration(duration_str)
-                elif "Video:" in line:
-                    # 解析视频信息
-                    parts = line.split(",")
-                    for part in parts:
-                        if "x" in part and part.strip().replace("x", "").replace(" ", "").isdigit():
-                            # 解析分辨率
-                            resolution = part.strip()
-                            info["resolution"] = resolution
-                        elif "fps" in part:
-                            # 解析帧率
-                            fps_str = part.replace("fps", "").strip()
-                            try:
-                                info["fps"] = float(fps_str)
-                            except ValueError:
-                                pass
-        except Exception as e:
-            print(f"解析视频信息失败: {str(e)}")
-        
-        return info
+        return MediaProbe.parse_header_output(ffmpeg_output)
     
     def _parse_duration(self, duration_str: str) -> float:
         """解析时长字符串为秒数"""
+        return MediaProbe._parse_duration(duration_str)
+    
+    def _parse_time(self, time_str: str) -> float:
+        """解析ffmpeg时间参数（秒数或 HH:MM:SS.mmm）"""
+        if ":" in str(time_str):
+            return self._parse_duration(str(time_str))
         try:
-            # 格式: HH:MM:SS.mmm
-            parts = duration_str.split(":")
-            hours = float(parts[0])
-            minutes = float(parts[1])
-            seconds = float(parts[2])
-            return hours * 3600 + minutes * 60 + seconds
-        except Exception:
+            return float(time_str)
+        except (TypeError, ValueError):
             return 0.0
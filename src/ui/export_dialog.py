@@ -10,66 +10,44 @@ from PyQt6.QtWidgets import (
     QPushButton, QSlider, QProgressBar, QTextEdit, QTabWidget,
     QWidget, QFileDialog, QMessageBox
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QThread
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont
 
-class ExportWorker(QThread):
-    """导出工作线程"""
+def submit_export_job(processor, input_path: str, output_path: str, export_settings: dict):
+    """把导出任务提交到处理器的任务队列，返回任务ID（失败时返回None）"""
+    export_type = export_settings.get("type", "convert")
     
-    progress_updated = pyqtSignal(int)
-    export_finished = pyqtSignal(str)
-    export_failed = pyqtSignal(str)
-    
-    def __init__(self, processor, input_path, output_path, export_settings):
-        super().__init__()
-        self.processor = processor
-        self.input_path = input_path
-        self.output_path = output_path
-        self.export_settings = export_settings
-    
-    def run(self):
-        """执行导出"""
-        try:
-            export_type = self.export_settings.get("type", "convert")
-            
-            if export_type == "convert":
-                success = self.processor.convert_video(
-                    self.input_path,
-                    self.output_path,
-                    self.export_settings.get("format", "mp4"),
-                    self.export_settings.get("quality", "高质量"),
-                    self.export_settings.get("custom_options", {})
-                )
-            elif export_type == "compress":
-                success = self.processor.compress_video(
-                    self.input_path,
-                    self.output_path,
-                    self.export_settings.get("target_size"),
-                    self.export_settings.get("compression_level", "medium")
-                )
-            elif export_type == "extract_audio":
-                success = self.processor.extract_audio(
-                    self.input_path,
-                    self.output_path,
-                    self.export_settings.get("audio_format", "mp3")
-                )
-            elif export_type == "trim":
-                success = self.processor.trim_video(
-                    self.input_path,
-                    self.output_path,
-                    self.export_settings.get("start_time", "00:00:00"),
-                    self.export_settings.get("duration", "00:01:00")
-                )
-            else:
-                success = False
-            
-            if success:
-                self.export_finished.emit(self.output_path)
-            else:
-                self.export_failed.emit("导出失败")
-                
-        except Exception as e:
-            self.export_failed.emit(str(e))
+    if export_type == "convert":
+        return processor.convert_video(
+            input_path,
+            output_path,
+            export_settings.get("format", "mp4"),
+            export_settings.get("quality", "高质量"),
+            export_settings.get("custom_options", {}),
+            parallel=export_settings.get("parallel")
+        )
+    elif export_type == "compress":
+        return processor.compress_video(
+            input_path,
+            output_path,
+            export_settings.get("target_size"),
+            export_settings.get("compression_level", "medium"),
+            parallel=export_settings.get("parallel")
+        )
+    elif export_type == "extract_audio":
+        return processor.extract_audio(
+            input_path,
+            output_path,
+            export_settings.get("audio_format", "mp3")
+        )
+    elif export_type == "trim":
+        return processor.trim_video(
+            input_path,
+            output_path,
+            export_settings.get("start_time", "00:00:00"),
+            export_settings.get("duration", "00:01:00")
+        )
+    return None
 
 class ExportDialog(QDialog):
     """导出对话框"""
@@ -80,7 +58,7 @@ class ExportDialog(QDialog):
         super().__init__(parent)
         self.input_path = input_path
         self.video_processor = video_processor
-        self.export_worker = None
+        self.export_job_id = None
         
         self.setWindowTitle("导出视频")
         self.setModal(True)
@@ -300,6 +278,15 @@ class ExportDialog(QDialog):
         self.overwrite_cb = QCheckBox("覆盖现有文件")
         layout.addRow(self.overwrite_cb)
         
+        # 分块并行转码（格式转换和压缩有效）
+        self.parallel_cb = QCheckBox("分块并行转码（多核加速长视频）")
+        try:
+            from utils.config_manager import get_config
+            self.parallel_cb.setChecked(bool(get_config("advanced.parallel_transcode", False)))
+        except Exception as e:
+            print(f"读取并行转码配置失败: {e}")
+        layout.addRow(self.parallel_cb)
+        
         return group
     
     def connect_signals(self):
@@ -314,6 +301,11 @@ class ExportDialog(QDialog):
         # 格式改变时更新输出路径
         self.format_combo.currentTextChanged.connect(self.update_output_path)
         self.audio_format_combo.currentTextChanged.connect(self.update_output_path)
+        
+        # 导出任务状态与进度
+        if self.video_processor:
+            self.video_processor.job_status_changed.connect(self.on_job_status_changed)
+            self.video_processor.progress_detail.connect(self.on_progress_detail)
     
     def update_output_path(self):
         """更新输出路径"""
@@ -362,12 +354,14 @@ class ExportDialog(QDialog):
                 "quality": self.quality_combo.currentText(),
                 "custom_options": {
                     "b:v": f"{self.bitrate_spin.value()}k"
-                }
+                },
+                "parallel": self.parallel_cb.isChecked()
             }
         elif current_tab == 1:  # 压缩
             settings = {
                 "type": "compress",
-                "compression_level": {"低": "low", "中": "medium", "高": "high"}[self.compress_level_combo.currentText()]
+                "compression_level": {"低": "low", "中": "medium", "高": "high"}[self.compress_level_combo.currentText()],
+                "parallel": self.parallel_cb.isChecked()
             }
             if self.use_target_size_cb.isChecked():
                 settings["target_size"] = self.target_size_spin.value()
@@ -411,13 +405,43 @@ class ExportDialog(QDialog):
         self.export_btn.setEnabled(False)
         self.progress_bar.setVisible(True)
         
-        # 创建工作线程
-        self.export_worker = ExportWorker(
+        # 提交到处理器的任务队列
+        self.export_job_id = submit_export_job(
             self.video_processor, self.input_path, output_path, settings
         )
-        self.export_worker.export_finished.connect(self.on_export_finished)
-        self.export_worker.export_failed.connect(self.on_export_failed)
-        self.export_worker.start()
+        if not self.export_job_id:
+            self.on_export_failed("导出失败")
+    
+    def on_job_status_changed(self, job_id: str, status: str):
+        """导出任务状态变化"""
+        if job_id != self.export_job_id:
+            return
+        
+        job = self.video_processor.get_job_status(job_id) or {}
+        if status == "queued":
+            self.progress_bar.setFormat("排队中...")
+        elif status == "running":
+            self.progress_bar.setFormat("%p%")
+        elif status == "finished":
+            self.export_job_id = None
+            self.on_export_finished(job.get("output_path", ""))
+        elif status == "failed":
+            self.export_job_id = None
+            self.on_export_failed(job.get("error") or "导出失败")
+        elif status == "cancelled":
+            self.export_job_id = None
+            self.export_btn.setEnabled(True)
+            self.progress_bar.setVisible(False)
+    
+    def on_progress_detail(self, input_path: str, progress: dict):
+        """导出进度更新"""
+        if progress.get("job_id") != self.export_job_id:
+            return
+        
+        if progress["percent"] >= 0:
+            self.progress_bar.setValue(int(progress["percent"]))
+        if progress["eta"] >= 0:
+            self.progress_bar.setFormat(f"%p%  {progress['speed']:.1f}x  剩余 {int(progress['eta'])} 秒")
     
     def on_export_finished(self, output_path):
         """导出完成"""
@@ -434,15 +458,23 @@ class ExportDialog(QDialog):
         
         QMessageBox.critical(self, "导出失败", f"导出失败:\n{error_message}")
     
+    def reject(self):
+        """取消按钮：同时取消进行中的导出任务"""
+        if self.export_job_id:
+            self.video_processor.cancel_job(self.export_job_id)
+            self.export_job_id = None
+        super().reject()
+    
     def closeEvent(self, event):
         """关闭事件"""
-        if self.export_worker and self.export_worker.isRunning():
+        if self.export_job_id:
             reply = QMessageBox.question(
                 self, "确认关闭", "导出正在进行中，确定要关闭吗？",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             if reply == QMessageBox.StandardButton.Yes:
-                self.export_worker.terminate()
+                self.video_processor.cancel_job(self.export_job_id)
+                self.export_job_id = None
                 event.accept()
             else:
                 event.ignore()
@@ -4,24 +4,22 @@
 
 import os
 import sys
-import cv2
 from pathlib import Path
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QPushButton, QLabel, QComboBox, QSpinBox, QSlider, QProgressBar,
     QGroupBox, QCheckBox, QLineEdit, QFileDialog, QMessageBox,
-    QSystemTrayIcon, QMenu, QStatusBar, QFrame, QSplitter
+    QSystemTrayIcon, QMenu, QStatusBar, QFrame, QSplitter, QApplication
 )
-from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal, QSize
-from PyQt6.QtGui import QIcon, QPixmap, QFont, QAction, QPalette, QColor
+from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal, QSize, QPointF
+from PyQt6.QtGui import QIcon, QPixmap, QImage, QPainter, QFont, QAction, QPalette, QColor
 
 # 导入核心模块
+# 捕获、编码、音频和FFmpeg模块（依赖cv2、numpy、mss、pyaudio）在首次使用时才导入，窗口可以尽快显示
 sys.path.append(str(Path(__file__).parent.parent))
-from core.screen_capture import ScreenCapture
-from core.audio_capture import AudioCapture
-from core.video_encoder import VideoEncoder, ScreenRecorder
 from config.settings import AppConfig, UIConfig
-from utils.ffmpeg_manager import FFmpegManager
+from utils.hotkey_manager import HotkeyManager, DefaultHotkeys
+from utils.startup_profiler import get_startup_profiler
 
 class ModernButton(QPushButton):
     """现代化按钮样式"""
@@ -129,51 +127,88 @@ class PreviewWidget(QLabel):
                 font-size: 14px;
             }
         """)
-    
-    def update_frame(self, pixmap):
-        """更新预览帧"""
-        if pixmap:
-            scaled_pixmap = pixmap.scaled(
-                self.size(), 
-                Qt.AspectRatioMode.KeepAspectRatio, 
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.setPixmap(scaled_pixmap)
+
+        # 复用的帧缓冲和包装它的QImage，尺寸变化时才重新创建
+        self._buffer = None
+        self._image = None
+
+    def target_size(self):
+        """预览区域的物理像素大小（供渲染线程缩放）"""
+        ratio = self.devicePixelRatioF()
+        return int(self.width() * ratio), int(self.height() * ratio)
+
+    def update_frame(self, frame):
+        """更新预览帧（已缩放好的BGR帧，直接复制到复用的缓冲中）"""
+        if frame is None:
+            return
+        height, width = frame.shape[:2]
+        if self._buffer is None or self._buffer.shape != frame.shape:
+            self._buffer = frame.copy()
+            self._image = QImage(self._buffer.data, width, height, 3 * width, QImage.Format.Format_BGR888)
+            self._image.setDevicePixelRatio(self.devicePixelRatioF())
+            self.setText("")
+        else:
+            self._buffer[...] = frame
+        self.update()
+
+    def clear_frame(self):
+        """清除预览帧，恢复提示文字"""
+        self._buffer = None
+        self._image = None
+        self.setText("预览窗口\n点击开始录制后显示")
+
+    def paintEvent(self, event):
+        """居中绘制预览帧（帧已缩放到预览大小，不再平滑缩放）"""
+        super().paintEvent(event)
+        if self._image is None:
+            return
+        painter = QPainter(self)
+        size = self._image.deviceIndependentSize()
+        x = (self.width() - size.width()) / 2
+        y = (self.height() - size.height()) / 2
+        painter.drawImage(QPointF(x, y), self._image)
+        painter.end()
 
 class MainWindow(QMainWindow):
     """主窗口类"""
     
     def __init__(self):
         super().__init__()
-        self.screen_capture = ScreenCapture()
-        self.audio_capture = AudioCapture()
-        self.video_encoder = VideoEncoder()
-        self.screen_recorder = ScreenRecorder()
-        
-        # 设置录制器
-        self.screen_recorder.setup(
-            self.screen_capture, 
-            self.video_encoder, 
-            self.audio_capture
-        )
+        profiler = get_startup_profiler()
+
+        # 屏幕捕获、录制器、音频捕获和FFmpeg管理器在首次使用时创建（见同名属性）
+        self._screen_capture = None
+        self._screen_recorder = None
+        self._ffmpeg_manager = None
+        self._ffmpeg_click_pending = False  # 检查FFmpeg期间点击了FFmpeg按钮
+        self._recording_recovery = None  # 启动时在后台进行的录制恢复
+        self.audio_capture = None  # 勾选录制音频并开始录制时才创建（初始化PyAudio较慢）
+        self.preview_renderer = None
         
         # 状态变量
         self.is_recording = False
         self.is_paused = False
         self.output_path = AppConfig.get_default_output_dir()
 
-        # FFmpeg管理器
-        self.ffmpeg_manager = FFmpegManager()
-        self.ffmpeg_manager.status_changed.connect(self.on_ffmpeg_status_changed)
+        # 即时回放（录制时才创建分段环）和全局快捷键
+        self.replay_buffer = None
+        with profiler.measure("创建快捷键管理器"):
+            self.hotkey_manager = HotkeyManager()
+        self.replay_hotkey = None
 
         # 定时器
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.update_ui)
         self.update_timer.start(100)  # 100ms更新一次
         
-        self.init_ui()
+        with profiler.measure("构建界面"):
+            self.init_ui()
         self.connect_signals()
-        self.setup_system_tray()
+        with profiler.measure("创建系统托盘"):
+            self.setup_system_tray()
+
+        # 启动后检查上次异常退出时留下的分段录制
+        QTimer.singleShot(0, self.check_unfinished_recordings)
     
     def init_ui(self):
         """初始化UI"""
@@ -319,6 +354,11 @@ class MainWindow(QMainWindow):
         self.region_info_label.setStyleSheet("color: #666; font-size: 11px; padding: 2px;")
         layout.addWidget(self.region_info_label, 6, 0, 1, 2)
 
+        # 即时回放：持续录制但只保留最近几分钟，按快捷键保存
+        self.replay_checkbox = QCheckBox(f"即时回放（保留最近{self._get_replay_minutes():g}分钟）")
+        self.replay_checkbox.setToolTip(f"录制期间按 {self._get_replay_hotkey().upper()} 保存最近的内容")
+        layout.addWidget(self.replay_checkbox, 7, 0, 1, 2)
+
         return group
 
     def create_output_group(self):
@@ -502,17 +542,68 @@ class MainWindow(QMainWindow):
         self.select_region_btn.clicked.connect(self.select_recording_region)
         self.region_combo.currentTextChanged.connect(self.on_region_mode_changed)
 
-        # 录制器信号
-        self.screen_recorder.recording_started.connect(self.on_recording_started)
-        self.screen_recorder.recording_stopped.connect(self.on_recording_stopped)
-        self.screen_recorder.recording_paused.connect(self.on_recording_paused)
-        self.screen_recorder.recording_resumed.connect(self.on_recording_resumed)
-        self.screen_recorder.progress_updated.connect(self.on_progress_updated)
-        self.screen_recorder.error_occurred.connect(self.on_error_occurred)
-
-        # 屏幕捕获信号
-        self.screen_capture.frame_captured.connect(self.on_frame_captured)
-        self.screen_capture.frame_captured.connect(self.update_preview)
+    @property
+    def screen_capture(self):
+        """屏幕捕获（首次使用时导入并创建，同时启动预览渲染）"""
+        if self._screen_capture is None:
+            with get_startup_profiler().measure("创建屏幕捕获"):
+                from core.screen_capture import ScreenCapture
+                from core.preview_renderer import PreviewRenderer
+                screen_capture = ScreenCapture()
+
+                # 预览在后台线程按预览帧率缩放，界面线程只显示缩放后的帧
+                self.preview_renderer = PreviewRenderer(
+                    self._get_preview_fps(),
+                    retain=screen_capture.retain_frame,
+                    release=screen_capture.release_frame
+                )
+                self.preview_renderer.set_target_size(*self.preview_widget.target_size())
+                self.preview_renderer.start()
+                screen_capture.frame_captured.connect(
+                    self.preview_renderer.submit, Qt.ConnectionType.DirectConnection
+                )
+                self.preview_renderer.preview_ready.connect(self.update_preview)
+                self._screen_capture = screen_capture
+        return self._screen_capture
+
+    @property
+    def screen_recorder(self):
+        """录制器（首次使用时导入编码模块并创建）"""
+        if self._screen_recorder is None:
+            with get_startup_profiler().measure("创建录制器"):
+                from core.video_encoder import VideoEncoder, ScreenRecorder
+                recorder = ScreenRecorder()
+                recorder.setup(self.screen_capture, VideoEncoder(), self.audio_capture)
+
+                recorder.recording_started.connect(self.on_recording_started)
+                recorder.recording_stopped.connect(self.on_recording_stopped)
+                recorder.recording_paused.connect(self.on_recording_paused)
+                recorder.recording_resumed.connect(self.on_recording_resumed)
+                recorder.progress_updated.connect(self.on_progress_updated)
+                recorder.finalize_progress.connect(self.on_finalize_progress)
+                recorder.recording_finalized.connect(self.on_recording_finalized)
+                recorder.error_occurred.connect(self.on_error_occurred)
+                self._screen_recorder = recorder
+        return self._screen_recorder
+
+    @property
+    def ffmpeg_manager(self):
+        """FFmpeg管理器（首次使用时导入并创建）"""
+        if self._ffmpeg_manager is None:
+            with get_startup_profiler().measure("创建FFmpeg管理器"):
+                from utils.ffmpeg_manager import FFmpegManager
+                self._ffmpeg_manager = FFmpegManager()
+                self._ffmpeg_manager.status_changed.connect(self.on_ffmpeg_status_changed)
+                self._ffmpeg_manager.status_checked.connect(self.on_ffmpeg_status_checked)
+        return self._ffmpeg_manager
+
+    def _ensure_audio_capture(self):
+        """创建音频捕获（首次录制音频时导入pyaudio并初始化）"""
+        if not self.audio_capture:
+            with get_startup_profiler().measure("创建音频捕获"):
+                from core.audio_capture import AudioCapture
+                self.audio_capture = AudioCapture()
+        return self.audio_capture
 
     def setup_system_tray(self):
         """设置系统托盘"""
@@ -557,6 +648,7 @@ class MainWindow(QMainWindow):
         self.format_combo.setEnabled(enabled)
         self.audio_checkbox.setEnabled(enabled)
         self.cursor_checkbox.setEnabled(enabled)
+        self.replay_checkbox.setEnabled(enabled)
         self.region_combo.setEnabled(enabled)
         self.select_region_btn.setEnabled(enabled and self.region_combo.currentText() == "选择区域")
 
@@ -591,29 +683,26 @@ class MainWindow(QMainWindow):
             except (ValueError, TypeError, OverflowError):
                 self.audio_level_bar.setValue(0)
 
-    def update_preview(self, frame):
-        """更新预览窗口"""
+    def update_preview(self):
+        """显示渲染线程缩放好的最新预览帧"""
         try:
-            if frame is not None:
-                # 转换numpy数组为QPixmap
-                from PyQt6.QtGui import QImage
-                height, width, channel = frame.shape
-                bytes_per_line = 3 * width
-
-                # 转换BGR到RGB
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-                # 创建QImage
-                q_image = QImage(rgb_frame.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
-
-                # 转换为QPixmap
-                pixmap = QPixmap.fromImage(q_image)
-
-                # 更新预览窗口
-                self.preview_widget.update_frame(pixmap)
+            frame = self.preview_renderer.take_frame()
+            # 下一帧按预览窗口当前大小缩放
+            self.preview_renderer.set_target_size(*self.preview_widget.target_size())
+            self.preview_widget.update_frame(frame)
         except Exception as e:
             print(f"预览更新失败: {e}")
 
+    def _get_preview_fps(self) -> int:
+        """预览帧率（与录制帧率无关）"""
+        from core.preview_renderer import PreviewRenderer
+        try:
+            from utils.config_manager import get_config
+            return max(1, int(get_config("ui.preview_fps", PreviewRenderer.DEFAULT_FPS)))
+        except Exception as e:
+            print(f"读取预览帧率配置失败: {e}")
+            return PreviewRenderer.DEFAULT_FPS
+
     # 事件处理方法
     def _sanitize_filename(self, filename):
         """清理文件名中的无效字符"""
@@ -647,6 +736,11 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "错误", "FPS值必须在1-120之间")
                 return
 
+            if self.replay_checkbox.isChecked():
+                self.start_replay(fps, quality)
+                return
+            self.replay_buffer = None
+
             # 生成输出文件名
             import datetime
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -676,9 +770,7 @@ class MainWindow(QMainWindow):
             # 设置音频录制
             if self.audio_checkbox.isChecked():
                 # 确保音频捕获器可用
-                if not self.audio_capture:
-                    self.audio_capture = AudioCapture()
-                    self.screen_recorder.audio_capture = self.audio_capture
+                self.screen_recorder.audio_capture = self._ensure_audio_capture()
             else:
                 # 禁用音频录制
                 self.screen_recorder.audio_capture = None
@@ -693,6 +785,74 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "错误", f"开始录制失败: {str(e)}")
 
+    def start_replay(self, fps: int, quality: str):
+        """以即时回放模式开始录制"""
+        from core.replay_buffer import ReplayBuffer
+        self.screen_recorder.audio_capture = self._ensure_audio_capture() if self.audio_checkbox.isChecked() else None
+        self.replay_buffer = ReplayBuffer(self._get_replay_minutes() * 60)
+        self.replay_buffer.replay_saved.connect(self.on_replay_saved)
+        self.replay_buffer.error_occurred.connect(self.on_error_occurred)
+
+        if not self.screen_recorder.start_replay(self.replay_buffer, fps, quality):
+            QMessageBox.warning(self, "错误", "无法开始即时回放，请检查FFmpeg和权限")
+            return
+
+        # 快捷键回调在keyboard线程中执行，经由hotkey_triggered信号回到界面线程
+        hotkey = self._get_replay_hotkey()
+        if self.hotkey_manager.register_hotkey(hotkey, None, "保存即时回放"):
+            self.replay_hotkey = hotkey
+            self.hotkey_manager.hotkey_triggered.connect(self.on_hotkey_triggered)
+            self.status_label.setText(f"即时回放中，按 {hotkey.upper()} 保存最近的内容")
+        else:
+            self.status_label.setText("即时回放中（全局快捷键不可用）")
+
+    def save_replay(self):
+        """保存即时回放"""
+        if self.replay_buffer is None:
+            return
+        output_path = str(Path(self.output_path) / Path(self.replay_buffer.default_output_path()).name)
+        if self.screen_recorder.save_replay(output_path):
+            self.status_label.setText("正在保存回放...")
+
+    def on_hotkey_triggered(self, key_combination: str):
+        """全局快捷键触发"""
+        if key_combination == self.replay_hotkey:
+            self.save_replay()
+
+    def on_replay_saved(self, path: str):
+        """回放保存完成"""
+        self.status_label.setText(f"回放已保存: {Path(path).name}")
+        if hasattr(self, 'tray_icon'):
+            self.tray_icon.showMessage("即时回放", f"已保存到 {path}")
+
+    def _release_replay_hotkey(self):
+        """取消回放快捷键"""
+        if self.replay_hotkey:
+            self.hotkey_manager.unregister_hotkey(self.replay_hotkey)
+            try:
+                self.hotkey_manager.hotkey_triggered.disconnect(self.on_hotkey_triggered)
+            except (TypeError, RuntimeError):
+                pass
+            self.replay_hotkey = None
+
+    def _get_replay_minutes(self) -> float:
+        """即时回放保留的分钟数"""
+        try:
+            from utils.config_manager import get_config
+            return max(0.5, float(get_config("recording.replay_minutes", 5)))
+        except Exception as e:
+            print(f"读取即时回放配置失败: {e}")
+            return 5.0
+
+    def _get_replay_hotkey(self) -> str:
+        """保存即时回放的快捷键"""
+        try:
+            from utils.config_manager import get_config
+            return get_config("hotkeys.save_replay", DefaultHotkeys.SAVE_REPLAY) or DefaultHotkeys.SAVE_REPLAY
+        except Exception as e:
+            print(f"读取快捷键配置失败: {e}")
+            return DefaultHotkeys.SAVE_REPLAY
+
     def pause_recording(self):
         """暂停/恢复录制"""
         if self.is_paused:
@@ -717,6 +877,8 @@ class MainWindow(QMainWindow):
             self.screen_capture.stop_capture()
             self.preview_btn.setText("开启预览")
         else:
+            # 仅预览时预览窗口可直接显示BGRA帧
+            self.screen_capture.set_output_bgra(True)
             self.screen_capture.start_capture()
             self.preview_btn.setText("关闭预览")
 
@@ -806,7 +968,13 @@ class MainWindow(QMainWindow):
         self.pause_btn.setEnabled(False)
         self.stop_btn.setEnabled(False)
         self.progress_bar.setVisible(False)
-        self.status_label.setText("录制完成")
+        # 剩余帧的编码和音频合并在后台进行，期间可以开始新的录制
+        self.status_label.setText("正在保存录制...")
+
+        if self.replay_buffer is not None:
+            # 停止后不再响应快捷键，分段保留到下次录制前
+            self._release_replay_hotkey()
+            self.status_label.setText("即时回放已停止")
 
         # 重新启用录制设置控件
         self.set_recording_controls_enabled(True)
@@ -827,6 +995,24 @@ class MainWindow(QMainWindow):
         self.pause_btn.setText("暂停")
         self.status_label.setText("正在录制...")
 
+    def on_finalize_progress(self, output_path: str, stage: str, percent: int):
+        """录制收尾进度（新的录制进行中时不覆盖录制状态）"""
+        if self.is_recording:
+            return
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(percent)
+        self.status_label.setText(f"正在保存 {Path(output_path).name}: {stage}")
+
+    def on_recording_finalized(self, output_path: str, success: bool):
+        """录制收尾完成"""
+        name = Path(output_path).name
+        if not self.is_recording:
+            self.progress_bar.setVisible(False)
+            if self.replay_buffer is None:
+                self.status_label.setText(f"录制完成: {name}" if success else f"录制保存失败: {name}")
+        if success and self.replay_buffer is None and hasattr(self, 'tray_icon'):
+            self.tray_icon.showMessage("录制完成", f"已保存到 {output_path}")
+
     def on_progress_updated(self, frame_count, duration):
         """进度更新"""
         # 更新录制信息
@@ -836,16 +1022,13 @@ class MainWindow(QMainWindow):
         self.duration_label.setText(f"时长: {hours:02d}:{minutes:02d}:{seconds:02d}")
         self.frames_label.setText(f"帧数: {frame_count}")
 
-    def on_frame_captured(self, frame):
-        """帧捕获"""
-        # 更新预览（如果启用）
-        if hasattr(self, 'preview_widget'):
-            # 这里需要将numpy数组转换为QPixmap
-            # 由于篇幅限制，简化实现
-            pass
-
     def on_ffmpeg_button_clicked(self):
         """FFmpeg按钮点击处理"""
+        if self.ffmpeg_manager.is_checking() and not self.ffmpeg_manager.is_available():
+            # 结果出来之前不提示安装，检查完成后再处理这次点击
+            self._ffmpeg_click_pending = True
+            self.status_label.setText("正在检查FFmpeg...")
+            return
         if self.ffmpeg_manager.is_available():
             # 如果已安装，显示版本信息
             version = self.ffmpeg_manager.get_version()
@@ -922,6 +1105,13 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "安装失败", f"FFmpeg安装失败：\n\n{message}")
             self.status_label.setText("FFmpeg安装失败")
 
+    def on_ffmpeg_status_checked(self, available, info):
+        """FFmpeg状态检查完成，处理检查期间的按钮点击"""
+        if self._ffmpeg_click_pending:
+            self._ffmpeg_click_pending = False
+            self.status_label.setText("就绪")
+            self.on_ffmpeg_button_clicked()
+
     def on_ffmpeg_status_changed(self, available, info):
         """FFmpeg状态改变"""
         if available:
@@ -959,12 +1149,91 @@ class MainWindow(QMainWindow):
             """)
             self.ffmpeg_status_btn.setToolTip("点击安装FFmpeg")
 
+    def check_unfinished_recordings(self):
+        """提示恢复异常中断的分段录制"""
+        from core.segment_output import SegmentedRecording
+        recordings = SegmentedRecording.find_unfinished()
+        if not recordings:
+            return
+
+        names = "\n".join(Path(r.output_path).name for r in recordings)
+        reply = QMessageBox.question(
+            self, "恢复录制",
+            f"发现 {len(recordings)} 个异常中断的录制：\n\n{names}\n\n是否恢复已录制的内容？",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        # 拼接长录制需要较长时间，在工作线程中进行
+        from core.recording_recovery import RecordingRecovery
+        self._recording_recovery = RecordingRecovery(recordings)
+        self._recording_recovery.progress_updated.connect(self.on_recovery_progress)
+        self._recording_recovery.recovery_finished.connect(self.on_recovery_finished)
+        self._recording_recovery.start()
+
+    def on_recovery_progress(self, name: str, percent: int):
+        """录制恢复进度（录制进行中时不覆盖录制状态）"""
+        if self.is_recording:
+            return
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(percent)
+        self.status_label.setText(f"正在恢复 {name}")
+
+    def on_recovery_finished(self, recovered: int, failed: list):
+        """录制恢复完成"""
+        self._recording_recovery = None
+        if not self.is_recording:
+            self.progress_bar.setVisible(False)
+        if failed:
+            QMessageBox.warning(self, "恢复录制", "以下录制恢复失败：\n\n" + "\n".join(failed))
+        else:
+            self.status_label.setText(f"已恢复 {recovered} 个录制")
+
     def showEvent(self, event):
         """窗口显示事件"""
         super().showEvent(event)
-        # 检查FFmpeg状态
+        if self.preview_renderer is not None:
+            self.preview_renderer.set_target_size(*self.preview_widget.target_size())
+        # 检查FFmpeg状态（在工作线程中进行，不阻塞窗口显示）
         self.ffmpeg_manager.check_ffmpeg_status()
 
+    def closeEvent(self, event):
+        """关闭窗口：先停止录制，等待后台收尾完成后再退出，避免输出文件不完整"""
+        recorder = self._screen_recorder
+        if recorder is not None:
+            if recorder.is_recording:
+                recorder.stop_recording()
+            if recorder.is_finalizing():
+                reply = QMessageBox.question(
+                    self, "正在保存录制",
+                    "仍有录制正在保存，现在退出会使文件不完整。\n\n是否等待保存完成后退出？",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.Cancel
+                )
+                if reply != QMessageBox.StandardButton.Yes:
+                    event.ignore()
+                    return
+                self.status_label.setText("正在保存录制，完成后退出...")
+                while not recorder.wait_finalized(0.1):
+                    # 继续处理事件以显示收尾进度
+                    QApplication.processEvents()
+        recovery = self._recording_recovery
+        if recovery is not None and recovery.is_running():
+            reply = QMessageBox.question(
+                self, "正在恢复录制",
+                "仍有录制正在恢复，现在退出会使恢复的文件不完整（分段仍保留，下次启动可再次恢复）。\n\n"
+                "是否等待恢复完成后退出？",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel
+            )
+            if reply == QMessageBox.StandardButton.Cancel:
+                event.ignore()
+                return
+            if reply == QMessageBox.StandardButton.Yes:
+                self.status_label.setText("正在恢复录制，完成后退出...")
+                while not recovery.wait(0.1):
+                    QApplication.processEvents()
+        super().closeEvent(event)
+
     def on_error_occurred(self, error_message):
         """错误处理"""
         QMessageBox.critical(self, "错误", error_message)
@@ -18,6 +18,26 @@ sys.path.append(str(Path(__file__).parent.parent))
 from config.settings import AppConfig, UIConfig
 from utils.hotkey_manager import DefaultHotkeys, is_valid_hotkey
 
+# 设置项与配置键的对应关系（快捷键另存为 hotkeys.<名称>）
+SETTINGS_CONFIG_KEYS = {
+    "fps": "recording.fps",
+    "quality": "recording.quality",
+    "format": "recording.format",
+    "audio_enabled": "recording.audio_enabled",
+    "cursor_enabled": "recording.cursor_enabled",
+    "audio_quality": "recording.audio_quality",
+    "auto_save": "recording.auto_save",
+    "minimize_to_tray": "ui.minimize_to_tray",
+    "global_hotkeys_enabled": "hotkeys.enabled",
+    "hardware_accel": "advanced.hardware_acceleration",
+    "multithread": "advanced.multithread_encoding",
+    "buffer_size": "advanced.buffer_size_mb",
+    "output_path": "paths.output_directory",
+    "filename_template": "paths.filename_template",
+    "theme": "ui.theme",
+    "language": "ui.language"
+}
+
 class SettingsWindow(QDialog):
     """设置窗口"""
     
@@ -30,7 +50,7 @@ class SettingsWindow(QDialog):
         self.resize(600, 500)
         
         # 当前设置
-        self.current_settings = self.load_default_settings()
+        self.current_settings = self.load_saved_settings()
         
         self.init_ui()
         self.load_settings()
@@ -277,6 +297,29 @@ class SettingsWindow(QDialog):
             "language": "简体中文"
         }
     
+    def load_saved_settings(self):
+        """读取已保存的配置（缺少的项使用默认值）"""
+        settings = self.load_default_settings()
+        try:
+            from utils.config_manager import get_config
+            for name, key in SETTINGS_CONFIG_KEYS.items():
+                settings[name] = get_config(key, settings[name])
+            for name in settings["hotkeys"]:
+                settings["hotkeys"][name] = get_config(f"hotkeys.{name}", settings["hotkeys"][name])
+        except Exception as e:
+            print(f"读取配置失败: {e}")
+        return settings
+    
+    def save_settings(self, settings: dict):
+        """在一个配置事务中保存所有设置（只写盘一次）"""
+        try:
+            from utils.config_manager import get_config_manager
+            updates = {key: settings[name] for name, key in SETTINGS_CONFIG_KEYS.items()}
+            updates.update({f"hotkeys.{name}": hotkey for name, hotkey in settings["hotkeys"].items()})
+            get_config_manager().update(updates)
+        except Exception as e:
+            print(f"保存配置失败: {e}")
+    
     def load_settings(self):
         """加载设置到UI"""
         settings = self.current_settings
@@ -364,5 +407,6 @@ class SettingsWindow(QDialog):
             "language": self.language_combo.currentText()
         }
         
+        self.save_settings(settings)
         self.settings_changed.emit(settings)
         self.accept()
@@ -1,9 +1,16 @@
 """
 配置管理器
+
+set() 只修改内存中的配置，写盘在后台延迟合并进行（先写临时文件再原子替换）；
+batch() 中的多次修改只触发一次写盘，config_changed 在事务结束时逐项发出。
 """
 
+import atexit
 import json
 import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, Any, Optional
 from PyQt6.QtCore import QObject, pyqtSignal
@@ -16,6 +23,9 @@ class ConfigManager(QObject):
     
     config_changed = pyqtSignal(str, object)  # 配置项改变信号
     
+    # 延迟写盘时间（秒），期间的修改合并为一次写入
+    SAVE_DELAY = 0.5
+    
     def __init__(self, app_name: str = "ScreenRecorder"):
         super().__init__()
         self.app_name = app_name
@@ -23,8 +33,19 @@ class ConfigManager(QObject):
         self.config_file = Path(self.config_dir) / "config.json"
         self.config_data = {}
         
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._changes = 0  # 修改计数，写盘期间又有修改时保持未保存状态
+        self._save_timer = None
+        self._batch_depth = 0
+        self._pending_changes = []
+        
         # 加载配置
         self.load_config()
+        
+        # 退出时写入尚未保存的修改
+        atexit.register(self.flush)
     
     def get_config_path(self) -> str:
         """获取配置文件路径"""
@@ -44,17 +65,96 @@ class ConfigManager(QObject):
             print(f"加载配置失败: {e}")
             self.config_data = self.get_default_config()
     
+    @staticmethod
+    def _write_json(path: Path, content: str):
+        """原子写入JSON：先写同目录的临时文件并落盘，再替换目标文件"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+    
     def save_config(self):
-        """保存配置"""
+        """立即保存配置（同步，取消尚未执行的延迟写盘）
+
+        快照在写盘锁内获取，并发的保存按取快照的顺序写入，较旧的快照不会覆盖较新的；
+        写入成功后才清除未保存标记，失败的修改在下次保存或退出时重试。
+        """
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+        
         try:
-            # 确保配置目录存在
-            self.config_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config_data, f, indent=2, ensure_ascii=False)
+            with self._save_lock:
+                with self._lock:
+                    data = json.dumps(self.config_data, indent=2, ensure_ascii=False)
+                    changes = self._changes
+                self._write_json(self.config_file, data)
+                with self._lock:
+                    if self._changes == changes:
+                        self._dirty = False
         except Exception as e:
             print(f"保存配置失败: {e}")
     
+    def _schedule_save(self):
+        """标记配置已修改，延迟后在后台线程写盘"""
+        with self._lock:
+            self._dirty = True
+            self._changes += 1
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.SAVE_DELAY, self._deferred_save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+    
+    def _deferred_save(self):
+        """延迟写盘（定时器线程）"""
+        with self._lock:
+            self._save_timer = None
+            if not self._dirty:
+                return
+        self.save_config()
+    
+    def flush(self):
+        """立即写入尚未保存的修改"""
+        with self._lock:
+            dirty = self._dirty
+        if dirty:
+            self.save_config()
+    
+    @contextmanager
+    def batch(self):
+        """配置事务：其中的所有修改只写盘一次，config_changed 在事务结束时发出
+
+        with get_config_manager().batch():
+            set_config("recording.fps", 30)
+            set_config("recording.quality", "高质量")
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                finished = self._batch_depth == 0
+                changes = self._pending_changes if finished else []
+                if finished:
+                    self._pending_changes = []
+                    if changes:
+                        self._schedule_save()
+            for key, value in changes:
+                self.config_changed.emit(key, value)
+    
     def get_default_config(self) -> Dict[str, Any]:
         """获取默认配置"""
         return {
@@ -66,19 +166,22 @@ class ConfigManager(QObject):
                 "audio_enabled": AppConfig.DEFAULT_AUDIO_ENABLED,
                 "cursor_enabled": AppConfig.DEFAULT_CURSOR_ENABLED,
                 "audio_quality": "高质量",
-                "auto_save": True
+                "auto_save": True,
+                "replay_minutes": 5  # 即时回放保留的时长
             },
             "ui": {
                 "theme": "浅色主题",
                 "language": "简体中文",
                 "minimize_to_tray": True,
                 "show_preview": True,
+                "preview_fps": 10,
                 "window_geometry": None
             },
             "hotkeys": {
                 "start_stop": "f9",
                 "pause_resume": "f10",
                 "screenshot": "f11",
+                "save_replay": "f8",
                 "select_region": "ctrl+shift+a",
                 "show_hide": "ctrl+shift+r",
                 "enabled": True
@@ -93,6 +196,15 @@ class ConfigManager(QObject):
                 "multithread_encoding": True,
                 "buffer_size_mb": 10,
                 "max_fps": 60,
+                "damage_detection": True,  # 跳过未变化的帧，输出可变帧率
+                "pipeline_mode": AppConfig.DEFAULT_PIPELINE_MODE,  # thread 或 process（多进程）
+                "segmented_output": True,  # 录制写成分段，停止时无损拼接
+                "segment_seconds": 60,
+                "segment_size_mb": 0,  # 大于0时按大小分段（按码率上限换算为时长）
+                "sync_report": True,  # 在输出文件旁写入音画同步报告（.sync.json）
+                "max_concurrent_jobs": 0,  # 0 表示自动（CPU核心数 / 每任务线程数）
+                "parallel_transcode": False,  # 转换/压缩时在关键帧处分块并行转码
+                "transcode_chunks": 0,  # 0 表示自动（与自动并发数相同）
                 "auto_cleanup_temp": True
             },
             "permissions": {
@@ -115,31 +227,42 @@ class ConfigManager(QObject):
             return default
     
     def set(self, key: str, value: Any):
-        """设置配置值"""
+        """设置配置值（延迟写盘，值未变化时不写盘）"""
         keys = key.split('.')
-        config = self.config_data
-        
-        # 导航到父级
-        for k in keys[:-1]:
-            if k not in config:
-                config[k] = {}
-            config = config[k]
-        
-        # 设置值
-        old_value = config.get(keys[-1])
-        config[keys[-1]] = value
         
-        # 保存配置
-        self.save_config()
+        with self._lock:
+            config = self.config_data
+            
+            # 导航到父级
+            for k in keys[:-1]:
+                if k not in config:
+                    config[k] = {}
+                config = config[k]
+            
+            # 设置值
+            old_value = config.get(keys[-1])
+            config[keys[-1]] = value
+            if old_value == value:
+                # 同一个可变对象可能已被调用方就地修改，仍需写盘
+                if old_value is value and isinstance(value, (dict, list)):
+                    self._schedule_save()
+                return
+            
+            if self._batch_depth > 0:
+                self._pending_changes.append((key, value))
+                return
+            
+            # 保存配置
+            self._schedule_save()
         
         # 发出信号
-        if old_value != value:
-            self.config_changed.emit(key, value)
+        self.config_changed.emit(key, value)
     
     def update(self, updates: Dict[str, Any]):
-        """批量更新配置"""
-        for key, value in updates.items():
-            self.set(key, value)
+        """批量更新配置（一次写盘）"""
+        with self.batch():
+            for key, value in updates.items():
+                self.set(key, value)
     
     def reset_to_defaults(self):
         """重置为默认配置"""
@@ -156,8 +279,9 @@ class ConfigManager(QObject):
     def export_config(self, file_path: str) -> bool:
         """导出配置"""
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config_data, f, indent=2, ensure_ascii=False)
+            with self._lock:
+                data = json.dumps(self.config_data, indent=2, ensure_ascii=False)
+            self._write_json(Path(file_path), data)
             return True
         except Exception as e:
             print(f"导出配置失败: {e}")
@@ -215,35 +339,31 @@ class ConfigManager(QObject):
     
     def update_recording_config(self, config: Dict[str, Any]):
         """更新录制配置"""
-        for key, value in config.items():
-            self.set(f"recording.{key}", value)
+        self.update({f"recording.{key}": value for key, value in config.items()})
     
     def update_ui_config(self, config: Dict[str, Any]):
         """更新UI配置"""
-        for key, value in config.items():
-            self.set(f"ui.{key}", value)
+        self.update({f"ui.{key}": value for key, value in config.items()})
     
     def update_hotkey_config(self, config: Dict[str, Any]):
         """更新快捷键配置"""
-        for key, value in config.items():
-            self.set(f"hotkeys.{key}", value)
+        self.update({f"hotkeys.{key}": value for key, value in config.items()})
     
     def update_path_config(self, config: Dict[str, Any]):
         """更新路径配置"""
-        for key, value in config.items():
-            self.set(f"paths.{key}", value)
+        self.update({f"paths.{key}": value for key, value in config.items()})
     
     def update_advanced_config(self, config: Dict[str, Any]):
         """更新高级配置"""
-        for key, value in config.items():
-            self.set(f"advanced.{key}", value)
+        self.update({f"advanced.{key}": value for key, value in config.items()})
     
     def backup_config(self) -> bool:
         """备份配置"""
         try:
             backup_file = self.config_file.with_suffix('.backup.json')
-            with open(backup_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config_data, f, indent=2, ensure_ascii=False)
+            with self._lock:
+                data = json.dumps(self.config_data, indent=2, ensure_ascii=False)
+            self._write_json(backup_file, data)
             return True
         except Exception as e:
             print(f"备份配置失败: {e}")
@@ -294,5 +414,9 @@ def set_config(key: str, value: Any):
     get_config_manager().set(key, value)
 
 def save_config():
-    """快捷方式：保存配置"""
+    """快捷方式：立即保存配置"""
     get_config_manager().save_config()
+
+def config_batch():
+    """快捷方式：配置事务（with config_batch(): ...）"""
+    return get_config_manager().batch()
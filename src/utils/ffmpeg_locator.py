@@ -0,0 +1,235 @@
+"""
+FFmpeg查找与能力缓存
+
+统一查找FFmpeg可执行文件，并把版本、可用的编码器、复用器和滤镜
+按 (路径, 修改时间, 大小) 持久化缓存。二进制文件未变化时启动不再运行ffmpeg子进程。
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.settings import AppConfig
+
+class FFmpegLocator:
+    """FFmpeg查找器
+
+    find() 只检查文件系统（PATH、常见安装位置、imageio-ffmpeg），
+    get_info() 在缓存未命中时才运行 -version / -encoders / -muxers / -filters。
+    """
+
+    # 缓存格式版本，信息结构变化时递增
+    CACHE_VERSION = 1
+    # 缓存条目上限（每个二进制文件一条）
+    MAX_CACHE_ENTRIES = 20
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = Path(cache_path or Path(AppConfig.get_cache_dir()) / "ffmpeg_info.json")
+        self._cache = None
+        self._last_path = None  # 上一次查找到的路径（持久化在缓存文件中）
+        self._path = None
+        self._searched = False
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def candidate_paths() -> List[str]:
+        """按优先级排列的候选路径"""
+        candidates = []
+        which = shutil.which('ffmpeg')
+        if which:
+            candidates.append(which)
+        candidates.extend([
+            '/usr/local/bin/ffmpeg',  # macOS Homebrew（Intel）
+            '/opt/homebrew/bin/ffmpeg',  # macOS Homebrew（Apple Silicon）
+            str(Path.home() / '.local' / 'bin' / 'ffmpeg'),
+            str(Path.home() / 'AppData' / 'Local' / 'bin' / 'ffmpeg.exe'),
+            str(Path('ffmpeg') / 'bin' / 'ffmpeg.exe'),  # 本地目录
+            '/usr/bin/ffmpeg'
+        ])
+        return candidates
+
+    def find(self, refresh: bool = False) -> Optional[str]:
+        """查找可用的FFmpeg（结果在进程内缓存，refresh为True时重新查找）"""
+        with self._lock:
+            if self._searched and not refresh:
+                return self._path
+            self._path = None
+            for path in self.candidate_paths():
+                if os.path.isfile(path) and os.access(path, os.X_OK) and self.get_info(path).get("version"):
+                    self._path = path
+                    break
+            else:
+                # imageio-ffmpeg自带的二进制文件
+                try:
+                    import imageio_ffmpeg
+                    path = imageio_ffmpeg.get_ffmpeg_exe()
+                    if self.get_info(path).get("version"):
+                        self._path = path
+                except Exception:
+                    pass
+            self._searched = True
+            if self._path and self._path != self._last_path:
+                self._load_cache()
+                self._last_path = self._path
+                self._save_cache()
+            return self._path
+
+    def get_cached_info(self) -> Dict:
+        """只读缓存：上一次找到的FFmpeg文件未变化时返回其信息，否则返回空字典
+
+        不查找候选路径、不运行子进程，可在界面线程中调用，用于启动时立即显示状态。
+        """
+        with self._lock:
+            cache = self._load_cache()
+            path = self._path if self._searched else self._last_path
+            key = self._cache_key(path) if path else None
+            if key is None or key not in cache:
+                return {}
+            return dict(cache[key], path=path)
+
+    # ---------- 缓存 ----------
+
+    @staticmethod
+    def _cache_key(path: str) -> Optional[str]:
+        """根据真实路径、修改时间和大小生成缓存键"""
+        try:
+            real_path = os.path.realpath(path)
+            stat = os.stat(real_path)
+        except OSError:
+            return None
+        return f"{real_path}|{stat.st_mtime_ns}|{stat.st_size}"
+
+    def _load_cache(self) -> Dict:
+        """加载缓存（调用方持有锁）"""
+        if self._cache is None:
+            self._cache = {}
+            try:
+                if self.cache_path.exists():
+                    with open(self.cache_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if data.get("version") == self.CACHE_VERSION:
+                        self._cache = data.get("entries", {})
+                        self._last_path = data.get("last_path")
+            except Exception as e:
+                print(f"加载FFmpeg信息缓存失败: {e}")
+        return self._cache
+
+    def _save_cache(self):
+        """保存缓存（调用方持有锁）"""
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.cache_path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": self.CACHE_VERSION, "entries": self._cache,
+                           "last_path": self._last_path}, f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_path)
+        except Exception as e:
+            print(f"保存FFmpeg信息缓存失败: {e}")
+
+    def clear_cache(self):
+        """清空缓存并重新查找"""
+        with self._lock:
+            self._cache = {}
+            self._save_cache()
+            self._searched = False
+
+    # ---------- 能力探测 ----------
+
+    def get_info(self, path: Optional[str] = None, refresh: bool = False) -> Dict:
+        """获取FFmpeg信息：path、version、encoders、muxers、filters，不可用时返回空字典"""
+        path = path or self.find()
+        if not path:
+            return {}
+        key = self._cache_key(path)
+        if key is None:
+            return {}
+
+        with self._lock:
+            cache = self._load_cache()
+            if not refresh and key in cache:
+                return dict(cache[key], path=path)
+
+            info = self._probe(path)
+            if info:
+                # 同一文件的旧条目已失效
+                prefix = key.split('|', 1)[0] + '|'
+                for stale in [k for k in cache if k.startswith(prefix)]:
+                    del cache[stale]
+                cache[key] = info
+                while len(cache) > self.MAX_CACHE_ENTRIES:
+                    del cache[next(iter(cache))]
+                self._save_cache()
+            return dict(info, path=path) if info else {}
+
+    def _run(self, path: str, option: str) -> str:
+        """运行 ffmpeg -hide_banner <option>，返回标准输出"""
+        try:
+            result = subprocess.run([path, '-hide_banner', option], capture_output=True,
+                                    text=True, errors="replace", timeout=10)
+            return result.stdout if result.returncode == 0 else ""
+        except (subprocess.TimeoutExpired, OSError):
+            return ""
+
+    def _probe(self, path: str) -> Dict:
+        """运行ffmpeg读取版本和能力"""
+        version_output = self._run(path, '-version')
+        if not version_output:
+            return {}
+        return {
+            "version": version_output.split('\n')[0].strip(),
+            "encoders": self.parse_list(self._run(path, '-encoders'), r"^\s*[VAS][\w.]{5}\s+(\S+)"),
+            "muxers": self.parse_list(self._run(path, '-muxers'), r"^\s*[D ]?E\s+(\S+)"),
+            "filters": self.parse_list(self._run(path, '-filters'), r"^\s*[TSC.]{2,3}\s+(\S+)\s+\S+->\S+")
+        }
+
+    @staticmethod
+    def parse_list(output: str, pattern: str) -> List[str]:
+        """解析 -encoders / -muxers / -filters 的列表（跳过表头）"""
+        names = []
+        body = output.split("--", 1)[-1] if "--" in output else output
+        for line in body.splitlines():
+            match = re.match(pattern, line)
+            if match:
+                # 复用器名称可能是逗号分隔的别名
+                names.extend(match.group(1).split(","))
+        return sorted(set(names))
+
+    def has_encoder(self, name: str, path: Optional[str] = None) -> bool:
+        """FFmpeg是否支持该编码器（path默认为查找到的FFmpeg）"""
+        return name in self.get_info(path).get("encoders", [])
+
+    def has_muxer(self, name: str, path: Optional[str] = None) -> bool:
+        """FFmpeg是否支持该复用器"""
+        return name in self.get_info(path).get("muxers", [])
+
+    def has_filter(self, name: str, path: Optional[str] = None) -> bool:
+        """FFmpeg是否支持该滤镜"""
+        return name in self.get_info(path).get("filters", [])
+
+# 全局查找器实例
+_locator = None
+_locator_lock = threading.Lock()
+
+def get_ffmpeg_locator() -> FFmpegLocator:
+    """获取全局FFmpeg查找器实例"""
+    global _locator
+    with _locator_lock:
+        if _locator is None:
+            _locator = FFmpegLocator()
+        return _locator
+
+def find_ffmpeg(refresh: bool = False) -> Optional[str]:
+    """查找FFmpeg可执行文件（便捷函数）"""
+    return get_ffmpeg_locator().find(refresh)
+
+def get_ffmpeg_info(refresh: bool = False) -> Dict:
+    """获取FFmpeg版本和能力（便捷函数）"""
+    locator = get_ffmpeg_locator()
+    if refresh:
+        locator.find(refresh=True)
+    return locator.get_info(refresh=refresh)
@@ -7,13 +7,14 @@ import sys
 import subprocess
 import platform
 import tempfile
-import urllib.request
-import zipfile
 import shutil
+import threading
 from pathlib import Path
 from PyQt6.QtCore import QObject, pyqtSignal, QThread
 from PyQt6.QtWidgets import QMessageBox
 
+from utils.ffmpeg_locator import get_ffmpeg_info, get_ffmpeg_locator
+
 class FFmpegInstaller(QThread):
     """FFmpeg安装器线程"""
     
@@ -84,6 +85,9 @@ class FFmpegInstaller(QThread):
             zip_path = temp_dir / "ffmpeg.zip"
             
             self.installation_progress.emit("正在下载...")
+            # 只在安装时使用，不在启动时导入
+            import urllib.request
+            import zipfile
             urllib.request.urlretrieve(ffmpeg_url, zip_path)
             
             # 解压
@@ -127,6 +131,9 @@ class FFmpegInstaller(QThread):
             zip_path = temp_dir / "ffmpeg.zip"
             
             self.installation_progress.emit("正在下载...")
+            # 只在安装时使用，不在启动时导入
+            import urllib.request
+            import zipfile
             urllib.request.urlretrieve(ffmpeg_url, zip_path)
             
             # 解压
@@ -197,6 +204,7 @@ class FFmpegManager(QObject):
     
     # 信号
     status_changed = pyqtSignal(bool, str)  # 状态改变: 是否可用, 版本信息
+    status_checked = pyqtSignal(bool, str)  # 检查完成（无论状态是否改变）: 是否可用, 版本信息
     
     def __init__(self):
         super().__init__()
@@ -204,73 +212,74 @@ class FFmpegManager(QObject):
         self._ffmpeg_available = False
         self._ffmpeg_version = ""
         self._ffmpeg_path = ""
+        self._last_status = None  # 最近发出的 (是否可用, 信息)，结果相同时不重复发出
+        self._check_thread = None
+        self._check_again = None  # 检查进行中又收到的请求（refresh参数），完成后再检查一次
+        self._check_lock = threading.Lock()
     
-    def check_ffmpeg_status(self):
-        """检查FFmpeg状态"""
-        try:
-            # 检查ffmpeg-python库
+    def check_ffmpeg_status(self, refresh: bool = False):
+        """检查FFmpeg状态（异步，结果通过 status_changed 发出）
+
+        上一次找到的FFmpeg文件未变化时先按缓存立即发出结果，不运行子进程；
+        查找和探测（缓存未命中时运行 -version 等命令）在工作线程中进行，
+        结果与已发出的不同时再次发出，检查完成后发出 status_checked。
+        refresh 为True时重新查找（如安装完成后）。
+        """
+        with self._check_lock:
+            if self._check_thread is not None:
+                # 正在检查，完成后再检查一次
+                self._check_again = refresh or bool(self._check_again)
+                return
+            self._check_thread = threading.Thread(target=self._check_worker, args=(refresh,),
+                                                  name="FFmpegStatusCheck", daemon=True)
+        
+        if not refresh:
             try:
-                import ffmpeg
-                # 尝试获取FFmpeg版本
-                result = subprocess.run(['ffmpeg', '-version'], 
-                                      capture_output=True, text=True, timeout=10)
-                if result.returncode == 0:
-                    version_line = result.stdout.split('\n')[0]
-                    self._ffmpeg_available = True
-                    self._ffmpeg_version = version_line
-                    self._ffmpeg_path = shutil.which('ffmpeg') or "系统路径"
-                    self.status_changed.emit(True, version_line)
-                    return True
-            except:
-                pass
-            
-            # 检查系统FFmpeg
-            ffmpeg_path = shutil.which('ffmpeg')
-            if ffmpeg_path:
-                result = subprocess.run([ffmpeg_path, '-version'], 
-                                      capture_output=True, text=True, timeout=10)
-                if result.returncode == 0:
-                    version_line = result.stdout.split('\n')[0]
-                    self._ffmpeg_available = True
-                    self._ffmpeg_version = version_line
-                    self._ffmpeg_path = ffmpeg_path
-                    self.status_changed.emit(True, version_line)
-                    return True
-            
-            # 检查本地安装
-            local_paths = [
-                Path.home() / ".local" / "bin" / "ffmpeg",
-                Path.home() / "AppData" / "Local" / "bin" / "ffmpeg.exe",
-            ]
-            
-            for path in local_paths:
-                if path.exists():
-                    try:
-                        result = subprocess.run([str(path), '-version'], 
-                                              capture_output=True, text=True, timeout=10)
-                        if result.returncode == 0:
-                            version_line = result.stdout.split('\n')[0]
-                            self._ffmpeg_available = True
-                            self._ffmpeg_version = version_line
-                            self._ffmpeg_path = str(path)
-                            self.status_changed.emit(True, version_line)
-                            return True
-                    except:
-                        continue
-            
+                cached = get_ffmpeg_locator().get_cached_info()
+                if cached.get("version"):
+                    self._apply_status(cached)
+            except Exception as e:
+                print(f"读取FFmpeg状态缓存失败: {e}")
+        self._check_thread.start()
+    
+    def is_checking(self) -> bool:
+        """是否正在检查FFmpeg状态"""
+        return self._check_thread is not None
+    
+    def _check_worker(self, refresh: bool):
+        """工作线程：查找并探测FFmpeg"""
+        while True:
+            try:
+                self._apply_status(get_ffmpeg_info(refresh))
+            except Exception as e:
+                self._apply_status({}, f"检查失败: {str(e)}")
+            with self._check_lock:
+                done = self._check_again is None
+                if done:
+                    self._check_thread = None
+                else:
+                    refresh, self._check_again = self._check_again, None
+            if done:
+                self.status_checked.emit(*self._last_status)
+                return
+    
+    def _apply_status(self, info: dict, error: str = ""):
+        """更新FFmpeg状态，与上次发出的结果不同时发出 status_changed"""
+        if info.get("version"):
+            self._ffmpeg_available = True
+            self._ffmpeg_version = info["version"]
+            self._ffmpeg_path = info["path"]
+            status = (True, info["version"])
+        else:
             # FFmpeg不可用
             self._ffmpeg_available = False
             self._ffmpeg_version = ""
             self._ffmpeg_path = ""
-            self.status_changed.emit(False, "FFmpeg未安装")
-            return False
-            
-        except Exception as e:
-            self._ffmpeg_available = False
-            self._ffmpeg_version = ""
-            self._ffmpeg_path = ""
-            self.status_changed.emit(False, f"检查失败: {str(e)}")
-            return False
+            status = (False, error or "FFmpeg未安装")
+        
+        if status != self._last_status:
+            self._last_status = status
+            self.status_changed.emit(*status)
     
     def install_ffmpeg(self):
         """安装FFmpeg"""
@@ -285,8 +294,8 @@ class FFmpegManager(QObject):
     def _on_installation_finished(self, success, message):
         """安装完成回调"""
         if success:
-            # 重新检查状态
-            self.check_ffmpeg_status()
+            # 重新检查状态（新安装的FFmpeg不在缓存的查找结果中）
+            self.check_ffmpeg_status(refresh=True)
         
         # 清理安装器
         if self.installer:
@@ -110,6 +110,7 @@ class DefaultHotkeys:
     START_STOP_RECORDING = "f9"
     PAUSE_RESUME_RECORDING = "f10"
     TAKE_SCREENSHOT = "f11"
+    SAVE_REPLAY = "f8"
     
     # 区域选择
     SELECT_REGION = "ctrl+shift+a"
@@ -124,6 +125,7 @@ class DefaultHotkeys:
             "start_stop": cls.START_STOP_RECORDING,
             "pause_resume": cls.PAUSE_RESUME_RECORDING,
             "screenshot": cls.TAKE_SCREENSHOT,
+            "save_replay": cls.SAVE_REPLAY,
             "select_region": cls.SELECT_REGION,
             "show_hide": cls.SHOW_HIDE_WINDOW
         }
@@ -135,6 +137,7 @@ class DefaultHotkeys:
             "start_stop": "开始/停止录制",
             "pause_resume": "暂停/恢复录制",
             "screenshot": "截图",
+            "save_replay": "保存即时回放",
             "select_region": "选择录制区域",
             "show_hide": "显示/隐藏主窗口"
         }
@@ -0,0 +1,161 @@
+"""
+启动耗时分析
+
+--profile-startup 时替换 builtins.__import__ 记录每个模块的导入耗时（累计和扣除子模块后的自身耗时），
+并记录启动各阶段的初始化耗时，主窗口首次绘制后输出报告。
+首次绘制之后才初始化的组件（如首次录制时创建的音频捕获）在初始化完成时单独输出一行。
+未启用时 measure() 和 mark() 不做任何事。
+"""
+
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+class StartupProfiler:
+    """启动耗时分析器"""
+
+    # 报告中列出的导入耗时最多的模块数
+    TOP_IMPORTS = 20
+
+    def __init__(self):
+        self.enabled = False
+        self.reported = False
+        self.first_paint_ms = None
+        self.started = time.perf_counter()
+        self.imports = {}  # 模块名 -> [累计秒, 自身秒]
+        self.stages = []  # (阶段, 开始时间点, 耗时)
+        self._original_import = None
+        self._stack = []  # 进行中的导入，每项为已计入的子模块耗时
+        self._thread_id = None  # 只记录主线程中的导入
+        self._paint_filter = None
+
+    def enable(self):
+        """开始记录（应在导入PyQt6等大型模块之前调用）"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started = time.perf_counter()
+        self._thread_id = threading.get_ident()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """记录首次导入的模块，已导入的模块直接交给原始 __import__"""
+        key = name
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            parts = package.rsplit(".", level - 1) if level > 1 else [package]
+            key = f"{parts[0]}.{name}" if name else parts[0]
+        if key in sys.modules or threading.get_ident() != self._thread_id:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            entry = self.imports.setdefault(key, [0.0, 0.0])
+            entry[0] += elapsed
+            entry[1] += elapsed - children
+
+    def elapsed_ms(self) -> float:
+        """启用以来经过的时间（毫秒）"""
+        return (time.perf_counter() - self.started) * 1000
+
+    def mark(self, label: str):
+        """记录一个时间点"""
+        if self.enabled:
+            self.stages.append((label, self.elapsed_ms(), None))
+
+    @contextmanager
+    def measure(self, label: str):
+        """记录一段初始化的耗时"""
+        if not self.enabled:
+            yield
+            return
+        begin = self.elapsed_ms()
+        try:
+            yield
+        finally:
+            duration = self.elapsed_ms() - begin
+            if self.reported:
+                print(f"[启动分析] 延迟初始化 {label}: {duration:.1f}ms")
+            else:
+                self.stages.append((label, begin, duration))
+
+    def report_on_first_paint(self, widget):
+        """窗口首次绘制后输出报告"""
+        if not self.enabled:
+            return
+        from PyQt6.QtCore import QEvent, QObject, QTimer
+
+        profiler = self
+
+        class FirstPaintFilter(QObject):
+            def eventFilter(self, watched, event):
+                if event.type() == QEvent.Type.Paint:
+                    watched.removeEventFilter(self)
+                    profiler.first_paint_ms = profiler.elapsed_ms()
+                    profiler.mark("首次绘制")
+                    # 等本次绘制完成后再输出
+                    QTimer.singleShot(0, profiler.report)
+                return False
+
+        self._paint_filter = FirstPaintFilter(widget)
+        widget.installEventFilter(self._paint_filter)
+
+    def top_imports(self, count: int = TOP_IMPORTS) -> List[Tuple[str, float, float]]:
+        """自身耗时最多的模块 (模块名, 累计毫秒, 自身毫秒)"""
+        rows = [(name, total * 1000, own * 1000) for name, (total, own) in self.imports.items()]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows[:count]
+
+    def top_level_imports(self) -> Dict[str, float]:
+        """按顶层包汇总的导入耗时（毫秒）"""
+        totals = {}
+        for name, (_, own) in self.imports.items():
+            package = name.split(".")[0]
+            totals[package] = totals.get(package, 0.0) + own * 1000
+        return totals
+
+    def report(self):
+        """输出启动耗时报告"""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        total = self.first_paint_ms if self.first_paint_ms is not None else self.elapsed_ms()
+        import_ms = sum(own for _, own in self.imports.values()) * 1000
+        print(f"\n[启动分析] 首次绘制 {total:.1f}ms（其中导入模块 {import_ms:.1f}ms）")
+
+        print("[启动分析] 启动阶段（开始时间 / 耗时）:")
+        for label, begin, duration in sorted(self.stages, key=lambda stage: stage[1]):
+            cost = f"{duration:8.1f}ms" if duration is not None else " " * 10
+            print(f"  {begin:8.1f}ms {cost}  {label}")
+
+        print("[启动分析] 按包汇总的导入耗时:")
+        packages = sorted(self.top_level_imports().items(), key=lambda item: item[1], reverse=True)
+        for package, cost in packages[:self.TOP_IMPORTS]:
+            print(f"  {cost:8.1f}ms  {package}")
+
+        print("[启动分析] 导入耗时最多的模块（累计 / 自身）:")
+        for name, cumulative, own in self.top_imports():
+            print(f"  {cumulative:8.1f}ms {own:8.1f}ms  {name}")
+
+        # 首次绘制之后不再记录导入
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+# 全局启动分析器实例
+_profiler = StartupProfiler()
+
+def get_startup_profiler() -> StartupProfiler:
+    """获取全局启动分析器"""
+    return _profiler